@@ -0,0 +1,316 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from .profiling import PROFILE
+
+CHEZMOI_CONFIG_NAMES = ("chezmoi.json", "chezmoi.jsonc", "chezmoi.toml", "chezmoi.yaml")
+
+
+def default_chezmoi_config_paths() -> list[Path]:
+    """Returns the config files chezmoi would discover when --config is not given."""
+    config_home = os.environ.get("XDG_CONFIG_HOME") or str(Path("~/.config").expanduser())
+    config_dir = Path(config_home) / "chezmoi"
+    return [config_dir / name for name in CHEZMOI_CONFIG_NAMES]
+
+
+def chezmoi_config_fingerprint(config_path: Optional[str]) -> str:
+    """Hashes the chezmoi config files a render with config_path (or without --config) would read."""
+    candidates = [Path(config_path)] if config_path else default_chezmoi_config_paths()
+    hasher = hashlib.sha256()
+    for candidate in candidates:
+        try:
+            data = candidate.read_bytes()
+        except OSError:
+            continue
+        hasher.update(str(candidate).encode("utf-8", errors="surrogateescape"))
+        hasher.update(b"\0")
+        hasher.update(hashlib.sha256(data).digest())
+    return hasher.hexdigest()
+
+
+def chezmoi_source_data_fingerprint(source_dir: Path) -> str:
+    """
+    Hashes the source-dir files templates can read besides the config:
+    .chezmoidata.* and .chezmoidata/ (template data) and .chezmoitemplates/
+    (shared templates).
+    """
+    candidates = sorted(source_dir.glob(".chezmoidata.*"))
+    for directory in (".chezmoidata", ".chezmoitemplates"):
+        candidates.extend(sorted(path for path in (source_dir / directory).rglob("*") if path.is_file()))
+    hasher = hashlib.sha256()
+    for candidate in candidates:
+        try:
+            data = candidate.read_bytes()
+        except OSError:
+            continue
+        hasher.update(str(candidate.relative_to(source_dir)).encode("utf-8", errors="surrogateescape"))
+        hasher.update(b"\0")
+        hasher.update(hashlib.sha256(data).digest())
+    return hasher.hexdigest()
+
+
+def chezmoi_template_context(config_path: Optional[str], source_dir: Path) -> str:
+    """
+    Identifies everything besides its own text that a template render depends
+    on: the config override path, the config contents and the source-dir data.
+    """
+    return "\0".join(
+        [config_path or "", chezmoi_config_fingerprint(config_path), chezmoi_source_data_fingerprint(source_dir)]
+    )
+
+
+class DiskCache:
+    """
+    String values stored one file per key under cache_dir.
+
+    The directory is bounded by total size; reads refresh an entry's mtime so
+    eviction drops the least recently used entries first. Hits and misses
+    are counted in the run profile as <NAME>_hits and <NAME>_misses.
+    """
+
+    NAME = "disk_cache"
+    DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, cache_dir: Path, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._memory: dict[str, str] = {}
+        self._total_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        cached = self._memory.get(key)
+        if cached is not None:
+            PROFILE.count(f"{self.NAME}_hits")
+            return cached
+
+        entry = self.cache_dir / key
+        try:
+            value = entry.read_bytes().decode("utf-8", errors="surrogateescape")
+            os.utime(entry)
+        except OSError:
+            PROFILE.count(f"{self.NAME}_misses")
+            return None
+
+        PROFILE.count(f"{self.NAME}_hits")
+        self._memory[key] = value
+        return value
+
+    def put(self, key: str, value: str):
+        self._memory[key] = value
+        data = value.encode("utf-8", errors="surrogateescape")
+        if len(data) > self.max_bytes:
+            return
+
+        with self._lock:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                total = self._current_total()
+                entry = self.cache_dir / key
+                tmp_entry = self.cache_dir / f"{key}.tmp"
+                tmp_entry.write_bytes(data)
+                os.replace(tmp_entry, entry)
+            except OSError:
+                return
+
+            self._total_bytes = total + len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _current_total(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, _, size in self._entries())
+        return self._total_bytes
+
+    def _entries(self) -> list[tuple[int, Path, int]]:
+        entries = []
+        try:
+            scanned = list(os.scandir(self.cache_dir))
+        except OSError:
+            return entries
+        for entry in scanned:
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, Path(entry.path), stat.st_size))
+        return entries
+
+    def _evict(self):
+        # Trim to 90% of the budget so a full cache does not evict on every put.
+        target = self.max_bytes * 9 // 10
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+        self._total_bytes = total
+
+
+class RenderCache(DiskCache):
+    """
+    Content-addressed cache of rendered chezmoi templates.
+
+    Entries are keyed by the template content and the template context from
+    chezmoi_template_context: the config and the source-dir data it can read.
+    """
+
+    NAME = "render_cache"
+
+    def __init__(self, cache_dir: Path, template_context: str, max_bytes: int = DiskCache.DEFAULT_MAX_BYTES):
+        super().__init__(cache_dir, max_bytes)
+        self.template_context = template_context
+
+    def key(self, content: str) -> str:
+        hasher = hashlib.sha256()
+        hasher.update(self.template_context.encode("utf-8", errors="surrogateescape"))
+        hasher.update(b"\0")
+        hasher.update(content.encode("utf-8", errors="surrogateescape"))
+        return hasher.hexdigest()
+
+
+class AnalysisCache(DiskCache):
+    """
+    Per-file merge classifications, so unchanged inputs skip analysis.
+
+    An entry records the scenario a (base, theirs, local) triple resolved to,
+    and the merged content when git could merge it. Entries are keyed by the
+    three blob IDs and the merge engine; template entries also include the
+    template context (see chezmoi_template_context), since the local side is
+    compared as rendered.
+    """
+
+    NAME = "analysis_cache"
+    VERSION = 1
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        merge_engine: str,
+        template_context: str,
+        max_bytes: int = DiskCache.DEFAULT_MAX_BYTES,
+    ):
+        super().__init__(cache_dir, max_bytes)
+        self.merge_engine = merge_engine
+        self.template_context = template_context
+
+    def key(self, base_oid: str, latest_oid: str, local_oid: str, is_template: bool) -> str:
+        parts = [str(self.VERSION), self.merge_engine, base_oid, latest_oid, local_oid]
+        if is_template:
+            parts.append(self.template_context)
+        return hashlib.sha256("\0".join(parts).encode("utf-8", errors="surrogateescape")).hexdigest()
+
+    def get_result(self, key: str) -> Optional[tuple[str, Optional[str]]]:
+        """Returns (scenario name, merged content or None) for key, if cached."""
+        value = self.get(key)
+        if value is None:
+            return None
+        try:
+            entry = json.loads(value)
+            return entry["scenario"], entry["merged"]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def put_result(self, key: str, scenario: str, merged: Optional[str]):
+        self.put(key, json.dumps({"scenario": scenario, "merged": merged}))
+
+
+class LocalHashCache:
+    """
+    Remembers the git blob ID of local source files between runs.
+
+    Entries are keyed by path and validated against (size, mtime_ns, inode),
+    so an unchanged file costs one stat() instead of a full read. As with git's
+    racy-clean index entries, a file modified too close to the moment it was
+    hashed is not trusted: a later write within the same mtime tick would keep
+    the same stat, so such files are hashed again every time.
+    """
+
+    VERSION = 1
+    RACY_WINDOW_NS = 2_000_000_000
+    # Files at least this large are hashed through mmap instead of one read.
+    MMAP_THRESHOLD = 1024 * 1024
+
+    def __init__(self, repo_root: Path, cache_path: Optional[Path] = None):
+        self.repo_root = repo_root
+        self.cache_path = cache_path
+        self._entries = self._load()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def oid(self, rel_path: str) -> str:
+        """Returns the blob ID of rel_path; raises FileNotFoundError when it is missing."""
+        path = self.repo_root / rel_path
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+        entry = self._entries.get(rel_path)
+        if entry is not None and entry[:3] == stamp:
+            PROFILE.count("local_hash_hits")
+            return entry[3]
+
+        PROFILE.count("local_hash_misses")
+        hashed_at_ns = time.time_ns()
+        oid = hash_file_blob(path, self.MMAP_THRESHOLD)
+        after = os.stat(path)
+        with self._lock:
+            if (
+                [after.st_size, after.st_mtime_ns, after.st_ino] == stamp
+                and stat.st_mtime_ns < hashed_at_ns - self.RACY_WINDOW_NS
+            ):
+                self._entries[rel_path] = stamp + [oid]
+                self._dirty = True
+            elif self._entries.pop(rel_path, None) is not None:
+                self._dirty = True
+        return oid
+
+    def save(self):
+        """Persists the entries when any changed since load."""
+        if not self.cache_path or not self._dirty:
+            return
+        with self._lock:
+            payload = {"version": self.VERSION, "files": dict(self._entries)}
+            self._dirty = False
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.tmp")
+            tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            return
+
+    def _load(self) -> dict[str, list]:
+        if not self.cache_path:
+            return {}
+        try:
+            payload = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(payload, dict) or payload.get("version") != self.VERSION:
+            return {}
+        files = payload.get("files")
+        return files if isinstance(files, dict) else {}
+
+
+def hash_file_blob(path: Path, mmap_threshold: int = LocalHashCache.MMAP_THRESHOLD) -> str:
+    """Returns the git blob ID of the file at path, mapping large files instead of reading them."""
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size < mmap_threshold:
+            data = handle.read()
+            return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            hasher = hashlib.sha1(b"blob %d\0" % len(mapped))
+            hasher.update(mapped)
+            return hasher.hexdigest()
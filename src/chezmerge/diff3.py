@@ -0,0 +1,607 @@
+"""
+In-process three-way line merge that mirrors 'git merge-file -p'.
+
+The diff core is a port of git's xdiff: Myers with the same cost heuristics,
+record cleanup and hunk compaction, followed by the zealous/alnum conflict
+refinement used by merge-file. Lines are interned to integer ids, so the
+diff runs on hash sequences rather than on the text itself.
+"""
+
+from collections import Counter
+from typing import Optional
+
+DEFAULT_MARKER_SIZE = 7
+DEFAULT_LABELS = ("ours", "base", "theirs")
+
+# Tunables copied from xdiff (xdiffi.h / xprepare.c).
+MAX_COST_MIN = 256
+HEUR_MIN_COST = 256
+SNAKE_CNT = 20
+K_HEUR = 4
+MAX_EQLIMIT = 1024
+SIMSCAN_WINDOW = 100
+KPDIS_RUN = 4
+LINE_MAX = 2 ** 62
+# git refuses to merge content with a NUL in its first 8000 bytes.
+BINARY_PROBE_SIZE = 8000
+
+# Merge hunk modes (xdmerge_t.mode).
+CONFLICT = 0
+FROM_OURS = 1
+FROM_THEIRS = 2
+IDENTICAL = 4
+
+
+def merge_texts(
+    base: str,
+    ours: str,
+    theirs: str,
+    labels: tuple[str, str, str] = DEFAULT_LABELS,
+    marker_size: int = DEFAULT_MARKER_SIZE,
+) -> Optional[tuple[bool, str]]:
+    """
+    Merges ours and theirs against base.
+    Returns (clean, merged_content) exactly as 'git merge-file -p -L ours -L base
+    -L theirs' would, or None for inputs this engine does not model (binary
+    content or CR line endings) so the caller can fall back to git.
+    """
+    for content in (base, ours, theirs):
+        if "\x00" in content[:BINARY_PROBE_SIZE] or "\r" in content:
+            return None
+
+    base_lines = split_lines(base)
+    ours_lines = split_lines(ours)
+    theirs_lines = split_lines(theirs)
+
+    ids: dict[str, int] = {}
+    base_ids = [ids.setdefault(line, len(ids)) for line in base_lines]
+    ours_ids = [ids.setdefault(line, len(ids)) for line in ours_lines]
+    theirs_ids = [ids.setdefault(line, len(ids)) for line in theirs_lines]
+
+    script_ours = diff_hashes(base_ids, ours_ids)
+    if not script_ours:
+        return True, theirs
+    script_theirs = diff_hashes(base_ids, theirs_ids)
+    if not script_theirs:
+        return True, ours
+
+    hunks = _combine_scripts(script_ours, script_theirs, ours_ids, theirs_ids, len(base_ids))
+    _refine_conflicts(hunks, ours_ids, theirs_ids)
+    hunks = _simplify_non_conflicts(hunks, ours_lines)
+
+    merged = _render(hunks, ours_lines, theirs_lines, labels, marker_size)
+    conflicts = sum(1 for hunk in hunks if hunk[0] == CONFLICT)
+    return conflicts == 0, merged
+
+
+def split_lines(content: str) -> list[str]:
+    """Splits content into records that keep their trailing newline, like xdiff."""
+    if not content:
+        return []
+    lines = [f"{line}\n" for line in content.split("\n")]
+    last = lines.pop()
+    if last != "\n":
+        lines.append(last[:-1])
+    return lines
+
+
+def diff_hashes(recs1: list[int], recs2: list[int]) -> list[tuple[int, int, int, int]]:
+    """
+    Diffs two hash sequences the way xdl_do_diff + xdl_change_compact do.
+    Returns hunks as (start1, start2, count1, count2).
+    """
+    n1, n2 = len(recs1), len(recs2)
+    # One spare slot on each end; index -1 wraps onto the trailing zero.
+    rchg1 = bytearray(n1 + 2)
+    rchg2 = bytearray(n2 + 2)
+
+    ha1, rindex1, ha2, rindex2 = _prepare(recs1, recs2, rchg1, rchg2)
+    if ha1 or ha2:
+        _compare(ha1, rindex1, rchg1, ha2, rindex2, rchg2)
+
+    _compact(recs1, rchg1, rchg2)
+    _compact(recs2, rchg2, rchg1)
+    return _build_script(rchg1, n1, rchg2, n2)
+
+
+def _bogosqrt(n: int) -> int:
+    i = 1
+    while n > 0:
+        i <<= 1
+        n >>= 2
+    return i
+
+
+def _prepare(recs1, recs2, rchg1, rchg2):
+    """Port of xdl_trim_ends + xdl_cleanup_records."""
+    n1, n2 = len(recs1), len(recs2)
+    limit = min(n1, n2)
+    start = 0
+    while start < limit and recs1[start] == recs2[start]:
+        start += 1
+    limit -= start
+    tail = 0
+    while tail < limit and recs1[n1 - 1 - tail] == recs2[n2 - 1 - tail]:
+        tail += 1
+    end1 = n1 - tail - 1
+    end2 = n2 - tail - 1
+
+    count1 = Counter(recs1)
+    count2 = Counter(recs2)
+    dis1 = _discard_marks(recs1, start, end1, count2, min(_bogosqrt(n1), MAX_EQLIMIT))
+    dis2 = _discard_marks(recs2, start, end2, count1, min(_bogosqrt(n2), MAX_EQLIMIT))
+
+    ha1, rindex1 = _keep_records(recs1, dis1, start, end1, rchg1)
+    ha2, rindex2 = _keep_records(recs2, dis2, start, end2, rchg2)
+    return ha1, rindex1, ha2, rindex2
+
+
+def _discard_marks(recs, start, end, other_counts, limit) -> bytearray:
+    dis = bytearray(len(recs) + 1)
+    for i in range(start, end + 1):
+        matches = other_counts.get(recs[i], 0)
+        dis[i] = 0 if matches == 0 else (2 if matches >= limit else 1)
+    return dis
+
+
+def _keep_records(recs, dis, start, end, rchg):
+    ha: list[int] = []
+    rindex: list[int] = []
+    for i in range(start, end + 1):
+        if dis[i] == 1 or (dis[i] == 2 and not _clean_mmatch(dis, i, start, end)):
+            rindex.append(i)
+            ha.append(recs[i])
+        else:
+            rchg[i] = 1
+    return ha, rindex
+
+
+def _clean_mmatch(dis, i, start, end) -> bool:
+    if i - start > SIMSCAN_WINDOW:
+        start = i - SIMSCAN_WINDOW
+    if end - i > SIMSCAN_WINDOW:
+        end = i + SIMSCAN_WINDOW
+
+    r, rdis0, rpdis0 = 1, 0, 1
+    while i - r >= start:
+        if not dis[i - r]:
+            rdis0 += 1
+        elif dis[i - r] == 2:
+            rpdis0 += 1
+        else:
+            break
+        r += 1
+    if rdis0 == 0:
+        return False
+
+    r, rdis1, rpdis1 = 1, 0, 1
+    while i + r <= end:
+        if not dis[i + r]:
+            rdis1 += 1
+        elif dis[i + r] == 2:
+            rpdis1 += 1
+        else:
+            break
+        r += 1
+    if rdis1 == 0:
+        return False
+
+    rdis1 += rdis0
+    rpdis1 += rpdis0
+    return rpdis1 * KPDIS_RUN < rpdis1 + rdis1
+
+
+def _compare(ha1, rindex1, rchg1, ha2, rindex2, rchg2):
+    """Port of xdl_recs_cmp, using an explicit stack instead of recursion."""
+    nreff1, nreff2 = len(ha1), len(ha2)
+    ndiags = nreff1 + nreff2 + 3
+    koff = nreff2 + 1
+    kvdf = [0] * ndiags
+    kvdb = [0] * ndiags
+    mxcost = max(_bogosqrt(ndiags), MAX_COST_MIN)
+
+    pending = [(0, nreff1, 0, nreff2, False)]
+    while pending:
+        off1, lim1, off2, lim2, need_min = pending.pop()
+
+        while off1 < lim1 and off2 < lim2 and ha1[off1] == ha2[off2]:
+            off1 += 1
+            off2 += 1
+        while off1 < lim1 and off2 < lim2 and ha1[lim1 - 1] == ha2[lim2 - 1]:
+            lim1 -= 1
+            lim2 -= 1
+
+        if off1 == lim1:
+            for i in range(off2, lim2):
+                rchg2[rindex2[i]] = 1
+        elif off2 == lim2:
+            for i in range(off1, lim1):
+                rchg1[rindex1[i]] = 1
+        else:
+            i1, i2, min_lo, min_hi = _split(
+                ha1, off1, lim1, ha2, off2, lim2, kvdf, kvdb, koff, need_min, mxcost
+            )
+            pending.append((i1, lim1, i2, lim2, min_hi))
+            pending.append((off1, i1, off2, i2, min_lo))
+
+
+def _split(ha1, off1, lim1, ha2, off2, lim2, kvdf, kvdb, koff, need_min, mxcost):
+    """Port of xdl_split: finds the middle snake (or a heuristic cut point)."""
+    dmin, dmax = off1 - lim2, lim1 - off2
+    fmid, bmid = off1 - off2, lim1 - lim2
+    odd = (fmid - bmid) & 1
+    fmin = fmax = fmid
+    bmin = bmax = bmid
+
+    kvdf[fmid + koff] = off1
+    kvdb[bmid + koff] = lim1
+
+    ec = 0
+    while True:
+        ec += 1
+        got_snake = False
+
+        if fmin > dmin:
+            fmin -= 1
+            kvdf[fmin - 1 + koff] = -1
+        else:
+            fmin += 1
+        if fmax < dmax:
+            fmax += 1
+            kvdf[fmax + 1 + koff] = -1
+        else:
+            fmax -= 1
+
+        for d in range(fmax, fmin - 1, -2):
+            if kvdf[d - 1 + koff] >= kvdf[d + 1 + koff]:
+                i1 = kvdf[d - 1 + koff] + 1
+            else:
+                i1 = kvdf[d + 1 + koff]
+            prev1 = i1
+            i2 = i1 - d
+            while i1 < lim1 and i2 < lim2 and ha1[i1] == ha2[i2]:
+                i1 += 1
+                i2 += 1
+            if i1 - prev1 > SNAKE_CNT:
+                got_snake = True
+            kvdf[d + koff] = i1
+            if odd and bmin <= d <= bmax and kvdb[d + koff] <= i1:
+                return i1, i2, True, True
+
+        if bmin > dmin:
+            bmin -= 1
+            kvdb[bmin - 1 + koff] = LINE_MAX
+        else:
+            bmin += 1
+        if bmax < dmax:
+            bmax += 1
+            kvdb[bmax + 1 + koff] = LINE_MAX
+        else:
+            bmax -= 1
+
+        for d in range(bmax, bmin - 1, -2):
+            if kvdb[d - 1 + koff] < kvdb[d + 1 + koff]:
+                i1 = kvdb[d - 1 + koff]
+            else:
+                i1 = kvdb[d + 1 + koff] - 1
+            prev1 = i1
+            i2 = i1 - d
+            while i1 > off1 and i2 > off2 and ha1[i1 - 1] == ha2[i2 - 1]:
+                i1 -= 1
+                i2 -= 1
+            if prev1 - i1 > SNAKE_CNT:
+                got_snake = True
+            kvdb[d + koff] = i1
+            if not odd and fmin <= d <= fmax and i1 <= kvdf[d + koff]:
+                return i1, i2, True, True
+
+        if need_min:
+            continue
+
+        if got_snake and ec > HEUR_MIN_COST:
+            best = 0
+            cut = None
+            for d in range(fmax, fmin - 1, -2):
+                dd = d - fmid if d > fmid else fmid - d
+                i1 = kvdf[d + koff]
+                i2 = i1 - d
+                v = (i1 - off1) + (i2 - off2) - dd
+                if (
+                    v > K_HEUR * ec and v > best
+                    and off1 + SNAKE_CNT <= i1 < lim1
+                    and off2 + SNAKE_CNT <= i2 < lim2
+                ):
+                    k = 1
+                    while ha1[i1 - k] == ha2[i2 - k]:
+                        if k == SNAKE_CNT:
+                            best = v
+                            cut = (i1, i2)
+                            break
+                        k += 1
+            if best > 0:
+                return cut[0], cut[1], True, False
+
+            best = 0
+            for d in range(bmax, bmin - 1, -2):
+                dd = d - bmid if d > bmid else bmid - d
+                i1 = kvdb[d + koff]
+                i2 = i1 - d
+                v = (lim1 - i1) + (lim2 - i2) - dd
+                if (
+                    v > K_HEUR * ec and v > best
+                    and off1 < i1 <= lim1 - SNAKE_CNT
+                    and off2 < i2 <= lim2 - SNAKE_CNT
+                ):
+                    k = 0
+                    while ha1[i1 + k] == ha2[i2 + k]:
+                        if k == SNAKE_CNT - 1:
+                            best = v
+                            cut = (i1, i2)
+                            break
+                        k += 1
+            if best > 0:
+                return cut[0], cut[1], False, True
+
+        if ec >= mxcost:
+            fbest = fbest1 = -1
+            for d in range(fmax, fmin - 1, -2):
+                i1 = min(kvdf[d + koff], lim1)
+                i2 = i1 - d
+                if lim2 < i2:
+                    i1, i2 = lim2 + d, lim2
+                if fbest < i1 + i2:
+                    fbest = i1 + i2
+                    fbest1 = i1
+
+            bbest = bbest1 = LINE_MAX
+            for d in range(bmax, bmin - 1, -2):
+                i1 = max(off1, kvdb[d + koff])
+                i2 = i1 - d
+                if i2 < off2:
+                    i1, i2 = off2 + d, off2
+                if i1 + i2 < bbest:
+                    bbest = i1 + i2
+                    bbest1 = i1
+
+            if (lim1 + lim2) - bbest < fbest - (off1 + off2):
+                return fbest1, fbest - fbest1, True, False
+            return bbest1, bbest - bbest1, False, True
+
+
+def _compact(recs, rchg, other_rchg):
+    """Port of xdl_change_compact without the indent heuristic (merge-file default)."""
+    nrec = len(recs)
+    g_start = g_end = 0
+    while rchg[g_end]:
+        g_end += 1
+    go_start = go_end = 0
+    while other_rchg[go_end]:
+        go_end += 1
+
+    while True:
+        if g_end != g_start:
+            while True:
+                groupsize = g_end - g_start
+                end_matching_other = -1
+
+                # Shift the group backward as much as possible.
+                while g_start > 0 and recs[g_start - 1] == recs[g_end - 1]:
+                    g_start -= 1
+                    rchg[g_start] = 1
+                    g_end -= 1
+                    rchg[g_end] = 0
+                    while rchg[g_start - 1]:
+                        g_start -= 1
+                    go_end = go_start - 1
+                    go_start = go_end
+                    while other_rchg[go_start - 1]:
+                        go_start -= 1
+
+                earliest_end = g_end
+                if go_end > go_start:
+                    end_matching_other = g_end
+
+                # Now shift the group forward as far as possible.
+                while g_end < nrec and recs[g_start] == recs[g_end]:
+                    rchg[g_start] = 0
+                    g_start += 1
+                    rchg[g_end] = 1
+                    g_end += 1
+                    while rchg[g_end]:
+                        g_end += 1
+                    go_start = go_end + 1
+                    go_end = go_start
+                    while other_rchg[go_end]:
+                        go_end += 1
+                    if go_end > go_start:
+                        end_matching_other = g_end
+
+                if groupsize == g_end - g_start:
+                    break
+
+            if g_end != earliest_end and end_matching_other != -1:
+                # Line the group back up with the last change in the other file.
+                while go_end == go_start:
+                    g_start -= 1
+                    rchg[g_start] = 1
+                    g_end -= 1
+                    rchg[g_end] = 0
+                    while rchg[g_start - 1]:
+                        g_start -= 1
+                    go_end = go_start - 1
+                    go_start = go_end
+                    while other_rchg[go_start - 1]:
+                        go_start -= 1
+
+        if g_end == nrec:
+            break
+        g_start = g_end + 1
+        g_end = g_start
+        while rchg[g_end]:
+            g_end += 1
+        go_start = go_end + 1
+        go_end = go_start
+        while other_rchg[go_end]:
+            go_end += 1
+
+
+def _build_script(rchg1, n1, rchg2, n2):
+    script = []
+    i1, i2 = n1, n2
+    while i1 >= 0 or i2 >= 0:
+        if rchg1[i1 - 1] or rchg2[i2 - 1]:
+            l1, l2 = i1, i2
+            while rchg1[i1 - 1]:
+                i1 -= 1
+            while rchg2[i2 - 1]:
+                i2 -= 1
+            script.append((i1, i2, l1 - i1, l2 - i2))
+        i1 -= 1
+        i2 -= 1
+    script.reverse()
+    return script
+
+
+def _append_hunk(hunks, mode, i0, chg0, i1, chg1, i2, chg2):
+    if hunks:
+        last = hunks[-1]
+        if i1 <= last[3] + last[4] or i2 <= last[5] + last[6]:
+            if mode != last[0]:
+                last[0] = CONFLICT
+            last[2] = i0 + chg0 - last[1]
+            last[4] = i1 + chg1 - last[3]
+            last[6] = i2 + chg2 - last[5]
+            return
+    hunks.append([mode, i0, chg0, i1, chg1, i2, chg2])
+
+
+def _combine_scripts(script1, script2, ours_ids, theirs_ids, base_count):
+    """
+    Port of the hunk walk in xdl_do_merge. Hunks are
+    [mode, base_start, base_count, ours_start, ours_count, theirs_start, theirs_count].
+    """
+    hunks: list[list[int]] = []
+    p1 = p2 = 0
+    while p1 < len(script1) and p2 < len(script2):
+        a = script1[p1]
+        b = script2[p2]
+        if a[0] + a[2] < b[0]:
+            _append_hunk(hunks, FROM_OURS, a[0], a[2], a[1], a[3], b[1] - b[0] + a[0], a[2])
+            p1 += 1
+            continue
+        if b[0] + b[2] < a[0]:
+            _append_hunk(hunks, FROM_THEIRS, b[0], b[2], a[1] - a[0] + b[0], b[2], b[1], b[3])
+            p2 += 1
+            continue
+
+        if (
+            a[0] != b[0] or a[2] != b[2] or a[3] != b[3]
+            or ours_ids[a[1]:a[1] + a[3]] != theirs_ids[b[1]:b[1] + b[3]]
+        ):
+            off = a[0] - b[0]
+            ffo = off + a[2] - b[2]
+            i0, i1, i2 = a[0], a[1], b[1]
+            if off > 0:
+                i0 -= off
+                i1 -= off
+            else:
+                i2 += off
+            chg0 = a[0] + a[2] - i0
+            chg1 = a[1] + a[3] - i1
+            chg2 = b[1] + b[3] - i2
+            if ffo < 0:
+                chg0 -= ffo
+                chg1 -= ffo
+            else:
+                chg2 += ffo
+            _append_hunk(hunks, CONFLICT, i0, chg0, i1, chg1, i2, chg2)
+
+        end1 = a[0] + a[2]
+        end2 = b[0] + b[2]
+        if end1 >= end2:
+            p2 += 1
+        if end2 >= end1:
+            p1 += 1
+
+    ours_delta = len(ours_ids) - base_count
+    theirs_delta = len(theirs_ids) - base_count
+    for a in script1[p1:]:
+        _append_hunk(hunks, FROM_OURS, a[0], a[2], a[1], a[3], a[0] + theirs_delta, a[2])
+    for b in script2[p2:]:
+        _append_hunk(hunks, FROM_THEIRS, b[0], b[2], b[0] + ours_delta, b[2], b[1], b[3])
+    return hunks
+
+
+def _refine_conflicts(hunks, ours_ids, theirs_ids):
+    """Port of xdl_refine_conflicts: narrows conflicts to where the sides differ."""
+    index = 0
+    while index < len(hunks):
+        hunk = hunks[index]
+        index += 1
+        if hunk[0] != CONFLICT or hunk[4] == 0 or hunk[6] == 0:
+            continue
+
+        i1, i2 = hunk[3], hunk[5]
+        script = diff_hashes(ours_ids[i1:i1 + hunk[4]], theirs_ids[i2:i2 + hunk[6]])
+        if not script:
+            hunk[0] = IDENTICAL
+            continue
+
+        first = script[0]
+        hunk[3], hunk[4], hunk[5], hunk[6] = first[0] + i1, first[2], first[1] + i2, first[3]
+        for extra in script[1:]:
+            hunks.insert(index, [CONFLICT, hunk[1], hunk[2], extra[0] + i1, extra[2], extra[1] + i2, extra[3]])
+            index += 1
+
+
+def _has_alnum(lines) -> bool:
+    return any(ch.isascii() and ch.isalnum() for line in lines for ch in line)
+
+
+def _simplify_non_conflicts(hunks, ours_lines):
+    """Port of xdl_simplify_non_conflicts (ALNUM level): folds short gaps into conflicts."""
+    merged: list[list[int]] = []
+    for hunk in hunks:
+        if merged:
+            last = merged[-1]
+            begin = last[3] + last[4]
+            end = hunk[3]
+            if last[0] == CONFLICT and hunk[0] == CONFLICT and (
+                end - begin <= 3 or not _has_alnum(ours_lines[begin:end])
+            ):
+                last[4] = hunk[3] + hunk[4] - last[3]
+                last[6] = hunk[5] + hunk[6] - last[5]
+                continue
+        merged.append(hunk)
+    return merged
+
+
+def _with_newline(lines: list[str]) -> list[str]:
+    if lines and not lines[-1].endswith("\n"):
+        return lines[:-1] + [f"{lines[-1]}\n"]
+    return lines
+
+
+def _render(hunks, ours_lines, theirs_lines, labels, marker_size) -> str:
+    ours_label, _, theirs_label = labels
+    out: list[str] = []
+    pos = 0
+    for mode, _i0, _chg0, i1, chg1, i2, chg2 in hunks:
+        if mode == CONFLICT:
+            out.extend(ours_lines[pos:i1])
+            out.append("<" * marker_size + (f" {ours_label}" if ours_label else "") + "\n")
+            out.extend(_with_newline(ours_lines[i1:i1 + chg1]))
+            out.append("=" * marker_size + "\n")
+            out.extend(_with_newline(theirs_lines[i2:i2 + chg2]))
+            out.append(">" * marker_size + (f" {theirs_label}" if theirs_label else "") + "\n")
+        elif mode & (FROM_OURS | FROM_THEIRS):
+            out.extend(ours_lines[pos:i1])
+            if mode & FROM_OURS:
+                out.extend(ours_lines[i1:i1 + chg1])
+            if mode & FROM_THEIRS:
+                out.extend(theirs_lines[i2:i2 + chg2])
+        else:
+            continue
+        pos = i1 + chg1
+    out.extend(ours_lines[pos:])
+    return "".join(out)
@@ -1,9 +1,119 @@
+import atexit
+import hashlib
 import subprocess
+import sys
 import shutil
 import tempfile
+import threading
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 
+from . import diff3
+from .cache import LocalHashCache
+from .processes import ProcessRecord, finish_process, run_process, start_process
+from .profiling import PROFILE
+
+EMPTY_BLOB_OID = "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+NULL_OID = "0" * 40
+GITLINK_MODE = "160000"
+
+
+def blob_oid(data: bytes) -> str:
+    """Returns the git blob ID of data, as 'git hash-object' computes it without filters."""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class TreeModeMap:
+    """File modes and object IDs for every entry under a tree, loaded once with 'git ls-tree -r -z'."""
+    SYMLINK_MODE = "120000"
+    EXECUTABLE_MODE = "100755"
+    FILE_MODES = ("100644", EXECUTABLE_MODE, SYMLINK_MODE)
+
+    def __init__(self, tree_sha: str, modes: dict[str, str], oids: Optional[dict[str, str]] = None):
+        self.tree_sha = tree_sha
+        self.modes = modes
+        self.oids = oids or {}
+
+    @classmethod
+    def parse(cls, tree_sha: str, output: bytes) -> "TreeModeMap":
+        modes: dict[str, str] = {}
+        oids: dict[str, str] = {}
+        for record in output.split(b"\0"):
+            if not record:
+                continue
+            # Format: "<mode> <type> <sha>\t<path>"
+            meta, _, raw_path = record.partition(b"\t")
+            fields = meta.split()
+            if len(fields) < 3 or not raw_path:
+                continue
+            path = raw_path.decode("utf-8", errors="surrogateescape")
+            modes[path] = fields[0].decode("ascii")
+            oids[path] = fields[2].decode("ascii")
+        return cls(tree_sha, modes, oids)
+
+    def mode(self, path: str) -> Optional[str]:
+        return self.modes.get(path)
+
+    def oid(self, path: str) -> Optional[str]:
+        return self.oids.get(path)
+
+    def files(self) -> list[str]:
+        """Returns the paths of regular files and symlinks, skipping gitlinks."""
+        return [path for path, mode in self.modes.items() if mode in self.FILE_MODES]
+
+    def is_symlink(self, path: str) -> bool:
+        return self.modes.get(path) == self.SYMLINK_MODE
+
+    def is_executable(self, path: str) -> bool:
+        return self.modes.get(path) == self.EXECUTABLE_MODE
+
+
+def _content_oid(mode: str, oid: str) -> Optional[str]:
+    """Maps a diff side to the blob ID of the content chezmerge reads for it."""
+    if len(oid) != len(NULL_OID):
+        # Local files are hashed as SHA-1 blobs; other object formats cannot be compared.
+        return None
+    if oid == NULL_OID or mode == GITLINK_MODE:
+        # Missing sides and submodule entries both read as "".
+        return EMPTY_BLOB_OID
+    return oid
+
+
+@dataclass(frozen=True)
+class UpstreamChange:
+    """
+    One 'git diff --raw' entry between the recorded base commit and origin/HEAD.
+    For renames and copies, path is the destination and source_path the origin.
+    """
+    status: str
+    path: str
+    source_path: Optional[str] = None
+    old_mode: str = "000000"
+    new_mode: str = "000000"
+    old_oid: str = NULL_OID
+    new_oid: str = NULL_OID
+
+    @property
+    def base_oid(self) -> Optional[str]:
+        # A copy's base content is read from the destination, which did not exist.
+        if self.status == "C":
+            return None
+        return _content_oid(self.old_mode, self.old_oid)
+
+    @property
+    def latest_oid(self) -> Optional[str]:
+        return _content_oid(self.new_mode, self.new_oid)
+
+    @property
+    def is_symlink(self) -> bool:
+        return self.new_mode == TreeModeMap.SYMLINK_MODE
+
+    @property
+    def is_executable(self) -> bool:
+        return self.new_mode == TreeModeMap.EXECUTABLE_MODE
+
+
 class GitHandler:
     PULL_HOOKS_DIR = ".githooks"
     PULL_HOOK_NAMES = ("post-merge", "post-rewrite")
@@ -18,9 +128,22 @@ set -euo pipefail
 git submodule update --init --recursive .chezmerge-upstream || true
 """
 
-    def __init__(self, repo_path: Path):
+    MERGE_ENGINES = ("git", "python", "verify")
+
+    def __init__(self, repo_path: Path, merge_engine: str = "git"):
         self.repo_path = repo_path.resolve()
+        self.merge_engine = merge_engine
         self.upstream_path = self.repo_path / ".chezmerge-upstream"
+        self.cache_dir = self.repo_path / ".git" / "chezmerge-cache"
+        self._cat_file: Optional[subprocess.Popen] = None
+        self._cat_file_record: Optional[ProcessRecord] = None
+        self._cat_file_lock = threading.Lock()
+        self._partial_clone: Optional[bool] = None
+        self._base_rev: Optional[str] = None
+        self._close_registered = False
+        self._tree_modes: dict[tuple[str, str], TreeModeMap] = {}
+        self.local_hashes: Optional[LocalHashCache] = None
+        self._staging_queue: dict[str, None] = {}
 
     def ensure_pull_hooks(self):
         """
@@ -60,11 +183,9 @@ git submodule update --init --recursive .chezmerge-upstream || true
         hook_path.chmod(0o755)
 
     def _ensure_hooks_path_config(self):
-        result = subprocess.run(
+        result = run_process(
             ["git", "config", "--local", "--get", "core.hooksPath"],
             cwd=self.repo_path,
-            capture_output=True,
-            text=True
         )
         current = result.stdout.strip() if result.returncode == 0 else ""
         if current == self.PULL_HOOKS_DIR:
@@ -80,17 +201,12 @@ git submodule update --init --recursive .chezmerge-upstream || true
         strip: bool = True,
         text: bool = True,
         quiet_failure: bool = False,
+        input=None,
     ):
         """Executes a git command."""
         target_cwd = cwd if cwd else self.repo_path
         try:
-            result = subprocess.run(
-                ["git"] + args, 
-                cwd=target_cwd, 
-                capture_output=True, 
-                text=text, 
-                check=True
-            )
+            result = run_process(["git"] + args, cwd=target_cwd, input=input, text=text, check=True)
             stdout = result.stdout
             if text:
                 return stdout.strip() if strip else stdout
@@ -109,11 +225,9 @@ git submodule update --init --recursive .chezmerge-upstream || true
     def is_submodule_registered(self) -> bool:
         """Checks if the upstream submodule is tracked by the parent repository."""
         rel_path = str(self.upstream_path.relative_to(self.repo_path))
-        result = subprocess.run(
+        result = run_process(
             ["git", "submodule", "status", "--", rel_path],
             cwd=self.repo_path,
-            capture_output=True,
-            text=True
         )
         return result.returncode == 0 and bool(result.stdout.strip())
 
@@ -148,14 +262,42 @@ git submodule update --init --recursive .chezmerge-upstream || true
 
         return None
 
-    def init_workspace(self, remote_url: str):
-        """Sets up the .chezmerge-upstream submodule."""
+    def init_workspace(self, remote_url: str, partial_clone: bool = False, inner_path: str = ""):
+        """
+        Sets up the .chezmerge-upstream submodule.
+
+        With partial_clone, the upstream is cloned with --filter=blob:none and
+        only its default branch, and checked out only once the sparse cone for
+        inner_path is set, so blobs outside inner_path are fetched on demand.
+        """
         # Ensure main repo is initialized
         if not (self.repo_path / ".git").exists():
             self.run_git(["init"])
         rel_path = str(self.upstream_path.relative_to(self.repo_path))
 
-        if self.is_submodule_registered():
+        if partial_clone:
+            registered = self.is_submodule_registered()
+            if registered:
+                print(f"Initializing existing submodule at {rel_path} (partial clone)...")
+            else:
+                print(f"Adding submodule {remote_url} (partial clone)...")
+            # Neither 'submodule add' nor 'submodule update' can filter and check out
+            # sparsely, so clone without a checkout, limit the worktree, check out,
+            # then register the repository and move its git directory under
+            # .git/modules as they would.
+            self.run_git([
+                "-c", "protocol.file.allow=always", "clone", "--quiet", "--filter=blob:none",
+                "--single-branch", "--no-tags", "--no-checkout", remote_url, rel_path,
+            ])
+            self.ensure_sparse_checkout(inner_path)
+            if registered:
+                self.run_git(["submodule", "init", "--", rel_path])
+                self.run_git(["checkout", "--quiet", self.get_base_rev()], cwd=self.upstream_path)
+            else:
+                self.run_git(["checkout", "--quiet"], cwd=self.upstream_path)
+                self.run_git(["-c", "protocol.file.allow=always", "submodule", "add", remote_url, rel_path])
+            self.run_git(["submodule", "absorbgitdirs", rel_path])
+        elif self.is_submodule_registered():
             print(f"Initializing existing submodule at {rel_path}...")
             self.run_git(["-c", "protocol.file.allow=always", "submodule", "update", "--init", rel_path])
         else:
@@ -167,29 +309,190 @@ git submodule update --init --recursive .chezmerge-upstream || true
         self.run_git(["config", "protocol.file.allow", "always"], cwd=self.upstream_path)
 
     def fetch_latest(self):
-        """Updates the submodule's remote tracking branch."""
-        self.run_git(["fetch", "origin"], cwd=self.upstream_path)
+        """Updates the submodule's remote tracking branch (skipping tags for partial clones)."""
+        args = ["fetch", "origin"]
+        if self.is_partial_clone():
+            args.append("--no-tags")
+        self.run_git(args, cwd=self.upstream_path)
+        # Make the next blob read see the fetched refs and packs.
+        self.close()
+
+    def ensure_sparse_checkout(self, inner_path: str):
+        """
+        Limits the submodule worktree to inner_path with a cone-mode sparse
+        checkout, or restores the full tree when inner_path is empty.
+        Only the worktree is affected; diffs and blob reads use the object store.
+        """
+        normalized_inner = inner_path.strip("/")
+        try:
+            current = self.run_git(["sparse-checkout", "list"], cwd=self.upstream_path, quiet_failure=True)
+        except subprocess.CalledProcessError:
+            # Not sparse yet (or a git without sparse-checkout support).
+            current = None
+
+        if not normalized_inner:
+            if current is not None:
+                self.run_git(["sparse-checkout", "disable"], cwd=self.upstream_path)
+            return
+        if current == normalized_inner:
+            return
+
+        try:
+            self.run_git(
+                ["sparse-checkout", "set", "--cone", "--", normalized_inner],
+                cwd=self.upstream_path,
+                quiet_failure=True,
+            )
+        except subprocess.CalledProcessError as e:
+            print(f"Warning: could not limit {self.upstream_path.name} to {normalized_inner}: {e.stderr.strip()}")
+
+    def is_partial_clone(self) -> bool:
+        """Returns True when the upstream clone fetches missing objects from origin on demand."""
+        if self._partial_clone is None:
+            try:
+                promisor = self.run_git(
+                    ["config", "--get", "remote.origin.promisor"],
+                    cwd=self.upstream_path,
+                    quiet_failure=True,
+                )
+            except (subprocess.CalledProcessError, FileNotFoundError, NotADirectoryError):
+                promisor = ""
+            self._partial_clone = promisor == "true"
+        return self._partial_clone
+
+    def prefetch_blobs(self, oids: list[Optional[str]]):
+        """
+        In a partial clone, fetches whichever of oids are missing in one request,
+        instead of letting cat-file fault them in from origin one at a time.
+        """
+        if not self.is_partial_clone():
+            return
+        wanted = {oid for oid in oids if oid and oid not in (NULL_OID, EMPTY_BLOB_OID)}
+        if not wanted:
+            return
+
+        # --missing=print lists absent blobs of both trees without fetching them.
+        output = self.run_git(
+            ["rev-list", "--objects", "--missing=print", "--no-walk", self.get_base_rev(), "origin/HEAD"],
+            cwd=self.upstream_path,
+        )
+        missing = sorted(
+            line[1:] for line in output.splitlines() if line.startswith("?") and line[1:] in wanted
+        )
+        if not missing:
+            return
+
+        PROFILE.count("blobs_prefetched", len(missing))
+        self.run_git(
+            [
+                "-c", "fetch.negotiationAlgorithm=noop",
+                "fetch", "origin", "--no-tags", "--no-write-fetch-head",
+                "--recurse-submodules=no", "--filter=blob:none", "--stdin",
+            ],
+            cwd=self.upstream_path,
+            input="\n".join(missing) + "\n",
+        )
+        # The running cat-file process does not see the new pack until restarted.
+        self.close()
+
+    def get_base_rev(self) -> str:
+        """
+        Returns the upstream commit recorded for the submodule in the index, which
+        is the merge base. The submodule HEAD is only used when nothing is recorded
+        yet, since the worktree may lag behind the recorded commit.
+        """
+        if self._base_rev is None:
+            rel_path = str(self.upstream_path.relative_to(self.repo_path))
+            entry = self.get_index_entry(rel_path)
+            if entry and entry["mode"] == GITLINK_MODE:
+                self._base_rev = entry["sha"]
+            else:
+                self._base_rev = self.get_head_rev("HEAD")
+        return self._base_rev
 
     def get_head_rev(self, ref: str = "HEAD") -> str:
         """Gets the SHA for a ref in the submodule."""
         return self.run_git(["rev-parse", ref], cwd=self.upstream_path)
 
+    def get_source_tree(self) -> str:
+        """Returns the tree ID of the parent repository's HEAD, or "" before the first commit."""
+        try:
+            return self.run_git(["rev-parse", "--verify", "HEAD^{tree}"], quiet_failure=True)
+        except subprocess.CalledProcessError:
+            return ""
+
     def get_file_content(self, source: str, path: str) -> str:
         """
         Reads file content. 
         source: 'base', 'latest', or 'local'
         """
-        if source == 'local':
-            p = self.repo_path / path
-            return p.read_bytes().decode("utf-8", errors="surrogateescape") if p.exists() else ""
-        
-        # For base/latest, read from the submodule
-        # 'base' is the currently checked out commit in the submodule
-        # 'latest' is the remote HEAD
-        ref = "HEAD" if source == "base" else "origin/HEAD"
+        return self.get_file_contents([(source, path)])[0]
+
+    def get_file_contents(self, requests: list[tuple[str, str]]) -> list[str]:
+        """
+        Reads many files at once. Each request is a (source, path) pair using the
+        same sources as get_file_content; results are returned in request order.
+
+        Upstream blobs are streamed through one long-lived 'git cat-file --batch'
+        process instead of spawning 'git show' per file. Missing objects are "".
+        """
+        results = [""] * len(requests)
+        pending: list[tuple[int, str]] = []
+        for index, (source, path) in enumerate(requests):
+            if source == 'local':
+                p = self.repo_path / path
+                results[index] = p.read_bytes().decode("utf-8", errors="surrogateescape") if p.exists() else ""
+                continue
+
+            # For base/latest, read from the submodule
+            # 'base' is the upstream commit recorded in the parent repository
+            # 'latest' is the remote HEAD
+            ref = self.get_base_rev() if source == "base" else "origin/HEAD"
+            object_name = f"{ref}:{path}"
+            if "\n" in object_name:
+                # cat-file --batch is line-oriented; fall back for such names.
+                results[index] = self._show_object(object_name)
+                continue
+            pending.append((index, object_name))
+
+        if pending:
+            blobs = self._read_objects([name for _, name in pending])
+            for (index, object_name), blob in zip(pending, blobs):
+                if blob is None:
+                    results[index] = self._show_object(object_name) if blob is False else ""
+                    continue
+                results[index] = blob.decode("utf-8", errors="surrogateescape")
+        return results
+
+    def read_blobs(self, oids: list[str]) -> list[Optional[bytes]]:
+        """
+        Reads upstream blobs by object ID through the shared cat-file process,
+        in request order. Missing objects are None.
+        """
+        results = self._read_objects(oids)
+        for index, blob in enumerate(results):
+            if blob is not False:
+                continue
+            try:
+                results[index] = self.run_git(
+                    ["cat-file", "blob", oids[index]],
+                    cwd=self.upstream_path,
+                    text=False,
+                    quiet_failure=True,
+                )
+            except subprocess.CalledProcessError:
+                results[index] = None
+        return results
+
+    def close(self):
+        """Stops the long-lived cat-file process, if one is running."""
+        with self._cat_file_lock:
+            self._stop_cat_file()
+
+    def _show_object(self, object_name: str) -> str:
         try:
             raw = self.run_git(
-                ["show", f"{ref}:{path}"],
+                ["show", object_name],
                 cwd=self.upstream_path,
                 strip=False,
                 text=False,
@@ -199,6 +502,91 @@ git submodule update --init --recursive .chezmerge-upstream || true
         except subprocess.CalledProcessError:
             return ""
 
+    def _read_objects(self, object_names: list[str]) -> list:
+        """
+        Streams object_names through 'git cat-file --batch'.
+        Returns bytes for blobs, None for missing or non-blob objects, and False
+        for names that could not be read because the process went away.
+        """
+        results: list = [False] * len(object_names)
+        PROFILE.count("blobs_read", len(object_names))
+        with PROFILE.phase("blob_reads"), self._cat_file_lock:
+            proc = self._ensure_cat_file()
+            if proc is None:
+                return results
+
+            payload = b"".join(
+                name.encode("utf-8", errors="surrogateescape") + b"\n" for name in object_names
+            )
+            record = self._cat_file_record
+            record.bytes_in += len(payload)
+            # Feed requests from a separate thread so a large batch cannot deadlock
+            # against git blocking on a full stdout pipe.
+            writer = threading.Thread(target=self._feed_cat_file, args=(proc, payload), daemon=True)
+            writer.start()
+            try:
+                for index in range(len(object_names)):
+                    header = proc.stdout.readline()
+                    if not header:
+                        self._stop_cat_file()
+                        break
+
+                    # Format: "<oid> <type> <size>" or "<name> missing|ambiguous"
+                    fields = header.rstrip(b"\n").rsplit(b" ", 2)
+                    if len(fields) != 3 or not fields[2].isdigit():
+                        results[index] = None
+                        continue
+
+                    size = int(fields[2])
+                    data = proc.stdout.read(size + 1)[:size]
+                    record.bytes_out += len(header) + size + 1
+                    results[index] = data if fields[1] == b"blob" else None
+            finally:
+                writer.join()
+        return results
+
+    def _feed_cat_file(self, proc: subprocess.Popen, payload: bytes):
+        try:
+            proc.stdin.write(payload)
+            proc.stdin.flush()
+        except (BrokenPipeError, ValueError):
+            pass
+
+    def _ensure_cat_file(self) -> Optional[subprocess.Popen]:
+        if self._cat_file is not None and self._cat_file.poll() is None:
+            return self._cat_file
+        if not self.upstream_path.exists():
+            return None
+
+        self._cat_file, self._cat_file_record = start_process(
+            ["git", "cat-file", "--batch"],
+            cwd=self.upstream_path,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        if not self._close_registered:
+            atexit.register(self.close)
+            self._close_registered = True
+        return self._cat_file
+
+    def _stop_cat_file(self):
+        proc = self._cat_file
+        self._cat_file = None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+        try:
+            proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+        finish_process(proc, self._cat_file_record)
+
     def is_probably_binary_content(self, content: str) -> bool:
         """Heuristic: treat NULs or surrogateescaped bytes as binary content."""
         if "\x00" in content:
@@ -220,25 +608,96 @@ git submodule update --init --recursive .chezmerge-upstream || true
         first_field = output.split()[0] if output.split() else ""
         return first_field or None
 
-    def is_path_tracked(self, path: str) -> bool:
-        """Returns True when path exists in git index/history for this repo."""
-        result = subprocess.run(
-            ["git", "ls-files", "--error-unmatch", "--", path],
-            cwd=self.repo_path,
-            capture_output=True,
-            text=True
-        )
-        return result.returncode == 0
+    def get_tree_modes(self, ref: str = "origin/HEAD", inner_path: str = "") -> TreeModeMap:
+        """
+        Returns the modes of all files under inner_path at ref, read with a single
+        'git ls-tree' and cached per tree SHA for the lifetime of this handler.
+        """
+        tree_sha = self.get_head_rev(f"{ref}^{{tree}}")
+        normalized_inner = inner_path.strip("/")
+        key = (tree_sha, normalized_inner)
+        cached = self._tree_modes.get(key)
+        if cached is not None:
+            return cached
+
+        args = ["ls-tree", "-r", "-z", tree_sha]
+        if normalized_inner:
+            args.extend(["--", normalized_inner])
+        output = self.run_git(args, cwd=self.upstream_path, text=False)
+        tree_modes = TreeModeMap.parse(tree_sha, output)
+        self._tree_modes[key] = tree_modes
+        return tree_modes
 
     def has_pending_changes(self) -> bool:
         """Returns True when the repository has staged, unstaged, or untracked changes."""
-        result = subprocess.run(
-            ["git", "status", "--porcelain"],
+        for line in self._status_lines():
+            # A clean upstream worktree whose HEAD lags behind the recorded commit
+            # is what recording a pointer without a checkout leaves, not a pending change.
+            recorded_sha = self._moved_upstream_checkout(line)
+            if recorded_sha and self._upstream_checkout_lags(recorded_sha):
+                continue
+            return True
+        return False
+
+    def upstream_checkout_is_only_change(self) -> bool:
+        """
+        Returns True when the only pending change is a clean upstream worktree
+        checked out at a commit other than the recorded one, e.g. after upstream
+        history was rewritten under a pointer recorded without a checkout.
+        """
+        lines = self._status_lines()
+        return len(lines) == 1 and self._moved_upstream_checkout(lines[0]) is not None
+
+    def _status_lines(self) -> list[str]:
+        result = run_process(
+            ["git", "status", "--porcelain=v2"],
             cwd=self.repo_path,
-            capture_output=True,
-            text=True
         )
-        return bool(result.stdout.strip())
+        return result.stdout.splitlines()
+
+    def _moved_upstream_checkout(self, line: str) -> Optional[str]:
+        """
+        Returns the recorded commit when a status line reports only that the clean
+        upstream worktree ("SC..") is checked out at another commit.
+        """
+        # "1 <XY> <sub> <mH> <mI> <mW> <hH> <hI> <path>"
+        fields = line.split(" ", 8)
+        rel_path = str(self.upstream_path.relative_to(self.repo_path))
+        if fields[:3] == ["1", ".M", "SC.."] and fields[-1] == rel_path:
+            return fields[7]
+        return None
+
+    def get_unstaged_paths(self) -> list[str]:
+        """
+        Returns the paths whose worktree differs from the index, untracked files
+        included, read with one 'git status'. Submodules are left out.
+        """
+        output = self.run_git(["status", "--porcelain=v2", "-z", "--untracked-files=all"], text=False)
+        paths: list[str] = []
+        records = iter(output.split(b"\0"))
+        for record in records:
+            if record.startswith(b"? "):
+                paths.append(record[2:].decode("utf-8", errors="surrogateescape"))
+                continue
+            # "1 <XY> <sub> ... <path>", or "2 <XY> <sub> ... <path>" followed by
+            # the original path as its own record.
+            kind = record[:1]
+            if kind not in (b"1", b"2"):
+                continue
+            fields = record.split(b" ", 9 if kind == b"2" else 8)
+            if kind == b"2":
+                next(records, None)
+            if fields[1][1:2] != b"." and not fields[2].startswith(b"S"):
+                paths.append(fields[-1].decode("utf-8", errors="surrogateescape"))
+        return paths
+
+    def _upstream_checkout_lags(self, recorded_sha: str) -> bool:
+        """Returns True when the submodule HEAD is an ancestor of recorded_sha."""
+        result = run_process(
+            ["git", "merge-base", "--is-ancestor", "HEAD", recorded_sha],
+            cwd=self.upstream_path,
+        )
+        return result.returncode == 0
 
     def restore_repo_to_head(self):
         """Restores tracked files and index entries to HEAD."""
@@ -251,11 +710,9 @@ git submodule update --init --recursive .chezmerge-upstream || true
 
     def get_index_entry(self, path: str) -> Optional[dict[str, str]]:
         """Returns the mode and blob SHA stored in the index for path, if present."""
-        result = subprocess.run(
+        result = run_process(
             ["git", "ls-files", "--stage", "--", path],
             cwd=self.repo_path,
-            capture_output=True,
-            text=True
         )
         if result.returncode != 0 or not result.stdout.strip():
             return None
@@ -269,53 +726,98 @@ git submodule update --init --recursive .chezmerge-upstream || true
                 return {"mode": mode, "sha": sha}
         return None
 
-    def get_upstream_changes(self, inner_path: str = "") -> list[tuple[str, str, Optional[str]]]:
+    def get_index_oids(self) -> dict[str, str]:
+        """Returns the blob SHA of every path in the index, read with one 'git ls-files'."""
+        output = self.run_git(["ls-files", "--stage", "-z"], text=False)
+        oids = {}
+        for record in output.split(b"\0"):
+            if not record:
+                continue
+            info, _, raw_path = record.partition(b"\t")
+            parts = info.split()
+            if len(parts) == 3 and parts[2] == b"0":
+                oids[raw_path.decode("utf-8", errors="surrogateescape")] = parts[1].decode("ascii")
+        return oids
+
+    def get_upstream_changes(self, inner_path: str = "") -> list[UpstreamChange]:
         """
-        Compares submodule HEAD and origin/HEAD and returns:
-        (status, path, source_path)
+        Compares the recorded base commit and origin/HEAD with 'git diff --raw -z -M',
+        limited to inner_path by pathspec.
 
-        For regular statuses (A/M/D), source_path is None.
-        For rename/copy statuses (R/C), path is destination and source_path is origin.
+        A rename across the inner_path boundary shows up in that diff as a
+        lone add or delete. When the diff has any, a rename-only diff of the
+        whole tree recovers the partners, so such moves are still reported as
+        renames with one side in scope.
         """
-        def _in_scope(path: str, normalized_inner: str) -> bool:
-            if not normalized_inner:
-                return True
-            prefix = f"{normalized_inner}/"
-            return path == normalized_inner or path.startswith(prefix)
+        normalized_inner = inner_path.strip("/")
+        prefix = f"{normalized_inner}/" if normalized_inner else ""
 
+        def in_scope(path: Optional[str]) -> bool:
+            return path is not None and (path == normalized_inner or path.startswith(prefix))
+
+        pathspec = [f":(literal){normalized_inner}"] if normalized_inner else []
         try:
-            output = self.run_git(["diff", "--name-status", "HEAD", "origin/HEAD"], cwd=self.upstream_path)
-            changes: list[tuple[str, str, Optional[str]]] = []
-            normalized_inner = inner_path.strip("/")
-            for line in output.splitlines():
-                if not line.strip():
-                    continue
-                parts = line.split("\t")
-                status = parts[0].strip()
-                if not status:
-                    continue
+            changes = self._diff_raw([], pathspec)
+            if not normalized_inner or not any(change.status in ("A", "D") for change in changes):
+                return changes
+
+            boundary_renames: dict[str, UpstreamChange] = {}
+            for change in self._diff_raw(["--diff-filter=R"], []):
+                if in_scope(change.source_path) != in_scope(change.path):
+                    # Key by the side that the scoped diff reported as an add or delete.
+                    key = change.path if in_scope(change.path) else change.source_path
+                    boundary_renames[key] = change
+        except subprocess.CalledProcessError:
+            return []
 
-                kind = status[0]
-                if kind in ("R", "C"):
-                    if len(parts) < 3:
-                        continue
-                    source_path = parts[1].strip()
-                    dest_path = parts[2].strip()
-                    if not source_path or not dest_path:
-                        continue
-                    if _in_scope(source_path, normalized_inner) or _in_scope(dest_path, normalized_inner):
-                        changes.append((kind, dest_path, source_path))
-                    continue
+        merged: list[UpstreamChange] = []
+        for change in changes:
+            if change.status in ("A", "D") and change.path in boundary_renames:
+                merged.append(boundary_renames.pop(change.path))
+            else:
+                merged.append(change)
+        return merged
+
+    def _diff_raw(self, options: list[str], pathspec: list[str]) -> list[UpstreamChange]:
+        output = self.run_git(
+            ["diff", "--raw", "-z", "--no-abbrev", "-M", *options, self.get_base_rev(), "origin/HEAD", "--", *pathspec],
+            cwd=self.upstream_path,
+            text=False,
+        )
 
-                if len(parts) < 2:
-                    continue
-                path = parts[1].strip()
-                if path and _in_scope(path, normalized_inner):
-                    changes.append((kind, path, None))
+        changes: list[UpstreamChange] = []
+        fields = iter(output.split(b"\0"))
+        for header in fields:
+            if not header.startswith(b":"):
+                continue
+            parts = header[1:].decode("ascii").split()
+            if len(parts) < 5:
+                continue
+            old_mode, new_mode, old_oid, new_oid, status = parts[:5]
+            kind = status[0]
+            source_path = None
+            if kind in ("R", "C"):
+                source_path = next(fields, b"").decode("utf-8", errors="surrogateescape")
+            path = next(fields, b"").decode("utf-8", errors="surrogateescape")
+            if not path or (kind in ("R", "C") and not source_path):
+                continue
+            changes.append(UpstreamChange(kind, path, source_path, old_mode, new_mode, old_oid, new_oid))
+        return changes
 
-            return changes
-        except subprocess.CalledProcessError:
-            return []
+    def get_local_oid(self, path: str) -> str:
+        """Returns the blob ID of a local source file; a missing file hashes like ""."""
+        try:
+            if self.local_hashes is not None:
+                return self.local_hashes.oid(path)
+            return blob_oid((self.repo_path / path).read_bytes())
+        except FileNotFoundError:
+            return EMPTY_BLOB_OID
+
+    def find_local_oid(self, path: Optional[str]) -> Optional[str]:
+        """Returns the blob ID of a local source file, or None when path is unset or missing."""
+        if not path or not (self.repo_path / path).exists():
+            return None
+        return self.get_local_oid(path)
 
     def write_local_file(self, path: str, content: str):
         """Writes file content preserving non-UTF8 bytes via surrogateescape."""
@@ -323,24 +825,51 @@ git submodule update --init --recursive .chezmerge-upstream || true
         target.parent.mkdir(parents=True, exist_ok=True)
         target.write_bytes(content.encode("utf-8", errors="surrogateescape"))
 
-    def update_base_pointer(self):
+    def update_base_pointer(self, checkout: bool = True):
         """Updates the submodule to match origin/HEAD and stages it in the main repo."""
         latest_sha = self.get_head_rev("origin/HEAD")
-        self.set_submodule_pointer(latest_sha)
+        self.set_submodule_pointer(latest_sha, checkout=checkout)
 
-    def set_submodule_pointer(self, sha: str):
-        """Checks out the upstream submodule at sha and stages the submodule pointer."""
-        self.run_git(["checkout", sha], cwd=self.upstream_path)
+    def set_submodule_pointer(self, sha: str, checkout: bool = True):
+        """
+        Stages sha as the recorded upstream commit. With checkout, the submodule
+        worktree is moved to sha first; without it, only the gitlink in the index
+        changes and the worktree catches up on the next 'git submodule update'
+        (which the pull hook runs).
+        """
         rel_path = str(self.upstream_path.relative_to(self.repo_path))
-        self.run_git(["add", rel_path])
+        if checkout:
+            self.run_git(["checkout", sha], cwd=self.upstream_path)
+            self.close()
+            self.run_git(["add", rel_path])
+        else:
+            self.run_git(["update-index", "--cacheinfo", f"{GITLINK_MODE},{sha},{rel_path}"])
+        self._base_rev = None
 
     def checkout_submodule(self, sha: str):
         """Checks out the upstream submodule worktree at sha without staging the pointer."""
         self.run_git(["checkout", sha], cwd=self.upstream_path)
+        self.close()
+
+    def queue_stage(self, path: str):
+        """Queues a file change to be staged by the next flush_staged() call."""
+        self._staging_queue[path] = None
 
-    def stage_file(self, path: str):
-        """Stages a file change in the main repository (add/update/delete)."""
-        self.run_git(["add", "-A", "--", path])
+    def flush_staged(self):
+        """
+        Stages every queued path with a single index update.
+        Paths are streamed NUL-delimited on stdin, so the batch is not bounded by
+        ARG_MAX; deleted paths are removed from the index and paths that were
+        never tracked are ignored.
+        """
+        if not self._staging_queue:
+            return
+
+        payload = b"".join(
+            path.encode("utf-8", errors="surrogateescape") + b"\0" for path in self._staging_queue
+        )
+        self._staging_queue.clear()
+        self.run_git(["update-index", "--add", "--remove", "-z", "--stdin"], text=False, input=payload)
 
     def restore_index_entry(self, path: str, mode: Optional[str], sha: Optional[str]):
         """Restores a single index entry to a previously recorded state."""
@@ -348,12 +877,9 @@ git submodule update --init --recursive .chezmerge-upstream || true
             self.run_git(["update-index", "--add", "--cacheinfo", f"{mode},{sha},{path}"])
             return
 
-        subprocess.run(
+        run_process(
             ["git", "rm", "--cached", "-q", "--ignore-unmatch", "--", path],
             cwd=self.repo_path,
-            capture_output=True,
-            text=True,
-            check=False
         )
 
     def commit(self, message: str):
@@ -362,7 +888,7 @@ git submodule update --init --recursive .chezmerge-upstream || true
 
     def find_last_chezmerge_commit(self) -> Optional[str]:
         """Returns the SHA of the most recent completed chezmerge merge commit."""
-        result = subprocess.run(
+        result = run_process(
             [
                 "git", "log",
                 "--format=%H",
@@ -370,8 +896,6 @@ git submodule update --init --recursive .chezmerge-upstream || true
                 "-n", "1",
             ],
             cwd=self.repo_path,
-            capture_output=True,
-            text=True
         )
         sha = result.stdout.strip()
         return sha or None
@@ -387,9 +911,35 @@ git submodule update --init --recursive .chezmerge-upstream || true
 
     def attempt_merge(self, base: str, ours: str, theirs: str) -> tuple[bool, str]:
         """
-        Attempts a 3-way merge using 'git merge-file'.
+        Attempts a 3-way merge.
         Returns (success, merged_content).
+
+        merge_engine selects the implementation:
+        'git' runs 'git merge-file'; 'python' uses the in-process diff3 engine and
+        only falls back to git for inputs it does not model; 'verify' runs both
+        and uses git's result (with a warning) whenever they disagree.
         """
+        PROFILE.count("merges")
+        with PROFILE.phase("merges"):
+            return self._attempt_merge(base, ours, theirs)
+
+    def _attempt_merge(self, base: str, ours: str, theirs: str) -> tuple[bool, str]:
+        if self.merge_engine == "git":
+            return self._merge_file(base, ours, theirs)
+
+        result = diff3.merge_texts(base, ours, theirs)
+        if result is None:
+            return self._merge_file(base, ours, theirs)
+        if self.merge_engine == "python":
+            return result
+
+        expected = self._merge_file(base, ours, theirs)
+        if result != expected:
+            print("Warning: in-process merge disagreed with git merge-file; using git's result.", file=sys.stderr)
+        return expected
+
+    def _merge_file(self, base: str, ours: str, theirs: str) -> tuple[bool, str]:
+        """Runs 'git merge-file' on temporary copies of the three versions."""
         with tempfile.NamedTemporaryFile(mode='wb+', delete=True) as f_base, \
              tempfile.NamedTemporaryFile(mode='wb+', delete=True) as f_ours, \
              tempfile.NamedTemporaryFile(mode='wb+', delete=True) as f_theirs:
@@ -404,9 +954,15 @@ git submodule update --init --recursive .chezmerge-upstream || true
 
             # git merge-file -p <current> <base> <other>
             # -p sends result to stdout, returns 0 on success, positive on conflict
-            res = subprocess.run(
-                ["git", "merge-file", "-p", f_ours.name, f_base.name, f_theirs.name],
-                capture_output=True
-            )
+            # Fixed labels and conflict style keep the output independent of temp
+            # file names and user config, so it is comparable with the diff3 engine.
+            labels = []
+            for label in diff3.DEFAULT_LABELS:
+                labels.extend(["-L", label])
+            argv = [
+                "git", "-c", "merge.conflictStyle=merge", "merge-file", "-p",
+                *labels, f_ours.name, f_base.name, f_theirs.name,
+            ]
+            res = run_process(argv, text=False)
             
             return (res.returncode == 0, res.stdout.decode("utf-8", errors="surrogateescape"))
@@ -1,5 +1,8 @@
 import shutil
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from .git_ops import GitHandler
 from .paths import chezmoify_path
 
 def import_upstream(source_dir: Path, target_dir: Path, inner_path: str = ""):
@@ -62,3 +65,73 @@ def import_upstream(source_dir: Path, target_dir: Path, inner_path: str = ""):
             # Copy content and metadata.
             shutil.copy2(item, dest)
         print(f"  Created: {chez_path}")
+
+def import_upstream_tree(
+    git: GitHandler,
+    target_dir: Path,
+    inner_path: str = "",
+    jobs: int = 1,
+    batch_size: int = 256,
+) -> tuple[int, int]:
+    """
+    Imports the files of the recorded upstream commit straight from the object store.
+
+    Paths and modes come from one 'git ls-tree -r -z', missing blobs of a
+    partial clone are fetched in one batch, blobs are streamed in batches
+    through the shared cat-file process, and files are written on a
+    bounded thread pool. Git trees only record executable and symlink modes,
+    so unlike import_upstream this never adds private_ or readonly_.
+    Returns (imported, skipped) and prints a single summary line.
+    """
+    print(f"Importing from {git.upstream_path} tree to {target_dir}...")
+
+    normalized_inner = inner_path.strip("/")
+    prefix = f"{normalized_inner}/" if normalized_inner else ""
+    tree = git.get_tree_modes(git.get_base_rev(), normalized_inner)
+    paths = [path for path in tree.files() if path.startswith(prefix)]
+    if normalized_inner and not paths:
+        raise FileNotFoundError(f"Upstream path {normalized_inner} does not exist")
+
+    imported = 0
+    skipped = 0
+    pending: deque[Future] = deque()
+    # In a partial clone, fetch every missing blob up front in one request.
+    git.prefetch_blobs([tree.oid(path) for path in paths])
+
+    def write_file(dest: Path, data: bytes):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        dest.write_bytes(data)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for start in range(0, len(paths), batch_size):
+            batch = paths[start:start + batch_size]
+            blobs = git.read_blobs([tree.oid(path) for path in batch])
+            for path, data in zip(batch, blobs):
+                is_symlink = tree.is_symlink(path)
+                chez_path = chezmoify_path(
+                    path[len(prefix):],
+                    executable=tree.is_executable(path),
+                    symlink=is_symlink,
+                )
+                # Skip files a local template already provides, as import_upstream does.
+                if data is None or (target_dir / (chez_path + ".tmpl")).exists():
+                    skipped += 1
+                    continue
+                if is_symlink and not data.endswith(b"\n"):
+                    # Chezmoi stores symlink targets as file contents.
+                    data += b"\n"
+                pending.append(pool.submit(write_file, target_dir / chez_path, data))
+                imported += 1
+
+            # Keep at most two batches of blobs in memory.
+            while len(pending) > 2 * batch_size:
+                pending.popleft().result()
+
+        while pending:
+            pending.popleft().result()
+
+    summary = f"Imported {imported} files"
+    if skipped:
+        summary += f" ({skipped} skipped)"
+    print(f"{summary}.")
+    return imported, skipped
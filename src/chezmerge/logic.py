@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import Optional
+from typing import Callable, Optional
 
 class MergeScenario(Enum):
     ALREADY_SYNCED = auto()  # Yours == Theirs
@@ -14,9 +14,25 @@ class MergeScenario(Enum):
 
 @dataclass
 class FileState:
-    content: str
+    """
+    One side of a merge. Content may be deferred to a loader; when both sides
+    of a comparison carry a blob ID, the IDs are compared instead of content.
+    """
+    content: Optional[str]
     path: str
     is_template: bool = False
+    oid: Optional[str] = None
+    loader: Optional[Callable[[], str]] = field(default=None, repr=False, compare=False)
+
+    def load(self) -> str:
+        if self.content is None:
+            self.content = self.loader() if self.loader else ""
+        return self.content
+
+    def same_as(self, other: "FileState") -> bool:
+        if self.oid is not None and other.oid is not None:
+            return self.oid == other.oid
+        return self.load() == other.load()
 
 class DecisionEngine:
     def analyze(self, base: FileState, theirs: FileState, ours: FileState, template: FileState) -> MergeScenario:
@@ -27,25 +43,25 @@ class DecisionEngine:
         if template.is_template:
             # Templates are merged based on source content, but we can skip
             # work entirely when the rendered output already matches upstream.
-            if ours.content == theirs.content:
+            if ours.same_as(theirs):
                 return MergeScenario.ALREADY_SYNCED
 
-            if template.content == base.content and theirs.content != base.content:
+            if template.same_as(base) and not theirs.same_as(base):
                 return MergeScenario.AUTO_UPDATE
 
-            if template.content != base.content and theirs.content == base.content:
+            if not template.same_as(base) and theirs.same_as(base):
                 return MergeScenario.AUTO_KEEP
 
             return MergeScenario.CONFLICT
 
         # 2. Standard 3-way merge logic for raw files
-        if ours.content == theirs.content:
+        if ours.same_as(theirs):
             return MergeScenario.ALREADY_SYNCED
         
-        if ours.content == base.content and theirs.content != base.content:
+        if ours.same_as(base) and not theirs.same_as(base):
             return MergeScenario.AUTO_UPDATE
             
-        if ours.content != base.content and theirs.content == base.content:
+        if not ours.same_as(base) and theirs.same_as(base):
             return MergeScenario.AUTO_KEEP
             
         return MergeScenario.CONFLICT
@@ -2,14 +2,30 @@ import sys
 import argparse
 import subprocess
 import os
+import secrets
+import time
+import cProfile
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
-from .logic import MergeItem, FileState, MergeScenario, DecisionEngine
-from .git_ops import GitHandler
-from .paths import find_local_match, chezmoify_path
-from .importer import import_upstream
+from .logic import MergeItem, MergeScenario
+from .git_ops import GitHandler, UpstreamChange
+from .paths import LocalSourceIndex, chezmoify_path
+from .planner import ActionKind, ChangePlanner, PlannedAction
+from .planfile import adopt_plan, plan_entry, plan_header, read_plan, verify_plan, write_plan
+from .importer import import_upstream, import_upstream_tree
+from .prefetch import PlanStore
 from .session import MergeSessionManager
+from .cache import AnalysisCache, LocalHashCache, RenderCache, chezmoi_template_context
+from .processes import run_process
+from .profiling import PROFILE
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return number
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Chezmerge: Intelligent Dotfile Merger")
@@ -20,18 +36,77 @@ def parse_args():
     parser.add_argument("--dry-run", action="store_true", help="Simulate merge logic without launching UI")
     parser.add_argument("--abort", action="store_true", help="Abort the current uncommitted chezmerge session")
     parser.add_argument("--undo-last", action="store_true", help="Revert the most recent committed chezmerge merge")
+    parser.add_argument(
+        "--merge-engine",
+        choices=GitHandler.MERGE_ENGINES,
+        default="git",
+        help="Three-way merge implementation: git merge-file, the in-process python engine, or verify (both)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=positive_int,
+        default=min(8, os.cpu_count() or 1),
+        help="Number of files to analyze concurrently (default: CPU count, up to 8)",
+    )
+    parser.add_argument(
+        "--import-from-tree",
+        action="store_true",
+        help="Initial import: stream files from the upstream git tree instead of copying the worktree",
+    )
+    parser.add_argument(
+        "--partial-clone",
+        action="store_true",
+        help="First run: clone upstream with --filter=blob:none and fetch only the blobs merges need",
+    )
+    parser.add_argument(
+        "--skip-upstream-checkout",
+        action="store_true",
+        help="Record the new upstream commit without checking out the submodule worktree",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore the caches in .git/chezmerge-cache and analyze everything from scratch",
+    )
+    parser.add_argument(
+        "--plan-out",
+        metavar="PLAN",
+        help="Write every planned action, with its paths, scenario and blob IDs, to PLAN as JSON Lines",
+    )
+    planned = parser.add_mutually_exclusive_group()
+    planned.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Fetch upstream and store a merge plan without touching local files, so the next run starts from it",
+    )
+    planned.add_argument(
+        "--continue",
+        dest="resume",
+        action="store_true",
+        help="Resume an interrupted merge session, skipping the changes it already applied",
+    )
+    planned.add_argument(
+        "--apply-plan",
+        metavar="PLAN",
+        help="Apply a plan written by --plan-out without re-analysis, if its blob IDs still match",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="REPORT",
+        help="Write a JSON report of time and counts per phase and per subprocess to REPORT",
+    )
+    parser.add_argument(
+        "--profile-pstats",
+        metavar="FILE",
+        help="Also run under cProfile and dump pstats data to FILE",
+    )
     return parser.parse_args()
 
 
 def discover_default_source_path() -> Path:
     """Returns the configured chezmoi source path, or the conventional default."""
     try:
-        result = subprocess.run(
-            ["chezmoi", "source-path"],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
+        result = run_process(["chezmoi", "source-path"], check=True)
         source_path = result.stdout.strip()
         if source_path:
             return Path(source_path).expanduser().resolve()
@@ -40,14 +115,10 @@ def discover_default_source_path() -> Path:
 
     return Path("~/.local/share/chezmoi").expanduser().resolve()
 
-def render_chezmoi_template(content: str) -> str:
-    """
-    Renders the given template content using 'chezmoi execute-template'.
-    Returns the rendered string, or the original content if rendering fails.
+TEMPLATE_DIRECTIVE = "chezmoi:template:"
 
-    Note: chezmoi automatically discovers its configuration in standard 
-    locations (e.g., ~/.config/chezmoi/chezmoi.toml).
-    """
+def chezmoi_template_command() -> tuple[list[str], Optional[str]]:
+    """Returns the execute-template command line and the CHEZMOI_CONFIG override, if any."""
     cmd = ["chezmoi", "execute-template"]
 
     # Support custom config file via env var, useful for testing and custom setups.
@@ -55,42 +126,179 @@ def render_chezmoi_template(content: str) -> str:
     config_path = os.environ.get("CHEZMOI_CONFIG")
     if config_path:
         cmd.extend(["--config", config_path])
+    return cmd, config_path
+
+def render_chezmoi_templates(contents: list[str], cache: Optional[RenderCache] = None) -> list[str]:
+    """
+    Renders many templates through as few 'chezmoi execute-template' calls as possible.
+    Returns rendered strings in input order; a template that fails to render on its
+    own falls back to its original content without affecting the rest of the batch.
+    When a cache is given, successful renders are looked up and stored there.
+    """
+    cmd, _ = chezmoi_template_command()
+    positions: dict[str, list[int]] = {}
+    for index, content in enumerate(contents):
+        positions.setdefault(content, []).append(index)
+
+    rendered_by_content: dict[str, str] = {}
+    cache_keys: dict[str, str] = {}
+    bodies: list[str] = []
+    for content in positions:
+        if cache is not None:
+            cache_keys[content] = cache.key(content)
+            cached = cache.get(cache_keys[content])
+            if cached is not None:
+                rendered_by_content[content] = cached
+                continue
+        bodies.append(content)
+
+    # Directives such as custom delimiters apply to the whole input, so templates
+    # carrying them cannot share a process with others.
+    batched = [body for body in bodies if TEMPLATE_DIRECTIVE not in body]
+    isolated = [body for body in bodies if TEMPLATE_DIRECTIVE in body]
+    bodies = batched + isolated
 
+    PROFILE.count("templates_rendered", len(bodies))
     try:
-        result = subprocess.run(
-            cmd,
-            input=content,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return result.stdout
-    except subprocess.CalledProcessError as e:
-        # Print warning to stderr so it doesn't break stdout flow but is visible
-        print(f"Warning: Template rendering failed: {e.stderr.strip()}", file=sys.stderr)
-        return content
+        with PROFILE.phase("template_renders"):
+            rendered = _render_template_batch(cmd, batched)
+            for body in isolated:
+                rendered.extend(_render_template_batch(cmd, [body]))
     except FileNotFoundError:
         print("Warning: 'chezmoi' executable not found. Cannot render template.", file=sys.stderr)
-        return content
+        rendered = [None] * len(bodies)
+
+    for content, output in zip(bodies, rendered):
+        if output is None:
+            rendered_by_content[content] = content
+            continue
+        if cache is not None:
+            cache.put(cache_keys[content], output)
+        rendered_by_content[content] = output
+
+    return [rendered_by_content[content] for content in contents]
 
-def import_new_upstream_file(git: GitHandler, rel_target_path: str, upstream_file: str) -> Optional[str]:
-    """Imports a newly-added upstream file and returns the staged local relative path."""
-    mode = git.get_file_mode("origin/HEAD", upstream_file)
+def _render_template_batch(cmd: list[str], bodies: list[str]) -> list[Optional[str]]:
+    """
+    Renders bodies in one process, bisecting the batch when chezmoi rejects it.
+    Entries that fail alone are returned as None.
+    """
+    if not bodies:
+        return []
+
+    if len(bodies) == 1:
+        try:
+            result = run_process(cmd, input=bodies[0], check=True)
+        except subprocess.CalledProcessError as e:
+            # Print warning to stderr so it doesn't break stdout flow but is visible
+            print(f"Warning: Template rendering failed: {e.stderr.strip()}", file=sys.stderr)
+            return [None]
+        return [result.stdout]
+
+    # Each body sits inside its own `if` block so template variables stay scoped
+    # to it, and is preceded by a sentinel the templates cannot plausibly emit.
+    token = secrets.token_hex(16)
+    markers = [f"<<chezmerge:{token}:{index}>>" for index in range(len(bodies) + 1)]
+    combined = "".join(
+        f"{markers[index]}{{{{ if true }}}}{body}{{{{ end }}}}"
+        for index, body in enumerate(bodies)
+    ) + markers[-1]
+
+    try:
+        result = run_process(cmd, input=combined, check=True)
+    except subprocess.CalledProcessError:
+        result = None
+
+    if result is not None:
+        output = result.stdout
+        rendered: list[Optional[str]] = []
+        position = 0
+        for index in range(len(bodies)):
+            start = output.find(markers[index], position)
+            end = output.find(markers[index + 1], start) if start != -1 else -1
+            if start == -1 or end == -1:
+                rendered = []
+                break
+            rendered.append(output[start + len(markers[index]):end])
+            position = end
+        if rendered and output.startswith(markers[0]) and output.endswith(markers[-1]):
+            return rendered
+
+    middle = len(bodies) // 2
+    return _render_template_batch(cmd, bodies[:middle]) + _render_template_batch(cmd, bodies[middle:])
+
+def chezmoi_config_context(source_dir: Path) -> str:
+    """Identifies the chezmoi config and source-dir data that template renders depend on."""
+    _, config_path = chezmoi_template_command()
+    return chezmoi_template_context(config_path, source_dir)
+
+def prefetch_key(git: GitHandler, args: argparse.Namespace) -> dict:
+    """Describes everything a stored plan depends on; a plan is only reused under an equal key."""
+    return {
+        "base": git.get_base_rev(),
+        "latest": git.get_head_rev("origin/HEAD"),
+        "source_tree": git.get_source_tree(),
+        "inner_path": args.inner_path.strip("/"),
+        "merge_engine": args.merge_engine,
+        "chezmoi_config": chezmoi_config_context(git.repo_path),
+    }
+
+def start_fetch(git: GitHandler) -> Future:
+    """Runs git.fetch_latest() on a background thread; result() re-raises a failed fetch."""
+    def fetch():
+        with PROFILE.phase("fetch"):
+            git.fetch_latest()
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(fetch)
+    executor.shutdown(wait=False)
+    return future
+
+def import_new_upstream_file(
+    git: GitHandler,
+    rel_target_path: str,
+    upstream_file: str,
+    content: Optional[str] = None,
+    mode: Optional[str] = None,
+) -> Optional[str]:
+    """Imports a newly-added upstream file and returns the local relative path queued for staging."""
+    if mode is None:
+        mode = git.get_file_mode("origin/HEAD", upstream_file)
     is_symlink = mode == "120000"
     is_executable = mode == "100755"
     dest_rel = chezmoify_path(rel_target_path, executable=is_executable, symlink=is_symlink)
 
-    content = git.get_file_content("latest", upstream_file)
+    if content is None:
+        content = git.get_file_content("latest", upstream_file)
     if is_symlink and content and not content.endswith("\n"):
         # chezmoi stores symlink targets as file content with trailing newline.
         content = f"{content}\n"
 
     git.write_local_file(dest_rel, content)
-    git.stage_file(dest_rel)
+    git.queue_stage(dest_rel)
     return dest_rel
 
 def run():
     args = parse_args()
+    if not (args.profile or args.profile_pstats):
+        run_session(args)
+        return
+
+    PROFILE.enable()
+    profiler = cProfile.Profile() if args.profile_pstats else None
+    try:
+        if profiler is not None:
+            profiler.runcall(run_session, args)
+        else:
+            run_session(args)
+    finally:
+        if profiler is not None:
+            profiler.dump_stats(args.profile_pstats)
+        if args.profile:
+            PROFILE.write(Path(args.profile))
+            print(f"Profile written to {args.profile}")
+
+def run_session(args: argparse.Namespace):
     explicit_source = args.source is not None
     local_path = Path(args.source).expanduser().resolve() if explicit_source else discover_default_source_path()
 
@@ -107,7 +315,7 @@ def run():
         print(f"Creating local directory: {local_path}")
         local_path.mkdir(parents=True, exist_ok=True)
 
-    git = GitHandler(local_path)
+    git = GitHandler(local_path, merge_engine=args.merge_engine)
     session = MergeSessionManager(local_path)
 
     if args.abort:
@@ -144,16 +352,34 @@ def run():
         print(f"Reverted chezmerge merge commit {commit_sha}.")
         return
 
-    if session.has_session():
+    if args.resume and not session.has_session():
+        print("No chezmerge session to continue.")
+        return
+
+    if session.has_session() and not args.resume:
         print("An uncommitted chezmerge session is already in progress.")
-        print("Run 'chezmerge --abort' to roll it back before starting a new merge.")
+        print("Run 'chezmerge --continue' to resume it or 'chezmerge --abort' to roll it back.")
         return
 
-    if git.has_pending_changes():
+    use_cache = git.cache_dir.parent.is_dir() and not args.no_cache
+    plan_store = PlanStore(git.cache_dir / "prefetched-plan.json") if git.cache_dir.parent.is_dir() else None
+
+    # A session's own changes are pending by design, so --continue skips this check.
+    # It runs before the fetch starts: a refused run must not touch the network.
+    if not args.resume and git.has_pending_changes():
         print("Refusing to run because the repository has pending changes.")
-        print("Commit, stash, or discard them first, then rerun chezmerge.")
+        if git.upstream_checkout_is_only_change():
+            rel_path = git.upstream_path.relative_to(git.repo_path)
+            print(f"The {rel_path} checkout is not at the recorded upstream commit (was upstream history rewritten?).")
+            print(f"Run 'git submodule update {rel_path}' to check it out, then rerun chezmerge.")
+        else:
+            print("Commit, stash, or discard them first, then rerun chezmerge.")
         return
     
+    if args.prefetch and not git.is_initialized():
+        print("Nothing to prefetch: run chezmerge once to initialize the workspace first.")
+        return
+
     # 1. Initialization Phase
     if not git.is_initialized():
         submodule_was_registered = git.is_submodule_registered()
@@ -166,7 +392,8 @@ def run():
             print(f"Using submodule URL from .gitmodules: {repo_url}")
 
         print("Initializing Chezmerge Workspace...")
-        git.init_workspace(repo_url)
+        git.init_workspace(repo_url, partial_clone=args.partial_clone, inner_path=args.inner_path)
+        git.ensure_sparse_checkout(args.inner_path)
         git.ensure_pull_hooks()
 
         # If the submodule already existed in .gitmodules but was not initialized,
@@ -175,168 +402,268 @@ def run():
         if not submodule_was_registered:
             print("Performing initial import...")
             # Import from the submodule
-            import_upstream(git.upstream_path, local_path, args.inner_path)
+            with PROFILE.phase("import"):
+                if args.import_from_tree:
+                    import_upstream_tree(git, local_path, args.inner_path, jobs=args.jobs)
+                else:
+                    import_upstream(git.upstream_path, local_path, args.inner_path)
 
             print("Initialization complete. You can now run 'chezmoi apply'.")
             return
-    else:
+    elif not args.prefetch:
+        if not args.dry_run:
+            git.ensure_sparse_checkout(args.inner_path)
         git.ensure_pull_hooks()
 
     # 2. Update Phase
-    print("Fetching upstream changes...")
-    git.fetch_latest()
+    if args.prefetch and plan_store is None:
+        print("Cannot store a prefetched plan outside a git repository.")
+        return
 
-    engine = DecisionEngine()
-    session_started = False
-    base_submodule_sha = git.get_head_rev("HEAD")
+    # The submodule worktree is configured by now, so the fetch can run in the
+    # background while only local work (cache loading and the source scan) happens.
+    prefetched = None
+    fetch: Optional[Future] = None
+    if not (args.apply_plan or args.resume):
+        # A plan prefetched against the same base, origin/HEAD and local tree is
+        # still exact, so the fetch and analysis can be skipped altogether.
+        if use_cache and not args.prefetch:
+            prefetched = plan_store.load(prefetch_key(git, args))
+        if prefetched is None:
+            print("Fetching upstream changes...")
+            fetch = start_fetch(git)
+
+    # Load the local caches while the fetch runs.
+    template_context = chezmoi_config_context(local_path)
+    render_cache = RenderCache(git.cache_dir / "renders", template_context) if use_cache else None
+    if use_cache:
+        git.local_hashes = LocalHashCache(local_path, git.cache_dir / "local-hashes.json")
+
+    # Changes planned by an earlier run. Their kept actions are applied without
+    # analysis; any change without one is planned as usual.
+    planned_changes: Optional[list[UpstreamChange]] = None
+    planned_actions: dict[UpstreamChange, PlannedAction] = {}
+    # (status, path, source_path) of changes a continued session already applied.
+    settled_changes: set[tuple] = set()
+
+    if args.apply_plan:
+        try:
+            header, entries = read_plan(Path(args.apply_plan))
+        except (OSError, ValueError) as e:
+            print(f"Cannot read plan {args.apply_plan}: {e}")
+            return
+
+        if git.get_head_rev("origin/HEAD") != header["latest"]:
+            print("Fetching upstream changes...")
+            with PROFILE.phase("fetch"):
+                git.fetch_latest()
+
+        try:
+            problems = verify_plan(git, header, entries, args.inner_path)
+            if not problems:
+                planned_changes, planned_actions = adopt_plan(git, entries)
+        except (KeyError, TypeError, ValueError) as e:
+            problems = [f"malformed plan: {e}"]
+        if problems:
+            print(f"Refusing to apply {args.apply_plan}:")
+            for problem in problems:
+                print(f"  - {problem}")
+            return
+        print(f"Applying plan {args.apply_plan} without re-analysis.")
+    elif args.resume:
+        manifest = session.read_journal()
+        if manifest is None:
+            print("This session was started by an older chezmerge and cannot be continued.")
+            print("Run 'chezmerge --abort' and merge again.")
+            return
+        if (
+            manifest["base_submodule_sha"] != git.get_base_rev()
+            or manifest["latest_submodule_sha"] != git.get_head_rev("origin/HEAD")
+            or manifest["inner_path"] != args.inner_path.strip("/")
+        ):
+            print("The session no longer matches the upstream commits or inner path it was started with.")
+            print("Run 'chezmerge --abort' and merge again.")
+            return
+        # A run stopped between writing its results and staging them leaves
+        # them only in the worktree, where they would now look already synced.
+        # The session started from a clean tree, so every unstaged path is its own.
+        unstaged = git.get_unstaged_paths()
+        if unstaged and not args.dry_run:
+            print(f"Staging {len(unstaged)} path(s) the interrupted run left unstaged.")
+            for path in unstaged:
+                git.queue_stage(path)
+            with PROFILE.phase("staging"):
+                git.flush_staged()
+        settled_changes, changed_paths = session.settled_changes(git, manifest)
+        for path in changed_paths:
+            print(f"{path} changed since it was applied; it will be analyzed again.")
+        print(f"Continuing the merge session ({len(settled_changes)} changes already applied).")
+    elif prefetched is not None:
+        planned_changes, actions, created = prefetched
+        planned_actions = dict(zip(planned_changes, actions))
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(created))
+        print(f"Using the plan prefetched at {created}; skipping fetch.")
+
+    # Scan the local source while the fetch runs.
+    index_cache = git.cache_dir / "source-index.json" if use_cache else None
+    with PROFILE.phase("local_index"):
+        source_index = LocalSourceIndex.build(local_path, index_cache)
+
+    if fetch is not None:
+        with PROFILE.phase("fetch_wait"):
+            fetch.result()
+
+    session_started = args.resume
+    base_submodule_sha = git.get_base_rev()
 
-    normalized_inner = args.inner_path.strip("/")
-    inner_prefix = f"{normalized_inner}/" if normalized_inner else ""
     analysis_pass = 0
     kept_deletion_paths: set[str] = set()
     kept_binary_paths: set[str] = set()
-
-    def to_inner_relative(upstream_path: str) -> Optional[str]:
-        if not normalized_inner:
-            return upstream_path
-        if upstream_path == normalized_inner:
-            return ""
-        if upstream_path.startswith(inner_prefix):
-            return upstream_path[len(inner_prefix):]
-        return None
+    planner: Optional[ChangePlanner] = None
 
     def ensure_session_started():
         nonlocal session_started
         if not session_started:
-            session.start(base_submodule_sha)
+            session.start(base_submodule_sha, git.get_head_rev("origin/HEAD"), args.inner_path)
             session_started = True
 
     def record_path_before_change(path: str):
         ensure_session_started()
         session.record_path(git, path)
 
+    def journal_decisions(decisions: list[tuple[UpstreamChange, str, Optional[str], str]]):
+        if decisions:
+            ensure_session_started()
+            session.record_decisions(git, decisions)
+
+    changed_files: Optional[list[UpstreamChange]] = None
+
     while True:
-        changed_files = git.get_upstream_changes(args.inner_path)
+        # Neither the base pointer nor origin/HEAD moves until the merge commits,
+        # so the change list from the first pass holds for every later pass.
+        if changed_files is None:
+            if planned_changes is not None:
+                changed_files = planned_changes
+            else:
+                with PROFILE.phase("diff"):
+                    changed_files = git.get_upstream_changes(args.inner_path)
+            PROFILE.count("upstream_changes", len(changed_files))
+            for change in changed_files:
+                if (change.status, change.path, change.source_path) in settled_changes:
+                    planned_actions[change] = PlannedAction(ActionKind.SKIP)
 
         if not changed_files:
+            if args.prefetch:
+                plan_store.save(prefetch_key(git, args), [], [])
+            if args.plan_out:
+                write_plan(Path(args.plan_out), plan_header(git, args.inner_path, args.merge_engine), [])
             print("No upstream changes detected.")
             return
 
         if analysis_pass == 0:
             print(f"Detected {len(changed_files)} changed files upstream.")
 
+        if planner is None:
+            planner = ChangePlanner(
+                git,
+                source_index,
+                args.inner_path,
+                lambda contents: render_chezmoi_templates(contents, render_cache),
+                kept_deletion_paths,
+                kept_binary_paths,
+                AnalysisCache(git.cache_dir / "analysis", args.merge_engine, template_context)
+                if use_cache
+                else None,
+            )
+            planner.adopt(list(planned_actions), list(planned_actions.values()))
+
         merge_items: list[MergeItem] = []
+        review_changes: dict[str, UpstreamChange] = {}
         unresolved_missing: list[str] = []
+        applied: list[tuple[UpstreamChange, str, Optional[str], str]] = []
+
+        PROFILE.count("analysis_passes")
+        with PROFILE.phase("analysis"):
+            actions = planner.plan_all(changed_files, jobs=args.jobs)
+        if git.local_hashes is not None:
+            git.local_hashes.save()
+
+        if args.plan_out and analysis_pass == 0:
+            write_plan(
+                Path(args.plan_out),
+                plan_header(git, args.inner_path, args.merge_engine),
+                (plan_entry(git, change, action) for change, action in zip(changed_files, actions)),
+            )
+            print(f"Wrote plan for {len(changed_files)} changes to {args.plan_out}")
 
-        for change_type, upstream_file, source_upstream_file in changed_files:
-            if change_type == "R":
-                old_upstream_file = source_upstream_file
-                new_upstream_file = upstream_file
+        if args.prefetch:
+            plan_store.save(prefetch_key(git, args), changed_files, actions)
+            reviews = sum(1 for action in actions if action.kind == ActionKind.REVIEW)
+            print(f"Prefetched a plan for {len(changed_files)} upstream changes ({reviews} need review).")
+            return
 
-                if not old_upstream_file:
-                    unresolved_missing.append(new_upstream_file)
-                    print(f"Missing rename source metadata for {new_upstream_file}; manual resolution required.")
-                    continue
+        # Apply side effects serially, in the order git reported the changes.
+        for change, action in zip(changed_files, actions):
+            for message in action.messages:
+                print(message)
 
-                rel_old_target = to_inner_relative(old_upstream_file)
-                rel_new_target = to_inner_relative(new_upstream_file)
+            if action.kind == ActionKind.UNRESOLVED:
+                unresolved_missing.append(action.unresolved)
+                continue
 
-                local_old = find_local_match(local_path, rel_old_target) if rel_old_target is not None else None
-                local_new = find_local_match(local_path, rel_new_target) if rel_new_target is not None else None
+            if action.kind == ActionKind.REVIEW:
+                merge_items.append(action.merge_item)
+                review_changes[action.merge_item.path] = change
+                continue
 
-                if rel_old_target is not None and rel_new_target is None:
-                    if not local_old:
-                        unresolved = rel_old_target or old_upstream_file
-                        print(f"Missing local counterpart for {unresolved} (R->out); manual resolution required.")
-                        unresolved_missing.append(unresolved)
-                        continue
+            if action.kind == ActionKind.SKIP:
+                continue
 
-                    base_content = git.get_file_content("base", old_upstream_file)
-                    raw_local_content = git.get_file_content("local", str(local_old))
-                    if raw_local_content == base_content:
-                        if args.dry_run:
-                            print(f"  - {str(local_old)} [AUTO_DELETE]")
-                        else:
-                            print(f"Auto-deleting {rel_old_target} (upstream renamed outside inner path)...")
-                            record_path_before_change(str(local_old))
-                            old_abs = local_path / str(local_old)
-                            if old_abs.exists():
-                                old_abs.unlink()
-                            if git.is_path_tracked(str(local_old)):
-                                git.stage_file(str(local_old))
-                        continue
+            if args.dry_run:
+                print(action.preview)
+                continue
 
-                    print(f"Rename conflict: {rel_old_target} -> {new_upstream_file} (local file modified)")
-                    unresolved_missing.append(f"{rel_old_target} -> {new_upstream_file}")
-                    continue
-
-                if rel_old_target is None and rel_new_target is not None:
-                    if local_new:
-                        latest_content = git.get_file_content("latest", new_upstream_file)
-                        raw_local_new = git.get_file_content("local", str(local_new))
-                        if raw_local_new == latest_content:
-                            continue
-                        unresolved = rel_new_target or new_upstream_file
-                        print(f"Existing local file for renamed upstream path {unresolved}; manual resolution required.")
-                        unresolved_missing.append(unresolved)
-                        continue
+            if action.kind == ActionKind.IMPORT:
+                record_path_before_change(action.path)
+                staged_path = import_new_upstream_file(
+                    git,
+                    action.target,
+                    action.upstream_file,
+                    action.content,
+                    action.mode,
+                )
+                source_index.add(staged_path)
+                print(action.announcement)
+                planner.settle(change)
+                applied.append((change, staged_path, None, action.scenario))
+                continue
 
-                    mode = git.get_file_mode("origin/HEAD", new_upstream_file)
-                    is_symlink = mode == "120000"
-                    is_executable = mode == "100755"
-                    dest_rel = chezmoify_path(rel_new_target, executable=is_executable, symlink=is_symlink)
-                    if args.dry_run:
-                        print(f"  - {dest_rel} [AUTO_IMPORT]")
-                    else:
-                        record_path_before_change(dest_rel)
-                        staged_path = import_new_upstream_file(git, rel_new_target, new_upstream_file)
-                        print(f"Auto-importing renamed upstream file {new_upstream_file} -> {staged_path}")
-                    continue
-
-                if rel_old_target is None and rel_new_target is None:
-                    continue
-
-                if not local_old:
-                    unresolved = rel_old_target or old_upstream_file
-                    print(f"Missing local counterpart for {unresolved} (R); manual resolution required.")
-                    unresolved_missing.append(unresolved)
-                    continue
-
-                base_old_content = git.get_file_content("base", old_upstream_file)
-                raw_local_old_content = git.get_file_content("local", str(local_old))
-                if raw_local_old_content != base_old_content:
-                    old_display = rel_old_target or old_upstream_file
-                    new_display = rel_new_target or new_upstream_file
-                    print(f"Rename conflict: {old_display} -> {new_display} (local file modified)")
-                    unresolved_missing.append(f"{old_display} -> {new_display}")
-                    continue
-
-                mode = git.get_file_mode("origin/HEAD", new_upstream_file)
-                is_symlink = mode == "120000"
-                is_executable = mode == "100755"
-                new_local_rel = chezmoify_path(rel_new_target, executable=is_executable, symlink=is_symlink)
-                latest_new_content = git.get_file_content("latest", new_upstream_file)
-                if is_symlink and latest_new_content and not latest_new_content.endswith("\n"):
-                    latest_new_content = f"{latest_new_content}\n"
-
-                old_local_rel = str(local_old)
+            if action.kind == ActionKind.DELETE:
+                print(action.announcement)
+                record_path_before_change(action.path)
+                dest = local_path / action.path
+                if dest.exists():
+                    dest.unlink()
+                source_index.discard(action.path)
+                git.queue_stage(action.path)
+                planner.settle(change)
+                applied.append((change, action.path, None, action.scenario))
+                continue
+
+            if action.kind == ActionKind.RENAME:
+                old_local_rel = action.old_path
+                new_local_rel = action.path
                 old_abs = local_path / old_local_rel
                 new_abs = local_path / new_local_rel
 
-                if args.dry_run:
-                    print(f"  - {old_local_rel} -> {new_local_rel} [AUTO_RENAME]")
-                    continue
-
                 if new_abs.exists() and new_abs != old_abs:
                     current_new_content = git.get_file_content("local", new_local_rel)
-                    if current_new_content != latest_new_content:
-                        old_display = rel_old_target or old_upstream_file
-                        new_display = rel_new_target or new_upstream_file
-                        print(f"Rename conflict: destination exists for {old_display} -> {new_display}; manual resolution required.")
-                        unresolved_missing.append(f"{old_display} -> {new_display}")
+                    if current_new_content != action.content:
+                        print(f"Rename conflict: destination exists for {action.unresolved}; manual resolution required.")
+                        unresolved_missing.append(action.unresolved)
                         continue
 
-                print(f"Auto-renaming {rel_old_target} -> {rel_new_target}...")
+                print(action.announcement)
                 record_path_before_change(old_local_rel)
                 if new_local_rel != old_local_rel:
                     record_path_before_change(new_local_rel)
@@ -344,155 +671,25 @@ def run():
                     new_abs.parent.mkdir(parents=True, exist_ok=True)
                     old_abs.rename(new_abs)
 
-                git.write_local_file(new_local_rel, latest_new_content)
-                git.stage_file(new_local_rel)
-                if new_local_rel != old_local_rel and git.is_path_tracked(old_local_rel):
-                    git.stage_file(old_local_rel)
-                continue
-
-            rel_target_path = upstream_file
-            if normalized_inner:
-                if upstream_file.startswith(inner_prefix):
-                    rel_target_path = upstream_file[len(inner_prefix):]
-                elif upstream_file == normalized_inner:
-                    rel_target_path = ""
-
-            local_file = find_local_match(local_path, rel_target_path)
-
-            if not local_file:
-                if change_type == "A":
-                    mode = git.get_file_mode("origin/HEAD", upstream_file)
-                    is_symlink = mode == "120000"
-                    is_executable = mode == "100755"
-                    dest_rel = chezmoify_path(rel_target_path, executable=is_executable, symlink=is_symlink)
-                    if args.dry_run:
-                        print(f"  - {dest_rel} [AUTO_IMPORT]")
-                    else:
-                        record_path_before_change(dest_rel)
-                        staged_path = import_new_upstream_file(git, rel_target_path, upstream_file)
-                        print(f"Auto-importing new upstream file {rel_target_path} -> {staged_path}")
-                    continue
-
-                if change_type == "D":
-                    print(f"Skipping {rel_target_path} (upstream deleted, local counterpart already absent).")
-                    continue
-
-                unresolved = rel_target_path or upstream_file
-                unresolved_missing.append(unresolved)
-                continue
-
-            if change_type == "D":
-                base_content = git.get_file_content("base", upstream_file)
-                raw_local_content = git.get_file_content("local", str(local_file))
-
-                if raw_local_content == base_content:
-                    if args.dry_run:
-                        print(f"  - {str(local_file)} [AUTO_DELETE]")
-                    else:
-                        print(f"Auto-deleting {rel_target_path} (upstream deleted, local unchanged)...")
-                        record_path_before_change(str(local_file))
-                        dest = local_path / str(local_file)
-                        if dest.exists():
-                            dest.unlink()
-                        if git.is_path_tracked(str(local_file)):
-                            git.stage_file(str(local_file))
-                    continue
-
-                if str(local_file) in kept_deletion_paths:
-                    print(f"Keeping deleted upstream file as reference: {local_file}")
-                    continue
-
-                print(f"Deletion conflict: {rel_target_path} (upstream deleted, local file modified)")
-                print("  Keeping the local file preserves it as reference only; upstream may no longer invoke it.")
-                is_tmpl = str(local_file).endswith(".tmpl")
-                ours_content = raw_local_content
-                if is_tmpl:
-                    ours_content = render_chezmoi_template(raw_local_content)
-
-                merge_items.append(MergeItem(
-                    path=str(local_file),
-                    base=FileState(base_content, rel_target_path),
-                    theirs=FileState("", rel_target_path),
-                    ours=FileState(ours_content, str(local_file)),
-                    template=FileState(raw_local_content, str(local_file), is_template=is_tmpl),
-                    scenario=MergeScenario.DELETION_CONFLICT,
-                ))
-                continue
-
-            base_content = git.get_file_content("base", upstream_file)
-            theirs_content = git.get_file_content("latest", upstream_file)
-            raw_local_content = git.get_file_content("local", str(local_file))
-
-            is_tmpl = str(local_file).endswith(".tmpl")
-            ours_content = raw_local_content
-            if is_tmpl:
-                ours_content = render_chezmoi_template(raw_local_content)
-
-            template_content = raw_local_content
-            is_binary = any(
-                git.is_probably_binary_content(content)
-                for content in (base_content, theirs_content, raw_local_content)
-            )
-
-            base_state = FileState(base_content, rel_target_path)
-            theirs_state = FileState(theirs_content, rel_target_path)
-            ours_state = FileState(ours_content, str(local_file))
-            template_state = FileState(template_content, str(local_file), is_template=is_tmpl)
-
-            scenario = engine.analyze(base_state, theirs_state, ours_state, template_state)
-
-            merged_content = None
-            if scenario == MergeScenario.CONFLICT and is_binary:
-                if str(local_file) in kept_binary_paths:
-                    print(f"Keeping local binary file: {local_file}")
-                    continue
-                scenario = MergeScenario.BINARY_CONFLICT
-            elif scenario == MergeScenario.CONFLICT:
-                merge_ours_content = template_content if is_tmpl else ours_content
-                success, result = git.attempt_merge(base_content, merge_ours_content, theirs_content)
-                if success:
-                    scenario = MergeScenario.AUTO_MERGEABLE
-                    merged_content = result
-                elif is_tmpl:
-                    scenario = MergeScenario.TEMPLATE_DIVERGENCE
-
-            if is_binary:
-                if scenario in (
-                    MergeScenario.ALREADY_SYNCED,
-                    MergeScenario.AUTO_UPDATE,
-                    MergeScenario.AUTO_KEEP,
-                ):
-                    pass
-                elif scenario == MergeScenario.AUTO_MERGEABLE:
-                    scenario = MergeScenario.BINARY_CONFLICT
-
-            if scenario == MergeScenario.ALREADY_SYNCED:
-                continue
-
-            if scenario in (MergeScenario.AUTO_UPDATE, MergeScenario.AUTO_MERGEABLE):
-                if args.dry_run:
-                    print(f"  - {str(local_file)} [{scenario.name}]")
-                else:
-                    print(f"Auto-merging {rel_target_path} ({scenario.name})...")
-                    record_path_before_change(str(local_file))
-                    content_to_write = merged_content if scenario == MergeScenario.AUTO_MERGEABLE else theirs_content
-                    if content_to_write is None:
-                        raise RuntimeError(f"Unexpected None content for {scenario.name}")
-                    git.write_local_file(str(local_file), content_to_write)
-                    git.stage_file(str(local_file))
+                git.write_local_file(new_local_rel, action.content)
+                source_index.rename(old_local_rel, new_local_rel)
+                git.queue_stage(new_local_rel)
+                if new_local_rel != old_local_rel:
+                    git.queue_stage(old_local_rel)
+                planner.settle(change)
+                applied.append((change, new_local_rel, old_local_rel, action.scenario))
                 continue
 
-            if scenario == MergeScenario.AUTO_KEEP:
-                continue
+            print(action.announcement)
+            record_path_before_change(action.path)
+            git.write_local_file(action.path, action.content)
+            git.queue_stage(action.path)
+            planner.settle(change)
+            applied.append((change, action.path, None, action.scenario))
 
-            merge_items.append(MergeItem(
-                path=str(local_file),
-                base=base_state,
-                theirs=theirs_state,
-                ours=ours_state,
-                template=template_state,
-                scenario=scenario,
-            ))
+        with PROFILE.phase("staging"):
+            git.flush_staged()
+        journal_decisions(applied)
 
         if args.dry_run:
             if unresolved_missing:
@@ -512,88 +709,65 @@ def run():
             return
 
         if merge_items:
-            from .ui import BinaryConflictChoiceApp, ChezmergeApp, DeletionConflictChoiceApp
-
-            current_item = merge_items[0]
-            if current_item.scenario == MergeScenario.DELETION_CONFLICT:
-                while True:
-                    choice = DeletionConflictChoiceApp(current_item).run()
-                    if choice is None:
-                        return
-
-                    if choice == "keep":
-                        current_item.delete_on_save = False
-                        kept_deletion_paths.add(current_item.path)
-                        results = [current_item]
-                        break
-
-                    if choice == "delete":
-                        current_item.delete_on_save = True
-                        kept_deletion_paths.discard(current_item.path)
-                        results = [current_item]
-                        break
-
-                    inspect_app = ChezmergeApp(
-                        [current_item],
-                        external_editor=args.editor,
-                        deletion_inspect_mode=True,
-                    )
-                    results = inspect_app.run()
-                    if not results:
-                        continue
-                    current_item = results[0]
-                    current_item.deletion_reviewed = True
-            elif current_item.scenario == MergeScenario.BINARY_CONFLICT:
-                while True:
-                    choice = BinaryConflictChoiceApp(current_item).run()
-                    if choice is None:
-                        return
-
-                    if choice == "keep":
-                        current_item.keep_local_on_save = True
-                        current_item.take_theirs_on_save = False
-                        kept_binary_paths.add(current_item.path)
-                        results = [current_item]
-                        break
-
-                    if choice == "take":
-                        current_item.keep_local_on_save = False
-                        current_item.take_theirs_on_save = True
-                        kept_binary_paths.discard(current_item.path)
-                        results = [current_item]
-                        break
-            else:
-                app = ChezmergeApp([current_item], external_editor=args.editor)
-                results = app.run()
-                if not results:
-                    return
+            from .ui import ChezmergeApp
+
+            applied_messages: list[str] = []
+
+            def apply_resolution(item: MergeItem):
+                # Called by the UI as each item is saved, so finished work is on
+                # disk and staged even if the session is quit midway.
+                if item.scenario == MergeScenario.DELETION_CONFLICT:
+                    if item.delete_on_save:
+                        kept_deletion_paths.discard(item.path)
+                    else:
+                        kept_deletion_paths.add(item.path)
+                elif item.scenario == MergeScenario.BINARY_CONFLICT:
+                    if item.keep_local_on_save:
+                        kept_binary_paths.add(item.path)
+                    else:
+                        kept_binary_paths.discard(item.path)
 
-            print("Applying changes to local files...")
-            for item in results:
                 if item.delete_on_save:
                     record_path_before_change(item.path)
                     dest = local_path / item.path
                     if dest.exists():
                         dest.unlink()
-                    git.stage_file(item.path)
-                    print(f"Deleted {item.path}")
-                    continue
-
-                if item.keep_local_on_save:
-                    print(f"Keeping local version of {item.path}")
-                    continue
-
-                if item.take_theirs_on_save:
+                    source_index.discard(item.path)
+                    git.queue_stage(item.path)
+                    applied_messages.append(f"Deleted {item.path}")
+                    decision = "deleted"
+                elif item.keep_local_on_save:
+                    applied_messages.append(f"Keeping local version of {item.path}")
+                    decision = "kept_local"
+                elif item.take_theirs_on_save:
                     record_path_before_change(item.path)
                     git.write_local_file(item.path, item.theirs.content)
-                    git.stage_file(item.path)
-                    print(f"Took upstream version of {item.path}")
-                    continue
+                    git.queue_stage(item.path)
+                    applied_messages.append(f"Took upstream version of {item.path}")
+                    decision = "took_upstream"
+                else:
+                    record_path_before_change(item.path)
+                    git.write_local_file(item.path, item.template.content)
+                    git.queue_stage(item.path)
+                    applied_messages.append(f"Updated {item.path}")
+                    decision = "merged"
+
+                with PROFILE.phase("staging"):
+                    git.flush_staged()
+                journal_decisions([(review_changes[item.path], item.path, None, decision)])
+                planner.invalidate([item.path])
+
+            app = ChezmergeApp(merge_items, external_editor=args.editor, on_resolved=apply_resolution)
+            with PROFILE.phase("ui"):
+                results = app.run()
 
-                record_path_before_change(item.path)
-                git.write_local_file(item.path, item.template.content)
-                git.stage_file(item.path)
-                print(f"Updated {item.path}")
+            if applied_messages:
+                print("Applying changes to local files...")
+                for message in applied_messages:
+                    print(message)
+
+            if not results:
+                return
 
             analysis_pass += 1
             continue
@@ -607,9 +781,12 @@ def run():
 
         print("All changes merged automatically.")
         ensure_session_started()
-        git.update_base_pointer()
-        git.commit("chore(chezmerge): Merge upstream changes")
+        git.update_base_pointer(checkout=not args.skip_upstream_checkout)
+        with PROFILE.phase("commit"):
+            git.commit("chore(chezmerge): Merge upstream changes")
         session.cleanup()
+        if plan_store is not None:
+            plan_store.clear()
         print("Merge complete. Changes committed.")
         return
 
@@ -1,3 +1,6 @@
+import json
+import os
+import time
 from pathlib import Path
 from typing import Optional
 
@@ -76,32 +79,147 @@ def chezmoify_path(
         new_parts.append(mapped)
     return str(Path(*new_parts))
 
-def find_local_match(repo_root: Path, target_rel_path: str) -> Optional[Path]:
+class LocalSourceIndex:
     """
-    Scans the repo_root to find the local source file that generates the target_rel_path.
-    Prioritizes .tmpl files if multiple matches exist.
+    Maps chezmoi target paths to the local source files that generate them.
+
+    The index is built from a single walk of the source tree, so repeated
+    lookups do not rescan the repository. The merge loop keeps it current by
+    calling add/discard/rename when it creates, deletes, or moves files.
+    When a cache path is given, directory listings are persisted and reused on
+    the next run for every directory whose mtime has not changed.
     """
-    target_path = str(Path(target_rel_path))
-    best_match = None
-    
-    # Walk the local repository to find a matching path.
-    for candidate in repo_root.rglob("*"):
-        if not candidate.is_file():
-            continue
-        
-        # Skip .git and .merge_workspace directories
-        if ".git" in candidate.parts or ".merge_workspace" in candidate.parts:
-            continue
 
-        rel_candidate = candidate.relative_to(repo_root)
-        normalized = normalize_path(str(rel_candidate))
-        
-        if normalized == target_path:
-            # If we find a template, it is the preferred match. Return immediately.
-            if candidate.name.endswith(".tmpl"):
-                return rel_candidate
-            
-            # Otherwise, store it as a candidate and keep looking
-            best_match = rel_candidate
-            
-    return best_match
+    VERSION = 1
+    SKIP_NAMES = (".git", ".merge_workspace")
+    SKIP_ROOT_NAMES = (".chezmerge-upstream",)
+    # Listings of directories modified this close to the scan are not trusted
+    # on the next run, since a later change could land within the same mtime tick.
+    RACY_WINDOW_NS = 2_000_000_000
+
+    def __init__(self, repo_root: Path, cache_path: Optional[Path] = None):
+        self.repo_root = repo_root
+        self.cache_path = cache_path
+        self._listings: dict[str, dict] = {}
+        self._targets: dict[str, list[str]] = {}
+
+    @classmethod
+    def build(cls, repo_root: Path, cache_path: Optional[Path] = None) -> "LocalSourceIndex":
+        """Walks repo_root once (reusing unchanged cached listings) and returns the index."""
+        index = cls(repo_root, cache_path)
+        index._scan(index._load_cached_listings())
+        if cache_path:
+            index.save()
+        return index
+
+    def lookup(self, target_rel_path: str) -> Optional[Path]:
+        """
+        Returns the local source file that generates target_rel_path.
+        Prioritizes .tmpl files if multiple matches exist.
+        """
+        candidates = self._targets.get(str(Path(target_rel_path)))
+        if not candidates:
+            return None
+
+        for candidate in candidates:
+            if candidate.endswith(".tmpl"):
+                return Path(candidate)
+        return Path(candidates[0])
+
+    def add(self, rel_path: str):
+        """Registers a source file created by the merge loop."""
+        rel_path = Path(rel_path).as_posix()
+        candidates = self._targets.setdefault(normalize_path(rel_path), [])
+        if rel_path not in candidates:
+            candidates.append(rel_path)
+            candidates.sort()
+
+    def discard(self, rel_path: str):
+        """Forgets a source file deleted by the merge loop."""
+        rel_path = Path(rel_path).as_posix()
+        target = normalize_path(rel_path)
+        candidates = self._targets.get(target)
+        if not candidates or rel_path not in candidates:
+            return
+        candidates.remove(rel_path)
+        if not candidates:
+            del self._targets[target]
+
+    def rename(self, old_rel_path: str, new_rel_path: str):
+        """Moves a source file entry after the merge loop renamed it."""
+        self.discard(old_rel_path)
+        self.add(new_rel_path)
+
+    def save(self):
+        """Persists directory listings so the next run can revalidate them by mtime."""
+        if not self.cache_path:
+            return
+
+        payload = {"version": self.VERSION, "dirs": self._listings}
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.tmp")
+        tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+        os.replace(tmp_path, self.cache_path)
+
+    def _load_cached_listings(self) -> dict[str, dict]:
+        if not self.cache_path or not self.cache_path.exists():
+            return {}
+        try:
+            payload = json.loads(self.cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(payload, dict) or payload.get("version") != self.VERSION:
+            return {}
+        return payload.get("dirs") or {}
+
+    def _scan(self, cached: dict[str, dict]):
+        scan_started_ns = time.time_ns()
+        pending = [""]
+        while pending:
+            rel_dir = pending.pop()
+            abs_dir = self.repo_root / rel_dir if rel_dir else self.repo_root
+            try:
+                mtime_ns = abs_dir.stat().st_mtime_ns
+            except OSError:
+                continue
+
+            listing = cached.get(rel_dir)
+            if listing is None or listing.get("mtime_ns") != mtime_ns:
+                listing = self._list_dir(abs_dir, rel_dir)
+                if mtime_ns >= scan_started_ns - self.RACY_WINDOW_NS:
+                    mtime_ns = -1
+                listing["mtime_ns"] = mtime_ns
+            self._listings[rel_dir] = listing
+
+            prefix = f"{rel_dir}/" if rel_dir else ""
+            for name in listing["files"]:
+                rel_path = prefix + name
+                self._targets.setdefault(normalize_path(rel_path), []).append(rel_path)
+            pending.extend(prefix + name for name in listing["dirs"])
+
+        for candidates in self._targets.values():
+            candidates.sort()
+
+    def _list_dir(self, abs_dir: Path, rel_dir: str) -> dict:
+        files: list[str] = []
+        dirs: list[str] = []
+        try:
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            # Skip .git and .merge_workspace directories (and .git files of nested repos)
+            if entry.name in self.SKIP_NAMES:
+                continue
+            if not rel_dir and entry.name in self.SKIP_ROOT_NAMES:
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.name)
+                elif entry.is_file():
+                    files.append(entry.name)
+            except OSError:
+                continue
+
+        return {"files": sorted(files), "dirs": sorted(dirs)}
@@ -0,0 +1,169 @@
+import json
+from pathlib import Path
+from typing import Iterable
+
+from .git_ops import GitHandler, UpstreamChange, blob_oid
+from .planner import ActionKind, PlannedAction
+
+PLAN_VERSION = 1
+
+# Kinds applied straight from a plan file. Reviews and unresolved paths are
+# planned again when the plan is applied, so they reflect the current files.
+ADOPTED_KINDS = (ActionKind.SKIP, ActionKind.IMPORT, ActionKind.DELETE, ActionKind.RENAME, ActionKind.UPDATE)
+
+_CHANGE_FIELDS = {
+    "status": "status",
+    "path": "upstream_path",
+    "source_path": "upstream_source_path",
+    "old_mode": "old_mode",
+    "new_mode": "new_mode",
+    "old_oid": "base_oid",
+    "new_oid": "latest_oid",
+}
+_ACTION_FIELDS = ("target", "upstream_file", "mode", "messages", "preview", "announcement", "unresolved")
+
+
+def plan_header(git: GitHandler, inner_path: str, merge_engine: str) -> dict:
+    return {
+        "chezmerge_plan": PLAN_VERSION,
+        "base": git.get_base_rev(),
+        "latest": git.get_head_rev("origin/HEAD"),
+        "inner_path": inner_path.strip("/"),
+        "merge_engine": merge_engine,
+    }
+
+
+def plan_entry(git: GitHandler, change: UpstreamChange, action: PlannedAction) -> dict:
+    """
+    Describes one planned action as a flat JSON object. Written content is
+    identified by its blob ID and only included inline when it is not the
+    upstream blob itself, e.g. the result of a merge.
+    """
+    entry = {
+        "kind": action.kind.name,
+        "scenario": action.scenario or action.kind.name,
+        **{name: getattr(change, field) for field, name in _CHANGE_FIELDS.items()},
+        "local_path": action.path,
+        "local_oid": git.find_local_oid(action.path),
+        "local_old_path": action.old_path,
+        "local_old_oid": git.find_local_oid(action.old_path),
+        "content_oid": None,
+    }
+    if action.content is not None:
+        entry["content_oid"] = blob_oid(action.content.encode("utf-8", errors="surrogateescape"))
+        if entry["content_oid"] != change.new_oid:
+            entry["content"] = action.content
+    for name in _ACTION_FIELDS:
+        entry[name] = getattr(action, name)
+    return entry
+
+
+def write_plan(path: Path, header: dict, entries: Iterable[dict]):
+    """Writes the header and one entry per line (JSON Lines), as entries are produced."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write(json.dumps(header) + "\n")
+        for entry in entries:
+            handle.write(json.dumps(entry) + "\n")
+
+
+def read_plan(path: Path) -> tuple[dict, list[dict]]:
+    """Reads a plan written by write_plan; raises ValueError when it is malformed."""
+    with open(path, encoding="utf-8") as handle:
+        lines = [json.loads(line) for line in handle if line.strip()]
+    if not lines or not isinstance(lines[0], dict) or lines[0].get("chezmerge_plan") != PLAN_VERSION:
+        raise ValueError(f"not a version {PLAN_VERSION} chezmerge plan")
+    header, entries = lines[0], lines[1:]
+    for key in ("base", "latest", "inner_path"):
+        if not isinstance(header.get(key), str):
+            raise ValueError(f"plan header is missing '{key}'")
+    for number, entry in enumerate(entries, start=2):
+        if not isinstance(entry, dict) or entry.get("kind") not in ActionKind.__members__:
+            raise ValueError(f"line {number} is not a plan entry")
+    return header, entries
+
+
+def _outside_repo(repo_path: Path, path: str) -> bool:
+    """Returns True when path is absolute or resolves outside repo_path (or into its .git)."""
+    if Path(path).is_absolute():
+        return True
+    root = repo_path.resolve()
+    resolved = (root / path).resolve()
+    return resolved == root or root not in resolved.parents or resolved.relative_to(root).parts[0] == ".git"
+
+
+def verify_plan(git: GitHandler, header: dict, entries: list[dict], inner_path: str) -> list[str]:
+    """
+    Returns the reasons a plan no longer applies: a different base or upstream
+    commit, a different inner path, or local files that changed since it was
+    made. A plan whose local paths leave the source directory, or whose inline
+    content does not hash to its recorded blob ID, is refused as tampered with.
+    """
+    problems = []
+    if header["inner_path"] != inner_path.strip("/"):
+        problems.append(f"plan was made for --inner-path '{header['inner_path']}'")
+    base = git.get_base_rev()
+    if header["base"] != base:
+        problems.append(f"base commit is {base}, plan expects {header['base']}")
+    latest = git.get_head_rev("origin/HEAD")
+    if header["latest"] != latest:
+        problems.append(f"upstream is at {latest}, plan expects {header['latest']}")
+
+    for entry in entries:
+        unsafe = [
+            entry[key] for key in ("local_path", "local_old_path")
+            if entry.get(key) and _outside_repo(git.repo_path, entry[key])
+        ]
+        for path in unsafe:
+            problems.append(f"{path} is outside the source directory")
+        content = entry.get("content")
+        if "content" in entry and (
+            not isinstance(content, str)
+            or blob_oid(content.encode("utf-8", errors="surrogateescape")) != entry["content_oid"]
+        ):
+            problems.append(f"content for {entry['local_path']} does not match its blob ID {entry['content_oid']}")
+        if unsafe or ActionKind[entry["kind"]] not in ADOPTED_KINDS:
+            continue
+        for path_key, oid_key in (("local_path", "local_oid"), ("local_old_path", "local_old_oid")):
+            path = entry.get(path_key)
+            if path and git.find_local_oid(path) != entry.get(oid_key):
+                problems.append(f"{path} changed since the plan was made")
+    return problems
+
+
+def adopt_plan(git: GitHandler, entries: list[dict]) -> tuple[list[UpstreamChange], dict[UpstreamChange, PlannedAction]]:
+    """
+    Rebuilds the change list and the actions applied straight from the plan,
+    reading upstream content by blob ID in one batch.
+    """
+    changes = [UpstreamChange(**{field: entry[name] for field, name in _CHANGE_FIELDS.items()}) for entry in entries]
+    adopted = [
+        (change, entry)
+        for change, entry in zip(changes, entries)
+        if ActionKind[entry["kind"]] in ADOPTED_KINDS
+    ]
+
+    blob_ids = list(dict.fromkeys(
+        entry["content_oid"] for _, entry in adopted if entry["content_oid"] and "content" not in entry
+    ))
+    git.prefetch_blobs(blob_ids)
+    blobs = dict(zip(blob_ids, git.read_blobs(blob_ids)))
+
+    actions: dict[UpstreamChange, PlannedAction] = {}
+    for change, entry in adopted:
+        content = entry.get("content")
+        if content is None and entry["content_oid"]:
+            blob = blobs.get(entry["content_oid"])
+            if blob is None:
+                raise ValueError(f"upstream blob {entry['content_oid']} for {entry['upstream_path']} is missing")
+            content = blob.decode("utf-8", errors="surrogateescape")
+        actions[change] = PlannedAction(
+            ActionKind[entry["kind"]],
+            path=entry["local_path"],
+            old_path=entry["local_old_path"],
+            content=content,
+            scenario=entry["scenario"],
+            **{name: entry[name] for name in _ACTION_FIELDS},
+        )
+    return changes, actions
+
@@ -0,0 +1,534 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from typing import Callable, Optional
+
+from .cache import AnalysisCache
+from .git_ops import GitHandler, UpstreamChange
+from .logic import DecisionEngine, FileState, MergeItem, MergeScenario
+from .paths import LocalSourceIndex, chezmoify_path
+from .profiling import PROFILE
+
+
+class ActionKind(Enum):
+    SKIP = auto()        # Nothing to write; only messages to report
+    UNRESOLVED = auto()  # Needs manual resolution before the base pointer can advance
+    IMPORT = auto()      # Create a local file from a new upstream file
+    DELETE = auto()      # Remove an unchanged local file
+    RENAME = auto()      # Move an unchanged local file to its new upstream name
+    UPDATE = auto()      # Overwrite a local file with upstream or merged content
+    REVIEW = auto()      # Requires an interactive decision in the UI
+
+
+@dataclass
+class PlannedAction:
+    """The decision for a single upstream change, computed without side effects."""
+    kind: ActionKind
+    path: Optional[str] = None
+    old_path: Optional[str] = None
+    content: Optional[str] = None
+    target: Optional[str] = None
+    upstream_file: Optional[str] = None
+    mode: Optional[str] = None
+    scenario: Optional[str] = None  # MergeScenario name or AUTO_DELETE/AUTO_RENAME/AUTO_IMPORT
+    messages: list[str] = field(default_factory=list)
+    preview: Optional[str] = None
+    announcement: Optional[str] = None
+    unresolved: Optional[str] = None
+    merge_item: Optional[MergeItem] = None
+
+
+class ChangePlanner:
+    """
+    Classifies upstream changes into PlannedActions.
+
+    Planning only reads the upstream objects, the local source tree and the
+    source index, so changes can be planned on a thread pool. Writes, staging
+    and output are left to the caller, which applies the actions in order.
+
+    Plans are kept across analysis passes. The caller settles actions it has
+    applied and invalidates the local paths a user resolves, so later passes
+    only re-plan the changes that touch those paths. With an AnalysisCache,
+    the classification of modified files also carries over between runs.
+    """
+
+    # Scenarios whose cached classification still needs every side's content.
+    REVIEW_SCENARIOS = (
+        MergeScenario.CONFLICT,
+        MergeScenario.BINARY_CONFLICT,
+        MergeScenario.TEMPLATE_DIVERGENCE,
+    )
+
+    def __init__(
+        self,
+        git: GitHandler,
+        source_index: LocalSourceIndex,
+        inner_path: str,
+        render_templates: Callable[[list[str]], list[str]],
+        kept_deletion_paths: set[str],
+        kept_binary_paths: set[str],
+        analysis_cache: Optional[AnalysisCache] = None,
+    ):
+        self.git = git
+        self.source_index = source_index
+        self.inner_path = inner_path
+        self.normalized_inner = inner_path.strip("/")
+        self.inner_prefix = f"{self.normalized_inner}/" if self.normalized_inner else ""
+        self.render_templates = render_templates
+        self.kept_deletion_paths = kept_deletion_paths
+        self.kept_binary_paths = kept_binary_paths
+        self.analysis_cache = analysis_cache
+        self.engine = DecisionEngine()
+        self._upstream_blobs: dict[tuple[str, str], str] = {}
+        self._rendered: dict[str, str] = {}
+        self._local_oids: dict[str, str] = {}
+        self._analysis_keys: dict[UpstreamChange, str] = {}
+        self._analyses: dict[UpstreamChange, tuple[MergeScenario, Optional[str]]] = {}
+        self._plans: dict[UpstreamChange, PlannedAction] = {}
+        self._changes_by_path: dict[str, set[UpstreamChange]] = {}
+        self._lock = threading.Lock()
+
+    def to_inner_relative(self, upstream_path: str) -> Optional[str]:
+        if not self.normalized_inner:
+            return upstream_path
+        if upstream_path == self.normalized_inner:
+            return ""
+        if upstream_path.startswith(self.inner_prefix):
+            return upstream_path[len(self.inner_prefix):]
+        return None
+
+    def prepare(self, changes: list[UpstreamChange]):
+        """
+        Hashes the local counterparts of changes, then loads only the upstream
+        blobs and template renders their decisions or writes will need.
+        """
+        prefetch: list[tuple[str, str]] = []
+        blob_oids: dict[tuple[str, str], str] = {}
+        template_sources: list[str] = []
+        for change in changes:
+            change_type, upstream_file = change.status, change.path
+            self._analysis_keys.pop(change, None)
+            self._analyses.pop(change, None)
+            blob_oids[("base", change.source_path or upstream_file)] = change.old_oid
+            blob_oids[("latest", upstream_file)] = change.new_oid
+            base_oid, latest_oid = change.base_oid, change.latest_oid
+            if change_type == "R":
+                if base_oid is None:
+                    prefetch.append(("base", change.source_path))
+                prefetch.append(("latest", upstream_file))
+                continue
+
+            with PROFILE.phase("local_matching"):
+                local_file = self.source_index.lookup(self._target_path(upstream_file))
+                if not local_file:
+                    if change_type == "A":
+                        prefetch.append(("latest", upstream_file))
+                    continue
+
+                local_rel = str(local_file)
+                local_oid = self.git.get_local_oid(local_rel)
+                self._local_oids[local_rel] = local_oid
+
+            if change_type != "D":
+                scenario = self._lookup_analysis(change, local_rel, local_oid)
+                if scenario == MergeScenario.AUTO_UPDATE:
+                    prefetch.append(("latest", upstream_file))
+                    continue
+                if scenario is not None and scenario not in self.REVIEW_SCENARIOS:
+                    continue
+
+            if local_rel.endswith(".tmpl"):
+                content = self.git.get_file_content("local", local_rel)
+                if content not in self._rendered:
+                    template_sources.append(content)
+            elif change_type == "D":
+                if local_oid == base_oid:
+                    continue
+            elif local_oid == latest_oid:
+                continue
+            elif local_oid == base_oid and latest_oid is not None:
+                prefetch.append(("latest", upstream_file))
+                continue
+
+            prefetch.append(("base", upstream_file))
+            if change_type != "D":
+                prefetch.append(("latest", upstream_file))
+
+        # Stream the blobs through one cat-file session.
+        prefetch = [key for key in dict.fromkeys(prefetch) if key not in self._upstream_blobs]
+        self.git.prefetch_blobs([blob_oids.get(key) for key in prefetch])
+        self._upstream_blobs.update(zip(prefetch, self.git.get_file_contents(prefetch)))
+
+        # Render every local template this pass compares against in one batch.
+        self._rendered.update(zip(template_sources, self.render_templates(template_sources)))
+
+    def plan_all(self, changes: list[UpstreamChange], jobs: int = 1) -> list[PlannedAction]:
+        """Plans every change without a kept plan, returning all plans in input order."""
+        pending = [change for change in changes if change not in self._plans]
+        if pending:
+            self.prepare(pending)
+            if jobs <= 1 or len(pending) <= 1:
+                planned = [self.plan(change) for change in pending]
+            else:
+                with ThreadPoolExecutor(max_workers=jobs) as pool:
+                    planned = list(pool.map(self.plan, pending))
+            self.adopt(pending, planned)
+        return [self._plans[change] for change in changes]
+
+    def adopt(self, changes: list[UpstreamChange], actions: list[PlannedAction]):
+        """Keeps plans computed elsewhere, such as a prefetched plan, as if planned here."""
+        for change, action in zip(changes, actions):
+            self._plans[change] = action
+            for path in (action.path, action.old_path):
+                if path:
+                    self._changes_by_path.setdefault(path, set()).add(change)
+
+    def settle(self, change: UpstreamChange):
+        """Marks an applied change so later passes skip it without re-planning."""
+        action = self._plans.get(change)
+        if action is not None:
+            self._plans[change] = PlannedAction(ActionKind.SKIP, path=action.path, old_path=action.old_path)
+
+    def invalidate(self, paths: list[str]):
+        """Drops kept plans touching the given local paths, including rename partners."""
+        for path in paths:
+            for change in self._changes_by_path.pop(path, set()):
+                action = self._plans.pop(change, None)
+                if action is None:
+                    continue
+                for partner in (action.path, action.old_path):
+                    if partner and partner != path:
+                        self._changes_by_path.get(partner, set()).discard(change)
+
+    def plan(self, change: UpstreamChange) -> PlannedAction:
+        change_type, upstream_file = change.status, change.path
+        if change_type == "R":
+            return self._plan_rename(change)
+
+        rel_target_path = self._target_path(upstream_file)
+        local_file = self.source_index.lookup(rel_target_path)
+
+        if not local_file:
+            if change_type == "A":
+                action = self._plan_import(rel_target_path, change)
+                action.announcement = f"Auto-importing new upstream file {rel_target_path} -> {action.path}"
+                return action
+
+            if change_type == "D":
+                return PlannedAction(
+                    ActionKind.SKIP,
+                    messages=[f"Skipping {rel_target_path} (upstream deleted, local counterpart already absent)."],
+                )
+
+            return PlannedAction(ActionKind.UNRESOLVED, unresolved=rel_target_path or upstream_file)
+
+        local_rel = str(local_file)
+        is_tmpl = local_rel.endswith(".tmpl")
+        base_state = FileState(
+            None,
+            rel_target_path,
+            oid=change.base_oid,
+            loader=lambda: self._read_upstream("base", upstream_file),
+        )
+        template_state = FileState(
+            None,
+            local_rel,
+            is_template=is_tmpl,
+            oid=self._local_oid(local_rel),
+            loader=lambda: self.git.get_file_content("local", local_rel),
+        )
+        if is_tmpl:
+            ours_state = FileState(None, local_rel, loader=lambda: self._render(template_state.load()))
+        else:
+            ours_state = FileState(None, local_rel, oid=template_state.oid, loader=template_state.load)
+
+        if change_type == "D":
+            if template_state.same_as(base_state):
+                return PlannedAction(
+                    ActionKind.DELETE,
+                    path=local_rel,
+                    scenario="AUTO_DELETE",
+                    preview=f"  - {local_rel} [AUTO_DELETE]",
+                    announcement=f"Auto-deleting {rel_target_path} (upstream deleted, local unchanged)...",
+                )
+
+            if local_rel in self.kept_deletion_paths:
+                return PlannedAction(
+                    ActionKind.SKIP,
+                    path=local_rel,
+                    messages=[f"Keeping deleted upstream file as reference: {local_rel}"],
+                )
+
+            return PlannedAction(
+                ActionKind.REVIEW,
+                path=local_rel,
+                scenario=MergeScenario.DELETION_CONFLICT.name,
+                messages=[
+                    f"Deletion conflict: {rel_target_path} (upstream deleted, local file modified)",
+                    "  Keeping the local file preserves it as reference only; upstream may no longer invoke it.",
+                ],
+                merge_item=self._merge_item(
+                    local_rel,
+                    base_state,
+                    FileState("", rel_target_path),
+                    ours_state,
+                    template_state,
+                    MergeScenario.DELETION_CONFLICT,
+                ),
+            )
+
+        theirs_state = FileState(
+            None,
+            rel_target_path,
+            oid=change.latest_oid,
+            loader=lambda: self._read_upstream("latest", upstream_file),
+        )
+
+        cached = self._analyses.get(change)
+        if cached is not None:
+            scenario, merged_content = cached
+        else:
+            scenario, merged_content = self._classify(base_state, theirs_state, ours_state, template_state)
+            key = self._analysis_keys.get(change)
+            if key is not None:
+                self.analysis_cache.put_result(key, scenario.name, merged_content)
+
+        if scenario == MergeScenario.BINARY_CONFLICT and local_rel in self.kept_binary_paths:
+            return PlannedAction(
+                ActionKind.SKIP,
+                path=local_rel,
+                messages=[f"Keeping local binary file: {local_rel}"],
+            )
+
+        if scenario in (MergeScenario.ALREADY_SYNCED, MergeScenario.AUTO_KEEP):
+            return PlannedAction(ActionKind.SKIP, path=local_rel, scenario=scenario.name)
+
+        if scenario in (MergeScenario.AUTO_UPDATE, MergeScenario.AUTO_MERGEABLE):
+            content_to_write = merged_content if scenario == MergeScenario.AUTO_MERGEABLE else theirs_state.load()
+            if content_to_write is None:
+                raise RuntimeError(f"Unexpected None content for {scenario.name}")
+            return PlannedAction(
+                ActionKind.UPDATE,
+                path=local_rel,
+                content=content_to_write,
+                scenario=scenario.name,
+                preview=f"  - {local_rel} [{scenario.name}]",
+                announcement=f"Auto-merging {rel_target_path} ({scenario.name})...",
+            )
+
+        return PlannedAction(
+            ActionKind.REVIEW,
+            path=local_rel,
+            scenario=scenario.name,
+            merge_item=self._merge_item(local_rel, base_state, theirs_state, ours_state, template_state, scenario),
+        )
+
+    def _classify(
+        self,
+        base_state: FileState,
+        theirs_state: FileState,
+        ours_state: FileState,
+        template_state: FileState,
+    ) -> tuple[MergeScenario, Optional[str]]:
+        """Returns the scenario for a modified file and, when git merged it cleanly, the merged content."""
+        scenario = self.engine.analyze(base_state, theirs_state, ours_state, template_state)
+        if scenario != MergeScenario.CONFLICT:
+            return scenario, None
+
+        # Only a real three-way difference needs content; the rest was decided by blob ID.
+        is_binary = any(
+            self.git.is_probably_binary_content(state.load())
+            for state in (base_state, theirs_state, template_state)
+        )
+        if is_binary:
+            return MergeScenario.BINARY_CONFLICT, None
+
+        is_tmpl = template_state.is_template
+        merge_ours_content = template_state.load() if is_tmpl else ours_state.load()
+        success, result = self.git.attempt_merge(base_state.load(), merge_ours_content, theirs_state.load())
+        if success:
+            return MergeScenario.AUTO_MERGEABLE, result
+        if is_tmpl:
+            return MergeScenario.TEMPLATE_DIVERGENCE, None
+        return MergeScenario.CONFLICT, None
+
+    def _lookup_analysis(self, change: UpstreamChange, local_rel: str, local_oid: str) -> Optional[MergeScenario]:
+        """
+        Looks up the cached classification of a modified file. Only files whose
+        analysis reads content are cached: templates, and raw files that differ
+        from both upstream sides. The rest are decided by blob ID alone.
+        """
+        base_oid, latest_oid = change.base_oid, change.latest_oid
+        if self.analysis_cache is None or base_oid is None or latest_oid is None:
+            return None
+        is_tmpl = local_rel.endswith(".tmpl")
+        if not is_tmpl and (local_oid in (base_oid, latest_oid) or base_oid == latest_oid):
+            return None
+
+        key = self.analysis_cache.key(base_oid, latest_oid, local_oid, is_tmpl)
+        self._analysis_keys[change] = key
+        cached = self.analysis_cache.get_result(key)
+        if cached is None or cached[0] not in MergeScenario.__members__:
+            return None
+        scenario = MergeScenario[cached[0]]
+        self._analyses[change] = (scenario, cached[1])
+        return scenario
+
+    def _plan_rename(self, change: UpstreamChange) -> PlannedAction:
+        new_upstream_file, old_upstream_file = change.path, change.source_path
+        base_oid, latest_oid = change.base_oid, change.latest_oid
+        if not old_upstream_file:
+            return PlannedAction(
+                ActionKind.UNRESOLVED,
+                messages=[f"Missing rename source metadata for {new_upstream_file}; manual resolution required."],
+                unresolved=new_upstream_file,
+            )
+
+        rel_old_target = self.to_inner_relative(old_upstream_file)
+        rel_new_target = self.to_inner_relative(new_upstream_file)
+        local_old = self.source_index.lookup(rel_old_target) if rel_old_target is not None else None
+        local_new = self.source_index.lookup(rel_new_target) if rel_new_target is not None else None
+
+        if rel_old_target is not None and rel_new_target is None:
+            if not local_old:
+                unresolved = rel_old_target or old_upstream_file
+                return PlannedAction(
+                    ActionKind.UNRESOLVED,
+                    messages=[f"Missing local counterpart for {unresolved} (R->out); manual resolution required."],
+                    unresolved=unresolved,
+                )
+
+            if self._local_matches(str(local_old), "base", old_upstream_file, base_oid):
+                return PlannedAction(
+                    ActionKind.DELETE,
+                    path=str(local_old),
+                    scenario="AUTO_DELETE",
+                    preview=f"  - {str(local_old)} [AUTO_DELETE]",
+                    announcement=f"Auto-deleting {rel_old_target} (upstream renamed outside inner path)...",
+                )
+
+            return PlannedAction(
+                ActionKind.UNRESOLVED,
+                messages=[f"Rename conflict: {rel_old_target} -> {new_upstream_file} (local file modified)"],
+                unresolved=f"{rel_old_target} -> {new_upstream_file}",
+            )
+
+        if rel_old_target is None and rel_new_target is not None:
+            if local_new:
+                if self._local_matches(str(local_new), "latest", new_upstream_file, latest_oid):
+                    return PlannedAction(ActionKind.SKIP)
+                unresolved = rel_new_target or new_upstream_file
+                return PlannedAction(
+                    ActionKind.UNRESOLVED,
+                    messages=[f"Existing local file for renamed upstream path {unresolved}; manual resolution required."],
+                    unresolved=unresolved,
+                )
+
+            action = self._plan_import(rel_new_target, change)
+            action.announcement = f"Auto-importing renamed upstream file {new_upstream_file} -> {action.path}"
+            return action
+
+        if rel_old_target is None and rel_new_target is None:
+            return PlannedAction(ActionKind.SKIP)
+
+        old_display = rel_old_target or old_upstream_file
+        new_display = rel_new_target or new_upstream_file
+
+        if not local_old:
+            return PlannedAction(
+                ActionKind.UNRESOLVED,
+                messages=[f"Missing local counterpart for {old_display} (R); manual resolution required."],
+                unresolved=old_display,
+            )
+
+        if not self._local_matches(str(local_old), "base", old_upstream_file, base_oid):
+            return PlannedAction(
+                ActionKind.UNRESOLVED,
+                messages=[f"Rename conflict: {old_display} -> {new_display} (local file modified)"],
+                unresolved=f"{old_display} -> {new_display}",
+            )
+
+        new_local_rel = chezmoify_path(
+            rel_new_target, executable=change.is_executable, symlink=change.is_symlink
+        )
+        latest_new_content = self._read_upstream("latest", new_upstream_file)
+        if change.is_symlink and latest_new_content and not latest_new_content.endswith("\n"):
+            latest_new_content = f"{latest_new_content}\n"
+
+        return PlannedAction(
+            ActionKind.RENAME,
+            path=new_local_rel,
+            old_path=str(local_old),
+            content=latest_new_content,
+            scenario="AUTO_RENAME",
+            preview=f"  - {str(local_old)} -> {new_local_rel} [AUTO_RENAME]",
+            announcement=f"Auto-renaming {rel_old_target} -> {rel_new_target}...",
+            unresolved=f"{old_display} -> {new_display}",
+        )
+
+    def _plan_import(self, rel_target_path: str, change: UpstreamChange) -> PlannedAction:
+        dest_rel = chezmoify_path(
+            rel_target_path,
+            executable=change.is_executable,
+            symlink=change.is_symlink,
+        )
+        return PlannedAction(
+            ActionKind.IMPORT,
+            path=dest_rel,
+            content=self._read_upstream("latest", change.path),
+            target=rel_target_path,
+            upstream_file=change.path,
+            mode=change.new_mode,
+            scenario="AUTO_IMPORT",
+            preview=f"  - {dest_rel} [AUTO_IMPORT]",
+        )
+
+    def _merge_item(
+        self,
+        path: str,
+        base: FileState,
+        theirs: FileState,
+        ours: FileState,
+        template: FileState,
+        scenario: MergeScenario,
+    ) -> MergeItem:
+        # The UI edits content directly, so review items carry it loaded.
+        for state in (base, theirs, ours, template):
+            state.load()
+        return MergeItem(path=path, base=base, theirs=theirs, ours=ours, template=template, scenario=scenario)
+
+    def _local_oid(self, local_rel: str) -> str:
+        oid = self._local_oids.get(local_rel)
+        if oid is None:
+            oid = self.git.get_local_oid(local_rel)
+        return oid
+
+    def _local_matches(self, local_rel: str, source: str, upstream_path: str, oid: Optional[str]) -> bool:
+        if oid is not None:
+            return self._local_oid(local_rel) == oid
+        return self.git.get_file_content("local", local_rel) == self._read_upstream(source, upstream_path)
+
+    def _target_path(self, upstream_file: str) -> str:
+        rel_target_path = self.to_inner_relative(upstream_file)
+        return upstream_file if rel_target_path is None else rel_target_path
+
+    def _read_upstream(self, source: str, path: str) -> str:
+        key = (source, path)
+        content = self._upstream_blobs.get(key)
+        if content is None:
+            content = self.git.get_file_content(source, path)
+            with self._lock:
+                self._upstream_blobs[key] = content
+        return content
+
+    def _render(self, content: str) -> str:
+        rendered = self._rendered.get(content)
+        if rendered is None:
+            # The render cache is not thread-safe, so stragglers render one at a time.
+            with self._lock:
+                rendered = self._rendered.get(content)
+                if rendered is None:
+                    rendered = self.render_templates([content])[0]
+                    self._rendered[content] = rendered
+        return rendered
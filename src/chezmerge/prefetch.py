@@ -0,0 +1,105 @@
+import json
+import os
+import time
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Optional
+
+from .git_ops import UpstreamChange
+from .logic import FileState, MergeItem, MergeScenario
+from .planner import ActionKind, PlannedAction
+
+# PlannedAction fields stored as plain JSON values.
+_SCALAR_FIELDS = [field.name for field in fields(PlannedAction) if field.name not in ("kind", "merge_item")]
+
+
+class PlanStore:
+    """
+    A merge plan computed ahead of time by 'chezmerge --prefetch'.
+
+    The plan holds the upstream change list and every PlannedAction, with the
+    content of review items loaded, so a later run can apply it without
+    fetching or analyzing. It is stored under a key describing everything the
+    plan was derived from (see prefetch_key); a run whose key differs ignores
+    it and plans from scratch.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path):
+        self.path = path
+
+    def save(self, key: dict, changes: list[UpstreamChange], actions: list[PlannedAction]):
+        payload = {
+            "version": self.VERSION,
+            "key": key,
+            "created": time.time(),
+            "changes": [asdict(change) for change in changes],
+            "actions": [_action_to_json(action) for action in actions],
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.tmp")
+            tmp_path.write_text(json.dumps(payload, separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp_path, self.path)
+        except OSError:
+            return
+
+    def load(self, key: dict) -> Optional[tuple[list[UpstreamChange], list[PlannedAction], float]]:
+        """Returns (changes, actions, created) when a plan was stored under key, else None."""
+        try:
+            payload = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(payload, dict) or payload.get("version") != self.VERSION or payload.get("key") != key:
+            return None
+        try:
+            changes = [UpstreamChange(**change) for change in payload["changes"]]
+            actions = [_action_from_json(action) for action in payload["actions"]]
+            created = float(payload["created"])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if len(changes) != len(actions):
+            return None
+        return changes, actions, created
+
+    def clear(self):
+        try:
+            self.path.unlink()
+        except OSError:
+            return
+
+
+def _action_to_json(action: PlannedAction) -> dict:
+    data = {name: getattr(action, name) for name in _SCALAR_FIELDS}
+    data["kind"] = action.kind.name
+    item = action.merge_item
+    if item is not None:
+        data["merge_item"] = {
+            "path": item.path,
+            "scenario": item.scenario.name,
+            "base": _state_to_json(item.base),
+            "theirs": _state_to_json(item.theirs),
+            "ours": _state_to_json(item.ours),
+            "template": _state_to_json(item.template),
+        }
+    return data
+
+
+def _action_from_json(data: dict) -> PlannedAction:
+    action = PlannedAction(ActionKind[data["kind"]], **{name: data[name] for name in _SCALAR_FIELDS})
+    item = data.get("merge_item")
+    if item is not None:
+        action.merge_item = MergeItem(
+            path=item["path"],
+            base=FileState(**item["base"]),
+            theirs=FileState(**item["theirs"]),
+            ours=FileState(**item["ours"]),
+            template=FileState(**item["template"]),
+            scenario=MergeScenario[item["scenario"]],
+        )
+    return action
+
+
+def _state_to_json(state: FileState) -> dict:
+    return {"content": state.load(), "path": state.path, "is_template": state.is_template, "oid": state.oid}
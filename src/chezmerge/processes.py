@@ -0,0 +1,127 @@
+import json
+import os
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from .profiling import PROFILE
+
+LEDGER_ENV = "CHEZMERGE_PROCESS_LEDGER"
+
+
+@dataclass
+class ProcessRecord:
+    """One external process launch: its command line, lifetime and I/O volume."""
+    argv: list[str]
+    program: str = field(init=False)
+    seconds: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    returncode: Optional[int] = None
+    started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def __post_init__(self):
+        self.program = os.path.basename(self.argv[0]) if self.argv else ""
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "program": self.program,
+            "argv": self.argv,
+            "seconds": round(self.seconds, 6),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "returncode": self.returncode,
+        })
+
+
+class ProcessLedger:
+    """
+    Collects a ProcessRecord for every process chezmerge launches.
+
+    When CHEZMERGE_PROCESS_LEDGER names a file, each record is also appended
+    to it as one JSON line, so tests can put an upper bound on the number of
+    processes a scenario spawns.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.records: list[ProcessRecord] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls) -> "ProcessLedger":
+        path = os.environ.get(LEDGER_ENV)
+        return cls(Path(path) if path else None)
+
+    def record(self, record: ProcessRecord):
+        with self._lock:
+            self.records.append(record)
+            if self.path is None:
+                return
+            try:
+                with open(self.path, "a", encoding="utf-8") as handle:
+                    handle.write(record.to_json() + "\n")
+            except OSError:
+                self.path = None
+
+    def count(self, program: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(1 for record in self.records if program is None or record.program == program)
+
+
+LEDGER = ProcessLedger.from_environment()
+
+
+def run_process(
+    argv: list[str],
+    cwd: Optional[Path] = None,
+    input=None,
+    text: bool = True,
+    check: bool = False,
+    capture_output: bool = True,
+) -> subprocess.CompletedProcess:
+    """
+    Runs argv to completion, like subprocess.run, and records it in the ledger.
+    Output is captured unless capture_output is False (e.g. for an interactive editor).
+    """
+    record = ProcessRecord(list(argv), bytes_in=_size(input))
+    try:
+        result = subprocess.run(argv, cwd=cwd, input=input, capture_output=capture_output, text=text)
+    finally:
+        record.seconds = time.perf_counter() - record.started
+        PROFILE.record_subprocess(record.argv, record.seconds)
+
+    record.returncode = result.returncode
+    record.bytes_out = _size(result.stdout) + _size(result.stderr)
+    LEDGER.record(record)
+    if check:
+        result.check_returncode()
+    return result
+
+
+def start_process(argv: list[str], cwd: Optional[Path] = None, **popen_kwargs) -> tuple[subprocess.Popen, ProcessRecord]:
+    """
+    Launches a long-lived process. The caller adds to the returned record's
+    byte counters while talking to it and passes it to finish_process once the
+    process has exited.
+    """
+    PROFILE.record_subprocess(argv, 0.0)
+    record = ProcessRecord(list(argv))
+    return subprocess.Popen(argv, cwd=cwd, **popen_kwargs), record
+
+
+def finish_process(proc: subprocess.Popen, record: ProcessRecord):
+    record.seconds = time.perf_counter() - record.started
+    record.returncode = proc.returncode
+    LEDGER.record(record)
+
+
+def _size(data) -> int:
+    if data is None:
+        return 0
+    if isinstance(data, str):
+        return len(data.encode("utf-8", errors="surrogateescape"))
+    return len(data)
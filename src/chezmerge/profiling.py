@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+def command_name(argv: list[str]) -> str:
+    """Groups a command line by program and subcommand, skipping git's '-c key=value' options."""
+    if not argv:
+        return ""
+    words = [os.path.basename(argv[0])]
+    index = 1
+    while index < len(argv):
+        arg = argv[index]
+        if arg == "-c":
+            index += 2
+            continue
+        if not arg.startswith("-"):
+            words.append(arg)
+            break
+        index += 1
+    return " ".join(words)
+
+
+class RunProfile:
+    """
+    Wall time and counts for each phase of a run and each spawned subprocess.
+
+    Disabled by default, in which case phase() and the record methods do no
+    work. Phases may nest and may run on worker threads, so their totals can
+    add up to more than the wall time of the run.
+    """
+
+    VERSION = 1
+
+    def __init__(self):
+        self.enabled = False
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._phases: dict[str, dict] = {}
+        self._subprocesses: dict[str, dict] = {}
+        self._counters: dict[str, int] = {}
+
+    def enable(self):
+        self.enabled = True
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(self._phases, name, time.perf_counter() - started)
+
+    def count(self, name: str, amount: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def record_subprocess(self, argv: list[str], seconds: float):
+        if self.enabled:
+            self._add(self._subprocesses, command_name(argv), seconds)
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "version": self.VERSION,
+                "wall_seconds": round(time.perf_counter() - self._started, 6),
+                "phases": self._rounded(self._phases),
+                "subprocesses": self._rounded(self._subprocesses),
+                "counters": dict(sorted(self._counters.items())),
+            }
+
+    def write(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=2) + "\n", encoding="utf-8")
+
+    def _add(self, table: dict[str, dict], name: str, seconds: float):
+        with self._lock:
+            entry = table.setdefault(name, {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+
+    @staticmethod
+    def _rounded(table: dict[str, dict]) -> dict[str, dict]:
+        return {
+            name: {"calls": entry["calls"], "seconds": round(entry["seconds"], 6)}
+            for name, entry in sorted(table.items())
+        }
+
+
+PROFILE = RunProfile()
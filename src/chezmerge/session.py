@@ -1,12 +1,23 @@
 import json
 import shutil
 from pathlib import Path
+from typing import Optional
 
-from .git_ops import GitHandler
+from .git_ops import GitHandler, UpstreamChange
 
 
 class MergeSessionManager:
-    VERSION = 1
+    """
+    Tracks an uncommitted merge in .git/chezmerge-session.
+
+    The manifest records the commits the session merges between and a journal
+    of the upstream changes already applied, each with the blob ID it staged
+    (None for a deletion). 'chezmerge --continue' trusts journal entries whose
+    paths still carry those IDs in both the index and the worktree, and plans
+    only the rest.
+    """
+
+    VERSION = 2
 
     def __init__(self, repo_path: Path):
         self.repo_path = repo_path.resolve()
@@ -17,13 +28,16 @@ class MergeSessionManager:
     def has_session(self) -> bool:
         return self.manifest_path.exists()
 
-    def start(self, base_submodule_sha: str):
+    def start(self, base_submodule_sha: str, latest_submodule_sha: str = "", inner_path: str = ""):
         if self.has_session():
             return
 
         manifest = {
             "version": self.VERSION,
             "base_submodule_sha": base_submodule_sha,
+            "latest_submodule_sha": latest_submodule_sha,
+            "inner_path": inner_path.strip("/"),
+            "journal": [],
         }
         self._write_manifest(manifest)
 
@@ -32,11 +46,62 @@ class MergeSessionManager:
             shutil.rmtree(self.session_dir)
 
     def record_path(self, git: GitHandler, path: str):
-        # Kept as a no-op so the merge flow can continue to mark session activity
-        # without maintaining per-path rollback state.
+        # Rollback restores the whole tree to HEAD, so paths need no state of
+        # their own until their change is journaled by record_decisions.
         if not self.has_session():
             raise RuntimeError("Cannot record path without an active chezmerge session")
 
+    def record_decisions(self, git: GitHandler, decisions: list[tuple[UpstreamChange, str, Optional[str], str]]):
+        """
+        Journals applied changes, given as (change, local path, old local path,
+        decision) once their results are staged.
+        """
+        if not decisions:
+            return
+        manifest = self._read_manifest()
+        if not manifest:
+            raise RuntimeError("Cannot record decisions without an active chezmerge session")
+
+        # A change decided again (e.g. after its file changed) replaces its old entry.
+        keys = {(change.status, change.path, change.source_path) for change, _, _, _ in decisions}
+        journal = [entry for entry in manifest.get("journal", []) if tuple(entry["change"]) not in keys]
+        for change, path, old_path, decision in decisions:
+            journal.append({
+                "change": [change.status, change.path, change.source_path],
+                "decision": decision,
+                "path": path,
+                "oid": git.find_local_oid(path),
+                "old_path": old_path if old_path != path else None,
+            })
+        manifest["journal"] = journal
+        self._write_manifest(manifest)
+
+    def read_journal(self) -> Optional[dict]:
+        """Returns the manifest of a session that can be continued, or None for older sessions."""
+        manifest = self._read_manifest()
+        if not manifest or manifest.get("version") != self.VERSION:
+            return None
+        return manifest
+
+    def settled_changes(self, git: GitHandler, manifest: dict) -> tuple[set[tuple], list[str]]:
+        """
+        Returns the journaled changes whose results are still both staged and
+        on disk, as (status, path, source_path) keys, and the local paths of
+        those that changed since.
+        """
+        index = git.get_index_oids()
+        settled: set[tuple] = set()
+        changed: list[str] = []
+        for entry in manifest.get("journal", []):
+            old_path = entry.get("old_path")
+            staged = index.get(entry["path"]) == entry["oid"] and (not old_path or old_path not in index)
+            on_disk = git.find_local_oid(entry["path"]) == entry["oid"] and git.find_local_oid(old_path) is None
+            if staged and on_disk:
+                settled.add(tuple(entry["change"]))
+            else:
+                changed.append(entry["path"])
+        return settled, changed
+
     def abort(self, git: GitHandler):
         manifest = self._read_manifest()
         if not manifest:
@@ -1,18 +1,24 @@
 import shutil
-import subprocess
 import tempfile
 from pathlib import Path
+from typing import Callable
+
+from rich.text import Text
 
 from textual.app import App, ComposeResult
+from textual.screen import ModalScreen
 from textual.containers import Grid, Horizontal, Vertical
-from textual.widgets import Button, Footer, Header, Static, TextArea
+from textual.widgets import Button, Footer, Header, OptionList, Static, TextArea
 
 from .logic import MergeItem, MergeScenario
+from .processes import run_process
 
 
-class DeletionConflictChoiceApp(App[str | None]):
-    CSS = """
-    Screen {
+class ConflictChoiceScreen(ModalScreen[str | None]):
+    """Dialog asking how to resolve a conflict the text editor cannot handle."""
+
+    DEFAULT_CSS = """
+    ConflictChoiceScreen {
         align: center middle;
     }
 
@@ -42,6 +48,21 @@ class DeletionConflictChoiceApp(App[str | None]):
     }
     """
 
+    def __init__(self, item: MergeItem):
+        super().__init__()
+        self.item = item
+
+    def on_mount(self) -> None:
+        self.query_one("#keep", Button).focus()
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        self.dismiss(event.button.id)
+
+    def action_cancel_choice(self) -> None:
+        self.dismiss(None)
+
+
+class DeletionConflictChoiceScreen(ConflictChoiceScreen):
     BINDINGS = [
         ("k", "keep_choice", "Keep"),
         ("d", "delete_choice", "Delete"),
@@ -49,10 +70,6 @@ class DeletionConflictChoiceApp(App[str | None]):
         ("escape", "cancel_choice", "Quit"),
     ]
 
-    def __init__(self, item: MergeItem):
-        super().__init__()
-        self.item = item
-
     def compose(self) -> ComposeResult:
         if self.item.deletion_reviewed:
             title = "Deleted Upstream: Keep What You Saved Or Delete It"
@@ -85,39 +102,23 @@ class DeletionConflictChoiceApp(App[str | None]):
             id="dialog",
         )
 
-    def on_mount(self) -> None:
-        self.sub_title = self.item.path
-        self.query_one("#keep", Button).focus()
-
-    def on_button_pressed(self, event: Button.Pressed) -> None:
-        self.exit(event.button.id)
-
     def action_keep_choice(self) -> None:
-        self.exit("keep")
+        self.dismiss("keep")
 
     def action_delete_choice(self) -> None:
-        self.exit("delete")
+        self.dismiss("delete")
 
     def action_look_choice(self) -> None:
-        self.exit("look")
-
-    def action_cancel_choice(self) -> None:
-        self.exit(None)
-
+        self.dismiss("look")
 
-class BinaryConflictChoiceApp(App[str | None]):
-    CSS = DeletionConflictChoiceApp.CSS
 
+class BinaryConflictChoiceScreen(ConflictChoiceScreen):
     BINDINGS = [
         ("k", "keep_choice", "Keep Mine"),
         ("t", "take_choice", "Take Theirs"),
         ("escape", "cancel_choice", "Quit"),
     ]
 
-    def __init__(self, item: MergeItem):
-        super().__init__()
-        self.item = item
-
     def compose(self) -> ComposeResult:
         body = (
             "Upstream and local both changed this binary file.\n\n"
@@ -139,26 +140,35 @@ class BinaryConflictChoiceApp(App[str | None]):
             id="dialog",
         )
 
-    def on_mount(self) -> None:
-        self.sub_title = self.item.path
-        self.query_one("#keep", Button).focus()
-
-    def on_button_pressed(self, event: Button.Pressed) -> None:
-        self.exit(event.button.id)
-
     def action_keep_choice(self) -> None:
-        self.exit("keep")
+        self.dismiss("keep")
 
     def action_take_choice(self) -> None:
-        self.exit("take")
-
-    def action_cancel_choice(self) -> None:
-        self.exit(None)
+        self.dismiss("take")
 
 
 class ChezmergeApp(App[list[MergeItem]]):
+    """
+    Works through a queue of merge items in one session.
+
+    Text and template conflicts are edited in the pane grid; deletion and
+    binary conflicts are decided in a dialog. Each item is handed to
+    on_resolved as soon as it is saved, so work survives quitting midway.
+    """
+
     CSS = """
+    #workspace {
+        height: 1fr;
+    }
+
+    #queue {
+        width: 36;
+        height: 100%;
+        border: solid $secondary;
+    }
+
     Grid {
+        width: 1fr;
         layout: grid;
         grid-size: 3 2;
         grid-rows: 1fr 2fr;
@@ -190,13 +200,14 @@ class ChezmergeApp(App[list[MergeItem]]):
         self,
         items: list[MergeItem],
         external_editor: str | None = None,
-        deletion_inspect_mode: bool = False,
+        on_resolved: Callable[[MergeItem], None] | None = None,
     ):
         super().__init__()
         self.items = items
         self.current_index = 0
         self.external_editor = external_editor
-        self.deletion_inspect_mode = deletion_inspect_mode
+        self.on_resolved = on_resolved
+        self.resolved: set[int] = set()
 
     def action_copy(self):
         widget = self.screen.focused
@@ -279,7 +290,7 @@ class ChezmergeApp(App[list[MergeItem]]):
                 cmd.extend(["-p", str(result_file), str(theirs_file), str(base_file), str(ours_file)])
 
             with self.suspend():
-                exit_code = subprocess.call(cmd)
+                exit_code = run_process(cmd, capture_output=False).returncode
 
             if result_file.exists():
                 new_content = result_file.read_text()
@@ -293,15 +304,31 @@ class ChezmergeApp(App[list[MergeItem]]):
                     self.notify("Returned from external editor")
 
     def action_quit(self) -> None:
+        item = self.items[self.current_index] if self.current_index < len(self.items) else None
+        if item is not None and item.deletion_inspecting:
+            # Leaving an inspection returns to the deletion choice without saving.
+            item.deletion_inspecting = False
+            self.load_current_item()
+            return
         self.exit(None)
 
+    def check_action(self, action: str, parameters: tuple[object, ...]) -> bool | None:
+        # Editor actions must not fire underneath a choice dialog.
+        if isinstance(self.screen, ModalScreen) and action in ("save_merge", "cycle_focus", "edit_external"):
+            return False
+        return True
+
     def compose(self) -> ComposeResult:
         yield Header()
-        yield Grid(
-            TextArea(id="theirs", read_only=True, classes="pane"),
-            TextArea(id="base", read_only=True, classes="pane"),
-            TextArea(id="ours", read_only=True, classes="pane"),
-            TextArea(id="template", classes="pane"),
+        yield Horizontal(
+            OptionList(*(self._queue_label(index) for index in range(len(self.items))), id="queue"),
+            Grid(
+                TextArea(id="theirs", read_only=True, classes="pane"),
+                TextArea(id="base", read_only=True, classes="pane"),
+                TextArea(id="ours", read_only=True, classes="pane"),
+                TextArea(id="template", classes="pane"),
+            ),
+            id="workspace",
         )
         yield Footer()
 
@@ -315,6 +342,14 @@ class ChezmergeApp(App[list[MergeItem]]):
 
         item = self.items[self.current_index]
         self.sub_title = f"Merging [{self.current_index + 1}/{len(self.items)}]: {item.path}"
+        self.query_one("#queue", OptionList).highlighted = self.current_index
+
+        if item.scenario == MergeScenario.BINARY_CONFLICT:
+            for pane in ("theirs", "base", "ours", "template"):
+                self.query_one(f"#{pane}", TextArea).text = ""
+            self.query_one("#template", TextArea).border_title = f"Binary: {item.path}"
+            self.push_screen(BinaryConflictChoiceScreen(item), self._on_binary_choice)
+            return
 
         def set_pane(id, title, content):
             widget = self.query_one(f"#{id}", TextArea)
@@ -341,19 +376,84 @@ class ChezmergeApp(App[list[MergeItem]]):
         template_widget.read_only = False
         template_widget.focus()
 
+        if item.scenario == MergeScenario.DELETION_CONFLICT and not item.deletion_inspecting:
+            self.push_screen(DeletionConflictChoiceScreen(item), self._on_deletion_choice)
+            return
+
         if item.scenario == MergeScenario.DELETION_CONFLICT:
             self.notify("Review or edit this file, then press Ctrl+s to keep it as reference.")
 
-        if self.external_editor and (
-            item.scenario != MergeScenario.DELETION_CONFLICT or self.deletion_inspect_mode
-        ):
+        if self.external_editor:
             self.call_later(self.action_edit_external)
 
     def action_save_merge(self):
-        if self.current_index < len(self.items):
-            item = self.items[self.current_index]
+        if self.current_index >= len(self.items):
+            return
+
+        item = self.items[self.current_index]
+        item.template.content = self.query_one("#template", TextArea).text
+        if item.deletion_inspecting:
+            # Saving an inspection returns to the deletion choice in its reviewed state.
+            item.deletion_inspecting = False
+            item.deletion_reviewed = True
+            self.load_current_item()
+            return
+
+        item.delete_on_save = False
+        self._resolve_current()
+
+    def on_option_list_option_selected(self, event: OptionList.OptionSelected) -> None:
+        index = event.option_index
+        if index == self.current_index or index in self.resolved:
+            return
+
+        item = self.items[self.current_index]
+        if item.scenario not in (MergeScenario.DELETION_CONFLICT, MergeScenario.BINARY_CONFLICT):
+            # Keep unsaved edits so switching back does not lose them.
             item.template.content = self.query_one("#template", TextArea).text
-            item.delete_on_save = False
+        item.deletion_inspecting = False
+        self.current_index = index
+        self.load_current_item()
+
+    def _on_deletion_choice(self, choice: str | None) -> None:
+        item = self.items[self.current_index]
+        if choice is None:
+            self.exit(None)
+        elif choice == "look":
+            item.deletion_inspecting = True
+            self.load_current_item()
+        else:
+            item.delete_on_save = choice == "delete"
+            self._resolve_current()
 
-        self.current_index += 1
+    def _on_binary_choice(self, choice: str | None) -> None:
+        item = self.items[self.current_index]
+        if choice is None:
+            self.exit(None)
+            return
+
+        item.keep_local_on_save = choice == "keep"
+        item.take_theirs_on_save = choice == "take"
+        self._resolve_current()
+
+    def _resolve_current(self):
+        self.resolved.add(self.current_index)
+        if self.on_resolved:
+            self.on_resolved(self.items[self.current_index])
+        self.query_one("#queue", OptionList).replace_option_prompt_at_index(
+            self.current_index, self._queue_label(self.current_index)
+        )
+
+        pending = [index for index in range(len(self.items)) if index not in self.resolved]
+        if not pending:
+            self.exit(self.items)
+            return
+
+        later = [index for index in pending if index > self.current_index]
+        self.current_index = later[0] if later else pending[0]
         self.load_current_item()
+
+    def _queue_label(self, index: int) -> Text:
+        item = self.items[index]
+        marker = "✓" if index in self.resolved else " "
+        return Text(f"{marker} {item.path}\n    {item.scenario.name}")
@@ -0,0 +1,74 @@
+#!/bin/bash
+# Times a dry-run over a 1,000-file change set with serial and parallel analysis.
+# Usage: bash tests/bench/bench_parallel_analysis.sh [file_count] [jobs]
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+FILE_COUNT="${1:-1000}"
+JOBS="${2:-8}"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+
+echo "Benchmark Directory: $TEST_DIR"
+echo "Files: $FILE_COUNT, parallel jobs: $JOBS"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "bench@example.com"
+git config user.name "Bench User"
+mkdir -p .config/bench
+for i in $(seq 1 "$FILE_COUNT"); do
+    printf 'header %s\n1\n2\n3\n4\n5\n6\n7\n8\nfooter %s\n' "$i" "$i" > ".config/bench/file$i"
+done
+git add .
+git commit -m "Initial commit" --quiet
+
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+# Both sides edit every file on different lines, so each one needs a three-way merge.
+for i in $(seq 1 "$FILE_COUNT"); do
+    sed -i "s/^footer $i\$/footer $i upstream/" ".config/bench/file$i"
+    sed -i "s/^header $i\$/header $i local/" "$LOCAL_DIR/dot_config/bench/file$i"
+done
+git commit -am "Upstream edits" --quiet
+git -C "$LOCAL_DIR" commit -am "Local edits" --quiet
+
+run_dry() {
+    local jobs="$1"
+    local start end
+    # Cached classifications would skip the merges being timed.
+    rm -rf "$LOCAL_DIR/.git/chezmerge-cache/analysis"
+    start=$(date +%s%N)
+    uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --jobs "$jobs" > "$TEST_DIR/out-$jobs.txt"
+    end=$(date +%s%N)
+    echo $(( (end - start) / 1000000 ))
+}
+
+# Warm the fetch, object and index caches so both timed runs see the same state.
+# The analysis cache is cleared before each timed run (see run_dry).
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --jobs 1 > /dev/null
+
+SERIAL=$(run_dry 1)
+PARALLEL=$(run_dry "$JOBS")
+
+if ! cmp -s "$TEST_DIR/out-1.txt" "$TEST_DIR/out-$JOBS.txt"; then
+    echo "FAILURE: Parallel analysis produced different output"
+    diff "$TEST_DIR/out-1.txt" "$TEST_DIR/out-$JOBS.txt" | head -20
+    exit 1
+fi
+
+echo "jobs=1:     ${SERIAL}ms"
+echo "jobs=$JOBS: ${PARALLEL}ms"
+python3 -c "print(f'speedup:    {$SERIAL / $PARALLEL:.2f}x')"
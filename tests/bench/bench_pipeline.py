@@ -0,0 +1,260 @@
+"""
+Benchmarks the chezmerge update pipeline on generated repository pairs.
+
+Each scenario builds an upstream repository and a chezmoi source that imported
+it over a file:// remote, then applies a synthetic upstream change set shaped
+by the ratios below. A dry run and a full (non-interactive) merge are timed on
+fresh copies of the source, and throughput, peak RSS and process counts from
+the CHEZMERGE_PROCESS_LEDGER are reported. Results can be saved as a named
+baseline and later runs compared against it.
+
+Usage:
+    uv run python tests/bench/bench_pipeline.py --files 2000 --template-ratio 0.2
+    uv run python tests/bench/bench_pipeline.py --save-baseline laptop
+    uv run python tests/bench/bench_pipeline.py --compare laptop
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+FILES_PER_DIR = 100
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark chezmerge on generated repositories")
+    parser.add_argument("--files", type=int, default=1000, help="Files in the upstream repository")
+    parser.add_argument("--change-ratio", type=float, default=0.5, help="Share of files changed upstream")
+    parser.add_argument("--template-ratio", type=float, default=0.1, help="Share of local files kept as .tmpl")
+    parser.add_argument("--rename-ratio", type=float, default=0.05, help="Share of changed files renamed upstream")
+    parser.add_argument("--binary-ratio", type=float, default=0.02, help="Share of files with binary content")
+    parser.add_argument("--local-edit-ratio", type=float, default=0.25, help="Share of changed text files also edited locally")
+    parser.add_argument("--file-size", type=int, default=2048, help="Approximate size of each file in bytes")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per mode; the median is reported")
+    parser.add_argument("--jobs", type=int, default=min(8, os.cpu_count() or 1), help="Passed to chezmerge --jobs")
+    parser.add_argument("--merge-engine", default="git", help="Passed to chezmerge --merge-engine")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for the generated content")
+    parser.add_argument("--warm", action="store_true", help="Keep .git/chezmerge-cache between timed runs")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated repositories")
+    parser.add_argument("--save-baseline", metavar="NAME", help="Store the results as a named baseline")
+    parser.add_argument("--compare", metavar="NAME", help="Compare the results with a named baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against the baseline")
+    return parser.parse_args()
+
+
+def git(args: list[str], cwd: Path):
+    subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True)
+
+
+def text_content(index: int, size: int, rng: random.Random) -> str:
+    lines = [f"header {index}"]
+    while sum(len(line) + 1 for line in lines) < size:
+        lines.append(f"{index}-{rng.getrandbits(64):016x}")
+    lines.append(f"footer {index}")
+    return "\n".join(lines) + "\n"
+
+
+def binary_content(size: int, rng: random.Random) -> bytes:
+    return b"\0" + rng.randbytes(max(size - 1, 1))
+
+
+def generate(workdir: Path, args: argparse.Namespace) -> tuple[Path, dict]:
+    """Builds the repository pair and returns the source directory and the change counts."""
+    rng = random.Random(args.seed)
+    upstream = workdir / "upstream"
+    source = workdir / "source"
+    upstream.mkdir()
+    git(["init", "--quiet"], upstream)
+    git(["config", "user.email", "bench@example.com"], upstream)
+    git(["config", "user.name", "Bench User"], upstream)
+
+    files = []
+    binary_count = int(args.files * args.binary_ratio)
+    for index in range(args.files):
+        is_binary = index < binary_count
+        name = f"blob{index}.bin" if is_binary else f"file{index}"
+        rel = Path(".config/bench") / f"d{index // FILES_PER_DIR}" / name
+        path = upstream / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if is_binary:
+            path.write_bytes(binary_content(args.file_size, rng))
+        else:
+            path.write_text(text_content(index, args.file_size, rng))
+        files.append((index, rel, is_binary))
+
+    git(["add", "."], upstream)
+    git(["commit", "--quiet", "-m", "Initial commit"], upstream)
+    run_chezmerge(["--repo", f"file://{upstream}", "--source", str(source)], quiet=True)
+    git(["add", "."], source)
+    git(["commit", "--quiet", "-m", "Baseline import"], source)
+
+    def local_path(rel: Path) -> Path:
+        return source / "dot_config" / rel.relative_to(".config")
+
+    text_files = [entry for entry in files if not entry[2]]
+    for _, rel, _ in rng.sample(text_files, int(len(text_files) * args.template_ratio)):
+        local = local_path(rel)
+        local.rename(local.with_name(local.name + ".tmpl"))
+
+    changed = rng.sample(files, int(args.files * args.change_ratio))
+    renamed = set(id(entry) for entry in rng.sample(changed, int(len(changed) * args.rename_ratio)))
+    counts = {"changed": len(changed), "renamed": len(renamed), "binary": 0, "local_edits": 0}
+    for entry in changed:
+        index, rel, is_binary = entry
+        path = upstream / rel
+        if id(entry) in renamed:
+            git(["mv", str(rel), str(rel.with_name(rel.name + "-renamed"))], upstream)
+            continue
+        if is_binary:
+            path.write_bytes(binary_content(args.file_size, rng))
+            counts["binary"] += 1
+            continue
+        path.write_text(path.read_text().replace(f"footer {index}\n", f"footer {index} upstream\n"))
+        if rng.random() < args.local_edit_ratio:
+            local = local_path(rel)
+            if not local.exists():
+                local = local.with_name(local.name + ".tmpl")
+            local.write_text(local.read_text().replace(f"header {index}\n", f"header {index} local\n", 1))
+            counts["local_edits"] += 1
+
+    git(["commit", "--quiet", "-am", "Upstream changes"], upstream)
+    git(["add", "."], source)
+    git(["commit", "--quiet", "-m", "Local changes"], source)
+    return source, counts
+
+
+def run_chezmerge(args: list[str], quiet: bool = False, ledger: Path = None) -> dict:
+    """Runs chezmerge in a child process and returns its wall time and peak RSS."""
+    env = dict(os.environ, PYTHONPATH=str(PROJECT_ROOT / "src"))
+    if ledger is not None:
+        env["CHEZMERGE_PROCESS_LEDGER"] = str(ledger)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "chezmerge.main", *args],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL if quiet else subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    output = proc.stdout.read().decode() if proc.stdout else ""
+    _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - started
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"chezmerge {' '.join(args)} exited with {proc.returncode}:\n{output}")
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak_rss_kb = usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+    return {"seconds": seconds, "peak_rss_kb": peak_rss_kb, "output": output}
+
+
+def count_processes(ledger: Path) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    if ledger.exists():
+        for line in ledger.read_text().splitlines():
+            program = json.loads(line)["program"]
+            counts[program] = counts.get(program, 0) + 1
+    return dict(sorted(counts.items()))
+
+
+def measure(source: Path, workdir: Path, mode: str, args: argparse.Namespace, changed: int) -> dict:
+    """Times mode ('dry_run' or 'merge') on fresh copies of source and returns median figures."""
+    runs = []
+    for attempt in range(args.repeat):
+        copy = workdir / f"{mode}-{attempt}"
+        shutil.copytree(source, copy, symlinks=True)
+        if not args.warm:
+            shutil.rmtree(copy / ".git" / "chezmerge-cache", ignore_errors=True)
+        ledger = workdir / f"{mode}-{attempt}.ledger"
+        flags = ["--source", str(copy), "--jobs", str(args.jobs), "--merge-engine", args.merge_engine]
+        if mode == "dry_run":
+            flags.append("--dry-run")
+        result = run_chezmerge(flags, ledger=ledger)
+        if mode == "merge" and "Merge complete." not in result["output"]:
+            raise RuntimeError(f"Full merge did not complete:\n{result['output']}")
+        result["processes"] = count_processes(ledger)
+        runs.append(result)
+        shutil.rmtree(copy)
+
+    seconds = statistics.median(run["seconds"] for run in runs)
+    return {
+        "seconds": round(seconds, 4),
+        "files_per_second": round(changed / seconds, 1) if seconds else None,
+        "peak_rss_kb": max(run["peak_rss_kb"] for run in runs),
+        "processes": runs[-1]["processes"],
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    ok = True
+    if baseline["params"] != results["params"]:
+        print("Warning: baseline was recorded with different parameters.")
+    for mode in ("dry_run", "merge"):
+        before, after = baseline[mode], results[mode]
+        ratio = after["seconds"] / before["seconds"] if before["seconds"] else 1.0
+        status = "ok"
+        if ratio > 1 + tolerance:
+            status = "SLOWER"
+            ok = False
+        print(f"{mode:8} {before['seconds']:8.3f}s -> {after['seconds']:8.3f}s ({ratio:5.2f}x) {status}")
+        for program in sorted(set(before["processes"]) | set(after["processes"])):
+            old, new = before["processes"].get(program, 0), after["processes"].get(program, 0)
+            if new > old:
+                print(f"         {program} processes {old} -> {new}")
+                ok = False
+    return ok
+
+
+def main() -> int:
+    args = parse_args()
+    workdir = Path(tempfile.mkdtemp(prefix="chezmerge-bench-"))
+    try:
+        print(f"Benchmark directory: {workdir}")
+        started = time.perf_counter()
+        source, counts = generate(workdir, args)
+        print(f"Generated {args.files} files ({counts}) in {time.perf_counter() - started:.1f}s")
+
+        params = {
+            key: getattr(args, key)
+            for key in (
+                "files", "change_ratio", "template_ratio", "rename_ratio",
+                "binary_ratio", "local_edit_ratio", "file_size", "jobs", "merge_engine", "seed", "warm",
+            )
+        }
+        results = {"params": params, "changes": counts}
+        for mode in ("dry_run", "merge"):
+            results[mode] = measure(source, workdir, mode, args, counts["changed"])
+            figures = results[mode]
+            print(
+                f"{mode:8} {figures['seconds']:8.3f}s  {figures['files_per_second']:>8} files/s  "
+                f"peak RSS {figures['peak_rss_kb'] / 1024:.1f} MiB  processes {figures['processes']}"
+            )
+    finally:
+        if args.keep:
+            print(f"Kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        path = BASELINE_DIR / f"{args.save_baseline}.json"
+        path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Saved baseline {path}")
+
+    if args.compare:
+        path = BASELINE_DIR / f"{args.compare}.json"
+        if not compare(results, json.loads(path.read_text()), args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+ANALYSIS_DIR="$LOCAL_DIR/.git/chezmerge-cache/analysis"
+
+echo "Running Analysis Cache E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+printf "alias ll='ls -l'\nalias la='ls -a'\nalias l='ls'\nalias g='git'\n" > .aliases
+echo "umask 022" > .profile
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+printf "alias ll='ls -l'\nalias la='ls -a'\nalias l='ls'\nalias g='git status'\n" > "$LOCAL_DIR/dot_aliases"
+echo "umask 077" > "$LOCAL_DIR/dot_profile"
+git -C "$LOCAL_DIR" commit -am "Local tweaks" --quiet
+
+printf "alias ll='ls -lh'\nalias la='ls -a'\nalias l='ls'\nalias g='git'\n" > .aliases
+echo "umask 027" > .profile
+git commit -am "Upstream tweaks" --quiet
+
+dry_run() {
+    start_process_ledger
+    OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run "$@")
+    MERGES=$(grep -c '"argv": \["git"[^]]*"merge-file"' "$CHEZMERGE_PROCESS_LEDGER" || true)
+    assert_process_budget git 20 "dry run${*:+ $*}"
+    for expected in "dot_aliases \[AUTO_MERGEABLE\]" "dot_profile \[CONFLICT\]"; do
+        if ! echo "$OUTPUT" | grep -q "$expected"; then
+            echo "$OUTPUT"
+            echo "FAILURE: Expected '$expected' in the dry run output"
+            exit 1
+        fi
+    done
+}
+
+echo "--- First Dry Run Fills The Cache ---"
+dry_run
+if [ "$MERGES" -ne 2 ] || [ -z "$(ls -A "$ANALYSIS_DIR")" ]; then
+    echo "FAILURE: Expected two merge attempts and cached analysis entries, got $MERGES"
+    exit 1
+fi
+
+echo "--- Second Dry Run Reuses It ---"
+dry_run
+if [ "$MERGES" -ne 0 ]; then
+    echo "FAILURE: Expected cached classifications to skip merge-file, got $MERGES"
+    exit 1
+fi
+
+echo "--- --no-cache Analyzes Again ---"
+dry_run --no-cache
+if [ "$MERGES" -ne 2 ]; then
+    echo "FAILURE: Expected --no-cache to bypass the analysis cache, got $MERGES"
+    exit 1
+fi
+
+echo "--- Local Edits Miss The Cache ---"
+printf "alias ll='ls -l'\nalias la='ls -a'\nalias l='ls -F'\nalias g='git status'\n" > "$LOCAL_DIR/dot_aliases"
+git -C "$LOCAL_DIR" commit -am "Classify entries" --quiet
+dry_run
+if [ "$MERGES" -ne 1 ]; then
+    echo "FAILURE: Expected only the edited file to be merged again, got $MERGES"
+    exit 1
+fi
+
+echo "--- Merged Content Comes From The Cache ---"
+echo "umask 027" > "$LOCAL_DIR/dot_profile"
+git -C "$LOCAL_DIR" commit -am "Adopt upstream umask" --quiet
+uv run python -m chezmerge.main --source "$LOCAL_DIR" > /dev/null
+
+EXPECTED=$(printf "alias ll='ls -lh'\nalias la='ls -a'\nalias l='ls -F'\nalias g='git status'")
+if [ "$(cat "$LOCAL_DIR/dot_aliases")" != "$EXPECTED" ]; then
+    echo "FAILURE: Unexpected merged content:"
+    cat "$LOCAL_DIR/dot_aliases"
+    exit 1
+fi
+
+echo "--- Template Entries Follow The Source-Dir Template Data ---"
+git -C "$LOCAL_DIR" mv dot_aliases dot_aliases.tmpl
+printf "alias ll='ls -lh'\nalias la='ls -A'\nalias l='ls -F'\nalias g='git status'\n" > "$LOCAL_DIR/dot_aliases.tmpl"
+git -C "$LOCAL_DIR" commit -qam "Template the aliases"
+printf "alias ll='ls -lh'\nalias la='ls -a'\nalias l='ls'\nalias g='git log'\n" > .aliases
+git commit -qam "Upstream log alias"
+
+cache_counter() {
+    uv run python -c 'import json, sys; print(json.load(open(sys.argv[1]))["counters"].get(sys.argv[2], 0))' "$TEST_DIR/profile.json" "$1"
+}
+profiled_dry_run() {
+    uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --profile "$TEST_DIR/profile.json" > /dev/null 2>&1
+}
+
+profiled_dry_run
+profiled_dry_run
+if [ "$(cache_counter analysis_cache_hits)" -ne 1 ] || [ "$(cache_counter analysis_cache_misses)" -ne 0 ]; then
+    echo "FAILURE: Expected the template classification to be served from the cache"
+    exit 1
+fi
+
+printf 'shell = "zsh"\n' > "$LOCAL_DIR/.chezmoidata.toml"
+git -C "$LOCAL_DIR" add .chezmoidata.toml
+git -C "$LOCAL_DIR" commit -qm "Add template data"
+profiled_dry_run
+if [ "$(cache_counter analysis_cache_hits)" -ne 0 ] || [ "$(cache_counter analysis_cache_misses)" -ne 1 ]; then
+    echo "FAILURE: Expected new template data to invalidate the cached template classification"
+    exit 1
+fi
+
+echo "SUCCESS: Analysis results are cached per file and bypassed with --no-cache."
@@ -0,0 +1,113 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+WRAPPER_DIR="$TEST_DIR/bin"
+MARKERS="$TEST_DIR/markers"
+
+echo "Running Background Fetch E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+echo "export PATH=/usr/bin" > .bashrc
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "export PATH=/usr/local/bin:/usr/bin" > .bashrc
+git commit -am "Prefer /usr/local/bin" --quiet
+
+# A git whose fetch sleeps for two seconds before fetching. It notes any git
+# command run inside the upstream submodule while that fetch is in flight,
+# and whether the pending-changes check ('git status') ran after it started.
+REAL_GIT=$(command -v git)
+SUBMODULE_DIR=$(cd "$LOCAL_DIR/.chezmerge-upstream" && pwd -P)
+mkdir -p "$WRAPPER_DIR" "$MARKERS"
+cat > "$WRAPPER_DIR/git" <<WRAPPER
+#!/bin/bash
+if [ -e "$MARKERS/fetch-in-flight" ] && [ "\$(pwd -P)" = "$SUBMODULE_DIR" ]; then
+    echo "\$*" >> "$MARKERS/submodule-during-fetch"
+fi
+for arg in "\$@"; do
+    case "\$arg" in
+        fetch)
+            touch "$MARKERS/fetch-started" "$MARKERS/fetch-in-flight"
+            sleep 2
+            rm -f "$MARKERS/fetch-in-flight"
+            "$REAL_GIT" "\$@"
+            status=\$?
+            touch "$MARKERS/fetch-done"
+            exit \$status
+            ;;
+        status)
+            if [ -e "$MARKERS/fetch-started" ]; then
+                touch "$MARKERS/status-after-fetch"
+            fi
+            break
+            ;;
+        -*|*=*) ;;
+        *) break ;;
+    esac
+done
+exec "$REAL_GIT" "\$@"
+WRAPPER
+chmod +x "$WRAPPER_DIR/git"
+
+echo "--- Pending Changes Refuse The Run Before Any Fetch ---"
+echo "# scratch" >> "$LOCAL_DIR/dot_bashrc"
+OUTPUT=$(PATH="$WRAPPER_DIR:$PATH" uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$OUTPUT"
+if ! echo "$OUTPUT" | grep -q "Refusing to run because the repository has pending changes."; then
+    echo "FAILURE: Expected the pending-changes guard to refuse the run"
+    exit 1
+fi
+if [ -e "$MARKERS/fetch-started" ] || echo "$OUTPUT" | grep -q "Fetching upstream changes"; then
+    echo "FAILURE: A repository with pending changes should be refused without fetching"
+    exit 1
+fi
+git -C "$LOCAL_DIR" checkout --quiet -- dot_bashrc
+
+echo "--- Dry Run With A Slow Fetch ---"
+OUTPUT=$(PATH="$WRAPPER_DIR:$PATH" uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --profile "$TEST_DIR/profile.json")
+echo "$OUTPUT"
+
+if [ ! -e "$MARKERS/fetch-done" ] || [ -e "$MARKERS/status-after-fetch" ]; then
+    echo "FAILURE: Expected the pending-changes check to finish before the fetch started"
+    exit 1
+fi
+
+if [ -e "$MARKERS/submodule-during-fetch" ]; then
+    echo "FAILURE: The upstream submodule was touched while the fetch was in flight:"
+    cat "$MARKERS/submodule-during-fetch"
+    exit 1
+fi
+
+if ! grep -q '"local_index"' "$TEST_DIR/profile.json" || ! grep -q '"fetch_wait"' "$TEST_DIR/profile.json"; then
+    echo "FAILURE: Expected the source scan to run before waiting on the fetch"
+    exit 1
+fi
+
+if ! echo "$OUTPUT" | grep -q "dot_bashrc \[AUTO_UPDATE\]"; then
+    echo "FAILURE: Expected the dry run to see the fetched upstream change"
+    exit 1
+fi
+
+echo "SUCCESS: The upstream fetch overlaps only local startup work."
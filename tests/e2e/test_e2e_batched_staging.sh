@@ -0,0 +1,87 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+# Four 200-character directory levels make every path about 820 bytes, so
+# enough of them overflow ARG_MAX if they were passed as arguments.
+SEGMENT=$(printf 'd%.0s' $(seq 1 200))
+DEEP_DIR="$SEGMENT/$SEGMENT/$SEGMENT/$SEGMENT"
+ARG_MAX=$(getconf ARG_MAX)
+FILE_COUNT=$((ARG_MAX / ${#DEEP_DIR} + 200))
+DELETE_COUNT=10
+
+echo "Running Batched Staging E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+mkdir -p old
+for i in $(seq 1 $DELETE_COUNT); do
+    echo "legacy $i" > "old/file$i"
+done
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- Adding $FILE_COUNT Deep Files And Deleting $DELETE_COUNT Upstream ---"
+mkdir -p "$DEEP_DIR"
+for i in $(seq 1 $FILE_COUNT); do
+    echo "new $i" > "$DEEP_DIR/file$i"
+done
+git rm --quiet -r old
+git add .
+git commit -m "Upstream edits" --quiet
+
+PATH_BYTES=$(git diff --name-only -z HEAD~1 HEAD | wc -c)
+echo "Changed path bytes: $PATH_BYTES (ARG_MAX: $ARG_MAX)"
+if [ "$PATH_BYTES" -le "$ARG_MAX" ]; then
+    echo "FAILURE: The changed paths must not fit in ARG_MAX for this test to mean anything"
+    exit 1
+fi
+
+echo "--- Applying ---"
+start_process_ledger
+LEDGER="$CHEZMERGE_PROCESS_LEDGER"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" > /dev/null
+UPDATE_INDEXES=$(grep '"argv": \["git"[^]]*"update-index"' "$LEDGER" || true)
+assert_process_budget git 20 "apply of $((FILE_COUNT + DELETE_COUNT)) changes"
+
+if [ "$(echo "$UPDATE_INDEXES" | grep -c "update-index")" -ne 1 ]; then
+    echo "$UPDATE_INDEXES"
+    echo "FAILURE: Expected the whole pass to be staged by one update-index"
+    exit 1
+fi
+
+if ! echo "$UPDATE_INDEXES" | grep -q '"--remove"' || ! echo "$UPDATE_INDEXES" | grep -q '"--stdin"'; then
+    echo "$UPDATE_INDEXES"
+    echo "FAILURE: Expected paths streamed on stdin, with deletions staged through --remove"
+    exit 1
+fi
+
+COMMITTED=$(git -C "$LOCAL_DIR" show --name-status --no-renames --format= HEAD)
+if [ "$(echo "$COMMITTED" | grep -c "^A	$DEEP_DIR/file")" -ne "$FILE_COUNT" ] || \
+   [ "$(echo "$COMMITTED" | grep -c "^D	old/file")" -ne "$DELETE_COUNT" ] || \
+   [ -n "$(git -C "$LOCAL_DIR" status --porcelain)" ]; then
+    echo "FAILURE: Expected every import and deletion in the merge commit and a clean tree"
+    exit 1
+fi
+
+echo "SUCCESS: A pass larger than ARG_MAX was staged with a single update-index."
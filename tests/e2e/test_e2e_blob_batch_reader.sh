@@ -0,0 +1,107 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+SPACED='docs/notes with spaces.txt'
+ODD='docs/-dash #hash ünïcode 1 2.txt'
+FRAMED='docs/framed.txt'
+
+echo "Running Blob Batch Reader E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+mkdir -p docs
+echo "spaced v1" > "$SPACED"
+echo "odd v1" > "$ODD"
+echo "framed v1" > "$FRAMED"
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+# framed.txt looks like a cat-file batch response of its own: a header line
+# with a size that does not match, a blank line, and no trailing newline.
+echo "spaced v2" > "$SPACED"
+echo "odd v2" > "$ODD"
+printf '0123456789abcdef0123456789abcdef01234567 blob 3\nabc\n\nmissing\nlast' > "$FRAMED"
+printf 'icon\x00\n\x00v2' > docs/icon.bin
+git add .
+git commit -m "Upstream edits" --quiet
+
+echo "--- Reading Through One cat-file Process ---"
+start_process_ledger
+uv run python - "$LOCAL_DIR" "$SPACED" "$ODD" "$FRAMED" <<'PY'
+import sys
+from pathlib import Path
+from chezmerge.git_ops import GitHandler
+
+git = GitHandler(Path(sys.argv[1]))
+spaced, odd, framed = sys.argv[2:5]
+git.fetch_latest()
+contents = git.get_file_contents([
+    ("latest", spaced),
+    ("latest", "docs/no such file.txt"),
+    ("latest", framed),
+    ("base", "docs/icon.bin"),
+    ("latest", odd),
+    ("latest", "docs/icon.bin"),
+])
+expected = [
+    "spaced v2\n",
+    "",
+    "0123456789abcdef0123456789abcdef01234567 blob 3\nabc\n\nmissing\nlast",
+    "",
+    "odd v2\n",
+    "icon\x00\n\x00v2",
+]
+assert contents == expected, contents
+
+missing = "0" * 40
+blobs = git.read_blobs([missing, git.run_git(["rev-parse", f"origin/HEAD:{framed}"], cwd=git.upstream_path), missing])
+assert blobs[0] is None and blobs[2] is None, blobs
+assert blobs[1] == expected[2].encode(), blobs
+git.close()
+PY
+CAT_FILES=$(grep -c '"argv": \["git"[^]]*"cat-file"' "$CHEZMERGE_PROCESS_LEDGER" || true)
+SHOWS=$(grep -c '"argv": \["git"[^]]*"show"' "$CHEZMERGE_PROCESS_LEDGER" || true)
+assert_process_budget git 10 "batched reads with missing objects"
+
+if [ "$CAT_FILES" -ne 1 ] || [ "$SHOWS" -ne 0 ]; then
+    echo "FAILURE: Expected every read, missing objects included, to share one cat-file process (cat-file: $CAT_FILES, show: $SHOWS)"
+    exit 1
+fi
+
+echo "--- Applying The Same Files ---"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" > /dev/null
+
+for path in "$SPACED" "$ODD" "$FRAMED" docs/icon.bin; do
+    if ! cmp -s "$UPSTREAM_DIR/$path" "$LOCAL_DIR/$path"; then
+        echo "FAILURE: Expected '$path' to match upstream byte for byte"
+        exit 1
+    fi
+done
+
+if [ -n "$(git -C "$LOCAL_DIR" status --porcelain)" ]; then
+    echo "FAILURE: Expected a clean tree after the merge"
+    exit 1
+fi
+
+echo "SUCCESS: The cat-file batch reader kept its framing across odd names, contents and missing objects."
@@ -0,0 +1,98 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+GROUP_SIZE=10
+
+echo "Running Blob ID Decisions E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+mkdir -p update synced deleted
+for i in $(seq 1 $GROUP_SIZE); do
+    for group in update synced deleted; do
+        echo "$group $i" > "$group/file$i"
+    done
+done
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+# update/: changed upstream only. synced/: changed identically on both
+# sides. deleted/: deleted upstream, untouched locally.
+for i in $(seq 1 $GROUP_SIZE); do
+    echo "update $i upstream" > "update/file$i"
+    echo "synced $i both" > "synced/file$i"
+    echo "synced $i both" > "$LOCAL_DIR/synced/file$i"
+done
+git rm --quiet -r deleted
+git add .
+git commit -m "Upstream edits" --quiet
+git -C "$LOCAL_DIR" commit -am "Local edits" --quiet
+
+echo "--- Dry Run ---"
+start_process_ledger
+LEDGER="$CHEZMERGE_PROCESS_LEDGER"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --no-cache --profile "$TEST_DIR/profile.json")
+MERGES=$(grep -c '"argv": \["git"[^]]*"merge-file"' "$LEDGER" || true)
+assert_process_budget git 10 "dry run of $((3 * GROUP_SIZE)) one-sided changes"
+
+for scenario in AUTO_UPDATE AUTO_DELETE; do
+    if [ "$(echo "$OUTPUT" | grep -c "\[$scenario\]")" -ne "$GROUP_SIZE" ]; then
+        echo "$OUTPUT"
+        echo "FAILURE: Expected $GROUP_SIZE files decided as $scenario"
+        exit 1
+    fi
+done
+
+# Already-synced files are skipped without a preview line.
+if echo "$OUTPUT" | grep -q "synced/"; then
+    echo "$OUTPUT"
+    echo "FAILURE: Expected files changed identically on both sides to be skipped"
+    exit 1
+fi
+
+READS=$(uv run python -c 'import json, sys; print(json.load(open(sys.argv[1]))["counters"].get("blobs_read", 0))' "$TEST_DIR/profile.json")
+echo "Blobs read: $READS"
+
+# Only the upstream side of each auto-update is read; synced files and
+# deletions are decided from blob IDs alone, and nothing is merged.
+if [ "$READS" -ne "$GROUP_SIZE" ]; then
+    echo "FAILURE: Expected only the $GROUP_SIZE upstream blobs of auto-updates to be read, got $READS"
+    exit 1
+fi
+
+if [ "$MERGES" -ne 0 ]; then
+    echo "FAILURE: Expected no merge attempts for one-sided changes, got $MERGES"
+    exit 1
+fi
+
+echo "--- Applying ---"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" > /dev/null
+
+if [ "$(cat "$LOCAL_DIR/update/file1")" != "update 1 upstream" ] || [ -e "$LOCAL_DIR/deleted/file1" ] || \
+   [ -n "$(git -C "$LOCAL_DIR" status --porcelain)" ]; then
+    echo "FAILURE: Expected updates and deletions to be applied and committed"
+    exit 1
+fi
+
+echo "SUCCESS: One-sided changes were decided by blob ID without reading content."
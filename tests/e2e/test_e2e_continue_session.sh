@@ -0,0 +1,127 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+MANIFEST="$LOCAL_DIR/.git/chezmerge-session/manifest.json"
+
+echo "Running Continue Session E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+echo "export PATH=/usr/bin" > .bashrc
+echo "base line" > .zshrc
+echo "legacy" > .oldrc
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "local line" > "$LOCAL_DIR/dot_zshrc"
+git -C "$LOCAL_DIR" commit -am "Customize zshrc" --quiet
+
+echo "export PATH=/usr/local/bin:/usr/bin" > .bashrc
+echo "upstream line" > .zshrc
+echo "set number" > .vimrc
+git rm --quiet .oldrc
+git add .
+git commit -m "Upstream changes" --quiet
+
+echo "--- Interrupting A Session At Its Conflict ---"
+set +e
+timeout 5s uv run python -m chezmerge.main --source "$LOCAL_DIR" < /dev/null > /dev/null 2>&1
+STATUS=$?
+set -e
+if [ "$STATUS" -ne 0 ] && [ "$STATUS" -ne 124 ]; then
+    echo "FAILURE: Expected chezmerge to either stay open in the UI or time out"
+    exit 1
+fi
+
+uv run python - "$MANIFEST" <<'PY'
+import json, sys
+manifest = json.load(open(sys.argv[1]))
+journal = {entry["path"]: entry for entry in manifest["journal"]}
+assert manifest["version"] == 2 and manifest["latest_submodule_sha"], manifest
+assert sorted(journal) == ["dot_bashrc", "dot_oldrc", "dot_vimrc"], sorted(journal)
+assert journal["dot_oldrc"]["oid"] is None and journal["dot_oldrc"]["decision"] == "AUTO_DELETE"
+assert journal["dot_bashrc"]["oid"] and journal["dot_vimrc"]["decision"] == "AUTO_IMPORT"
+PY
+
+echo "--- A Plain Run Points At --continue ---"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+if ! echo "$OUTPUT" | grep -q "chezmerge --continue"; then
+    echo "FAILURE: Expected an in-progress session to suggest --continue"
+    exit 1
+fi
+
+echo "--- Continuing Skips Settled Changes ---"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --continue --dry-run)
+echo "$OUTPUT"
+if ! echo "$OUTPUT" | grep -q "Continuing the merge session (3 changes already applied)."; then
+    echo "FAILURE: Expected the journaled changes to be settled"
+    exit 1
+fi
+if echo "$OUTPUT" | grep -q "Fetching upstream changes\|AUTO_"; then
+    echo "FAILURE: Expected no fetch and no re-analysis of settled changes"
+    exit 1
+fi
+if ! echo "$OUTPUT" | grep -q "dot_zshrc \[CONFLICT\]"; then
+    echo "FAILURE: Expected the unresolved conflict to be reviewed again"
+    exit 1
+fi
+
+echo "--- Changed Paths Are Analyzed Again ---"
+echo "set nonumber" > "$LOCAL_DIR/dot_vimrc"
+git -C "$LOCAL_DIR" add dot_vimrc
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --continue --dry-run)
+if ! echo "$OUTPUT" | grep -q "dot_vimrc changed since it was applied"; then
+    echo "FAILURE: Expected a journaled path that no longer matches the index to be reported"
+    exit 1
+fi
+echo "set number" > "$LOCAL_DIR/dot_vimrc"
+git -C "$LOCAL_DIR" add dot_vimrc
+
+echo "set nonumber" > "$LOCAL_DIR/dot_bashrc"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --continue --dry-run)
+if ! echo "$OUTPUT" | grep -q "dot_bashrc changed since it was applied" || \
+   ! echo "$OUTPUT" | grep -q "Continuing the merge session (2 changes already applied)."; then
+    echo "FAILURE: Expected an unstaged edit to a journaled path to unsettle it"
+    exit 1
+fi
+git -C "$LOCAL_DIR" checkout --quiet -- dot_bashrc
+
+echo "--- Finishing The Session ---"
+echo "upstream line" > "$LOCAL_DIR/dot_zshrc"
+git -C "$LOCAL_DIR" add dot_zshrc
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --continue)
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "Merge complete. Changes committed."; then
+    echo "FAILURE: Expected the continued session to commit"
+    exit 1
+fi
+
+if [ -e "$MANIFEST" ] || [ -e "$LOCAL_DIR/dot_oldrc" ] || \
+   [ "$(cat "$LOCAL_DIR/dot_bashrc")" != "export PATH=/usr/local/bin:/usr/bin" ] || \
+   [ -n "$(git -C "$LOCAL_DIR" status --porcelain)" ]; then
+    echo "FAILURE: Expected a clean tree with every change applied"
+    exit 1
+fi
+
+echo "SUCCESS: Interrupted sessions resume without redoing settled changes."
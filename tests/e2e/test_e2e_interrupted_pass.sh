@@ -0,0 +1,96 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+WRAPPER_DIR="$TEST_DIR/bin"
+FILE_COUNT=10
+
+echo "Running Interrupted Pass E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+for i in $(seq 1 $FILE_COUNT); do
+    echo "setting=$i" > ".rc$i"
+    echo "legacy $i" > ".old$i"
+done
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+for i in $(seq 1 $FILE_COUNT); do
+    echo "setting=$i upstream" > ".rc$i"
+    echo "new $i" > ".new$i"
+    git rm --quiet ".old$i"
+done
+git add .
+git commit -m "Upstream edits" --quiet
+
+echo "--- Killing The Run Before It Stages ---"
+# A git that kills chezmerge when it is asked to stage the pass, after every
+# file has been written but before anything is staged or journaled.
+REAL_GIT=$(command -v git)
+mkdir -p "$WRAPPER_DIR"
+cat > "$WRAPPER_DIR/git" <<WRAPPER
+#!/bin/sh
+case " \$* " in
+    *" update-index "*" --stdin "*) kill -9 \$PPID; exit 1 ;;
+esac
+exec "$REAL_GIT" "\$@"
+WRAPPER
+chmod +x "$WRAPPER_DIR/git"
+
+set +e
+PATH="$WRAPPER_DIR:$PATH" uv run python -m chezmerge.main --source "$LOCAL_DIR" > /dev/null 2>&1
+STATUS=$?
+set -e
+if [ "$STATUS" -eq 0 ] || [ "$(cat "$LOCAL_DIR/dot_rc1")" != "setting=1 upstream" ] || \
+   [ -n "$(git -C "$LOCAL_DIR" diff --cached --name-only)" ]; then
+    echo "FAILURE: Expected the run to die with its results written but unstaged"
+    exit 1
+fi
+
+echo "--- Continuing Stages And Commits Them ---"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --continue)
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "Staging $((3 * FILE_COUNT)) path(s) the interrupted run left unstaged." || \
+   ! echo "$OUTPUT" | grep -q "Merge complete. Changes committed."; then
+    echo "FAILURE: Expected the continued session to stage the unstaged results and commit"
+    exit 1
+fi
+
+COMMITTED=$(git -C "$LOCAL_DIR" show --name-status --format= HEAD)
+for i in $(seq 1 $FILE_COUNT); do
+    for expected in "M	dot_rc$i" "A	dot_new$i" "D	dot_old$i"; do
+        if ! echo "$COMMITTED" | grep -qxF "$expected"; then
+            echo "$COMMITTED"
+            echo "FAILURE: Expected '$expected' in the merge commit"
+            exit 1
+        fi
+    done
+done
+
+if [ -e "$LOCAL_DIR/.git/chezmerge-session" ] || [ -n "$(git -C "$LOCAL_DIR" status --porcelain)" ]; then
+    echo "FAILURE: Expected a clean tree once the session commits"
+    exit 1
+fi
+
+echo "SUCCESS: A run killed mid-pass resumes without losing its applied changes."
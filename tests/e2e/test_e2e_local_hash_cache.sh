@@ -0,0 +1,83 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+HASH_CACHE="$LOCAL_DIR/.git/chezmerge-cache/local-hashes.json"
+
+echo "Running Local Hash Cache E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+echo "export PATH=/usr/bin" > .bashrc
+head -c 2097152 /dev/zero | tr '\0' 'a' > .large
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- Updating Upstream ---"
+echo "export PATH=/usr/local/bin:/usr/bin" > .bashrc
+echo "b" >> .large
+git commit -am "Update PATH and large file" --quiet
+
+echo "--- Backdating Local Files So Their Hashes Are Trusted ---"
+touch -d "2020-01-01 00:00:00" "$LOCAL_DIR/dot_bashrc" "$LOCAL_DIR/dot_large"
+
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "dot_bashrc \[AUTO_UPDATE\]"; then
+    echo "FAILURE: Expected dot_bashrc to be an automatic update"
+    exit 1
+fi
+
+if [ ! -f "$HASH_CACHE" ]; then
+    echo "FAILURE: Expected local hash cache at $HASH_CACHE"
+    exit 1
+fi
+
+for name in dot_bashrc dot_large; do
+    EXPECTED=$(git -C "$LOCAL_DIR" hash-object "$name")
+    if ! grep -q "\"$name\":\[[0-9,]*,\"$EXPECTED\"\]" "$HASH_CACHE"; then
+        echo "FAILURE: Expected cached blob ID $EXPECTED for $name"
+        cat "$HASH_CACHE"
+        exit 1
+    fi
+done
+
+echo "--- Editing Local File After Caching ---"
+echo "export EDITOR=vim" >> "$LOCAL_DIR/dot_bashrc"
+git -C "$LOCAL_DIR" commit -am "Set editor" --quiet
+touch -d "2020-01-02 00:00:00" "$LOCAL_DIR/dot_bashrc"
+
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "dot_bashrc \[AUTO_MERGEABLE\]\|dot_bashrc \[CONFLICT\]"; then
+    echo "FAILURE: Stale cached hash hid the local edit to dot_bashrc"
+    exit 1
+fi
+
+if ! echo "$OUTPUT" | grep -q "dot_large \[AUTO_UPDATE\]"; then
+    echo "FAILURE: Expected the unchanged large file to stay an automatic update"
+    exit 1
+fi
+
+echo "SUCCESS: Local hashes were cached by stat and revalidated after an edit."
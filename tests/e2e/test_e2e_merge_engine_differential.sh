@@ -0,0 +1,143 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+echo "Running Merge Engine Differential E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+echo "--- Comparing diff3 engine against git merge-file over a generated corpus ---"
+TEST_DIR="$TEST_DIR" uv run python - <<'PY'
+import os
+import random
+import subprocess
+from pathlib import Path
+
+from chezmerge.diff3 import DEFAULT_LABELS, merge_texts
+
+work = Path(os.environ["TEST_DIR"])
+
+
+def git_merge_file(base, ours, theirs):
+    paths = []
+    for name, text in (("ours", ours), ("base", base), ("theirs", theirs)):
+        path = work / name
+        path.write_bytes(text.encode("utf-8", errors="surrogateescape"))
+        paths.append(str(path))
+    labels = []
+    for label in DEFAULT_LABELS:
+        labels.extend(["-L", label])
+    res = subprocess.run(
+        ["git", "-c", "merge.conflictStyle=merge", "merge-file", "-p", *labels, *paths],
+        capture_output=True,
+    )
+    return res.returncode == 0, res.stdout.decode("utf-8", errors="surrogateescape")
+
+
+def mutate(rng, lines, alphabet, max_edits):
+    lines = list(lines)
+    for _ in range(rng.randint(0, max_edits)):
+        pos = rng.randint(0, len(lines))
+        roll = rng.random()
+        if roll < 0.35 and lines:
+            lines[min(pos, len(lines) - 1)] = rng.choice(alphabet)
+        elif roll < 0.65:
+            for _ in range(rng.randint(1, 3)):
+                lines.insert(pos, rng.choice(alphabet))
+        elif lines:
+            del lines[pos:pos + rng.randint(1, 3)]
+    return lines
+
+
+def render(rng, lines):
+    text = "".join(f"{line}\n" for line in lines)
+    if text and rng.random() < 0.15:
+        text = text[:-1]
+    return text
+
+
+rng = random.Random(20260117)
+cases = []
+for _ in range(1500):
+    # Small alphabets force repeated lines and ambiguous alignments; the
+    # punctuation-only lines exercise the alnum conflict simplification.
+    alphabet = [f"line {i}" for i in range(rng.choice([3, 6, 12, 40]))] + ["", "}", "{", "# --"]
+    base = [rng.choice(alphabet) for _ in range(rng.choice([0, 1, 3, 10, 30, 80]))]
+    cases.append((rng, base, alphabet, 6))
+for _ in range(20):
+    # Large, heavily edited files exercise the Myers cost heuristics.
+    alphabet = [f"l{i}" for i in range(rng.choice([5, 50, 2000]))]
+    base = [rng.choice(alphabet) for _ in range(rng.choice([800, 3000]))]
+    cases.append((rng, base, alphabet, 400))
+
+mismatches = 0
+verdicts = {True: 0, False: 0}
+for index, (case_rng, base_lines, alphabet, max_edits) in enumerate(cases):
+    ours_lines = mutate(case_rng, base_lines, alphabet, max_edits)
+    theirs_lines = mutate(case_rng, base_lines, alphabet, max_edits)
+    base, ours, theirs = (render(case_rng, lines) for lines in (base_lines, ours_lines, theirs_lines))
+
+    expected = git_merge_file(base, ours, theirs)
+    actual = merge_texts(base, ours, theirs)
+    verdicts[expected[0]] += 1
+    if actual != expected:
+        mismatches += 1
+        if mismatches <= 3:
+            print(f"Mismatch in case {index}:")
+            print(f"  base={base!r}\n  ours={ours!r}\n  theirs={theirs!r}")
+            print(f"  git={expected!r}\n  diff3={actual!r}")
+
+print(f"Compared {len(cases)} merges ({verdicts[True]} clean, {verdicts[False]} conflicting).")
+if mismatches:
+    raise SystemExit(f"FAILURE: {mismatches} merge(s) differ from git merge-file")
+
+for unsupported in (("a\r\n", "b\r\n", "c\r\n"), ("a\x00", "b", "c")):
+    if merge_texts(*unsupported) is not None:
+        raise SystemExit("FAILURE: Expected diff3 engine to defer CR/binary input to git")
+print("SUCCESS: diff3 engine matches git merge-file on the corpus.")
+PY
+
+echo "--- Running a template auto-merge with the verify engine ---"
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+printf 'line 1\nline 2\nline 3\nline 4\nline 5\nline 6\n' > .profile
+git add .profile
+git commit -m "Initial commit" --quiet
+
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+printf 'line 1\nline 2\nline 3\nline 4\nline 5\nline 6 local\n' > "$LOCAL_DIR/dot_profile"
+git -C "$LOCAL_DIR" commit -am "Customize profile" --quiet
+
+printf 'line 1 upstream\nline 2\nline 3\nline 4\nline 5\nline 6\n' > .profile
+git commit -am "Update profile" --quiet
+
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --merge-engine verify 2>&1)
+echo "$OUTPUT"
+
+if echo "$OUTPUT" | grep -q "disagreed"; then
+    echo "FAILURE: verify engine reported a disagreement with git"
+    exit 1
+fi
+
+if grep -q "line 1 upstream" "$LOCAL_DIR/dot_profile" && grep -q "line 6 local" "$LOCAL_DIR/dot_profile"; then
+    echo "SUCCESS: verify engine auto-merged non-overlapping changes."
+else
+    echo "FAILURE: Expected both upstream and local changes in dot_profile"
+    cat "$LOCAL_DIR/dot_profile"
+    exit 1
+fi
@@ -0,0 +1,84 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+
+echo "Running Parallel Analysis E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+for i in $(seq 1 12); do
+    printf 'first %s\nmiddle\nlast %s\n' "$i" "$i" > ".file$i"
+done
+echo "old location" > .moveme
+echo "to be removed" > .removeme
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- Creating Mixed Upstream And Local Changes ---"
+for i in $(seq 1 12); do
+    printf 'first %s\nmiddle\nlast %s upstream\n' "$i" "$i" > ".file$i"
+done
+for i in 2 5 9; do
+    printf 'first %s local\nmiddle\nlast %s\n' "$i" "$i" > "$LOCAL_DIR/dot_file$i"
+done
+git mv .moveme .moved
+git rm --quiet .removeme
+echo "brand new" > .added
+git add .
+git commit -m "Mixed upstream changes" --quiet
+git -C "$LOCAL_DIR" commit -am "Local edits" --quiet
+
+SERIAL=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --jobs 1)
+PARALLEL=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --jobs 4)
+echo "$PARALLEL"
+
+if [ "$SERIAL" != "$PARALLEL" ]; then
+    echo "FAILURE: Parallel analysis changed the dry-run report"
+    diff <(echo "$SERIAL") <(echo "$PARALLEL") || true
+    exit 1
+fi
+
+for expected in "dot_file1 \[AUTO_UPDATE\]" "dot_file2 \[AUTO_MERGEABLE\]" "dot_moveme -> dot_moved \[AUTO_RENAME\]" \
+        "dot_removeme \[AUTO_DELETE\]" "dot_added \[AUTO_IMPORT\]"; do
+    if ! echo "$PARALLEL" | grep -q "$expected"; then
+        echo "FAILURE: Expected '$expected' in the dry-run report"
+        exit 1
+    fi
+done
+
+echo "--- Applying With Parallel Analysis ---"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --jobs 4 > "$TEST_DIR/apply.log" 2>&1
+
+if ! grep -q "first 2 local" "$LOCAL_DIR/dot_file2" || ! grep -q "last 2 upstream" "$LOCAL_DIR/dot_file2"; then
+    echo "FAILURE: Expected dot_file2 to be auto-merged"
+    cat "$TEST_DIR/apply.log"
+    exit 1
+fi
+
+if [ ! -f "$LOCAL_DIR/dot_moved" ] || [ -f "$LOCAL_DIR/dot_moveme" ] || [ -f "$LOCAL_DIR/dot_removeme" ] || [ ! -f "$LOCAL_DIR/dot_added" ]; then
+    echo "FAILURE: Expected rename, delete and import to be applied"
+    cat "$TEST_DIR/apply.log"
+    exit 1
+fi
+
+echo "SUCCESS: Parallel analysis matches serial analysis and applies in order."
@@ -0,0 +1,120 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+SUBMODULE_DIR="$LOCAL_DIR/.chezmerge-upstream"
+
+echo "Running Partial Clone E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+git config uploadpack.allowFilter true
+mkdir -p dotfiles/.config/app assets
+echo "export PATH=/usr/bin" > dotfiles/.bashrc
+echo "theme=dark" > dotfiles/.config/app/settings
+echo "wallpaper v1" > assets/wallpaper
+git add .
+git commit -m "Initial commit" --quiet
+echo "wallpaper v2" > assets/wallpaper
+git commit -am "Old wallpaper history" --quiet
+
+echo "--- Initializing With --partial-clone ---"
+uv run python -m chezmerge.main --repo "file://$UPSTREAM_DIR" --source "$LOCAL_DIR" --inner-path dotfiles --partial-clone > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+if [ "$(git -C "$SUBMODULE_DIR" config --get remote.origin.promisor)" != "true" ]; then
+    echo "FAILURE: Expected the upstream submodule to be a partial clone"
+    exit 1
+fi
+
+if [ ! -f "$LOCAL_DIR/.git/modules/.chezmerge-upstream/HEAD" ]; then
+    echo "FAILURE: Expected the submodule git directory under .git/modules"
+    exit 1
+fi
+
+OLD_WALLPAPER=$(git -C "$UPSTREAM_DIR" rev-parse HEAD~1:assets/wallpaper)
+if ! git -C "$SUBMODULE_DIR" rev-list --objects --missing=print HEAD | grep -q "^?$OLD_WALLPAPER"; then
+    echo "FAILURE: Expected history blobs to be left out of the clone"
+    exit 1
+fi
+
+# Only the two blobs under the inner path may be downloaded by the initial
+# checkout; the wallpaper at HEAD stays with the promisor remote.
+PRESENT_BLOBS=$(git -C "$SUBMODULE_DIR" cat-file --batch-all-objects --batch-check='%(objecttype)' | grep -c '^blob$' || true)
+if [ "$PRESENT_BLOBS" -ne 2 ]; then
+    echo "FAILURE: Expected only the 2 blobs under the inner path after init, found $PRESENT_BLOBS"
+    exit 1
+fi
+
+HEAD_WALLPAPER=$(git -C "$UPSTREAM_DIR" rev-parse HEAD:assets/wallpaper)
+if ! git -C "$SUBMODULE_DIR" rev-list --objects --missing=print HEAD | grep -q "^?$HEAD_WALLPAPER"; then
+    echo "FAILURE: Expected the blob outside the inner path to be left out of the initial checkout"
+    exit 1
+fi
+
+echo "--- Updating Upstream Inside And Outside The Inner Path ---"
+echo "export PATH=/usr/local/bin:/usr/bin" > dotfiles/.bashrc
+echo "theme=light" > dotfiles/.config/app/settings
+echo "wallpaper v3" > assets/wallpaper
+git commit -am "Update dotfiles and wallpaper" --quiet
+git tag v3
+git checkout --quiet -b experimental
+echo "experiment" > dotfiles/.experiment
+git add .
+git commit -m "Experimental branch" --quiet
+git checkout --quiet -
+
+echo "--- Dry Run Fetches Only The Blobs The Diff Touches ---"
+start_process_ledger
+LEDGER="$CHEZMERGE_PROCESS_LEDGER"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --inner-path dotfiles --dry-run
+FETCHES=$(grep -c '"argv": \["git", "fetch"\|"fetch", "origin", "--no-tags", "--no-write-fetch-head"' "$LEDGER" || true)
+assert_process_budget git 12 "partial clone dry-run"
+
+if [ "$FETCHES" -ne 2 ]; then
+    echo "FAILURE: Expected one branch fetch and one batched blob fetch, got $FETCHES"
+    exit 1
+fi
+
+NEW_WALLPAPER=$(git -C "$UPSTREAM_DIR" rev-parse HEAD:assets/wallpaper)
+if ! git -C "$SUBMODULE_DIR" rev-list --objects --missing=print origin/HEAD | grep -q "^?$NEW_WALLPAPER"; then
+    echo "FAILURE: Blob outside the inner path should not have been fetched"
+    exit 1
+fi
+
+echo "--- Applying ---"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --inner-path dotfiles
+
+if [ "$(cat "$LOCAL_DIR/dot_bashrc")" != "export PATH=/usr/local/bin:/usr/bin" ] || \
+   [ "$(cat "$LOCAL_DIR/dot_config/app/settings")" != "theme=light" ]; then
+    echo "FAILURE: Expected both dotfiles to be updated"
+    exit 1
+fi
+
+if [ -n "$(git -C "$SUBMODULE_DIR" tag)" ]; then
+    echo "FAILURE: Tags should not be fetched in partial clone mode"
+    exit 1
+fi
+
+if git -C "$SUBMODULE_DIR" rev-parse --verify --quiet refs/remotes/origin/experimental > /dev/null; then
+    echo "FAILURE: Only the tracked branch should be fetched"
+    exit 1
+fi
+
+echo "SUCCESS: Partial clone fetched only the tracked branch and the blobs it needed."
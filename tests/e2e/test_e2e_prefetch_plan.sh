@@ -0,0 +1,116 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+OFFLINE_DIR="$TEST_DIR/upstream-offline"
+LOCAL_DIR="$TEST_DIR/local"
+PLAN_FILE="$LOCAL_DIR/.git/chezmerge-cache/prefetched-plan.json"
+
+echo "Running Prefetched Plan E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+echo "export PATH=/usr/bin" > .bashrc
+echo "umask 022" > .profile
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "umask 077" > "$LOCAL_DIR/dot_profile"
+git -C "$LOCAL_DIR" commit -am "Stricter umask" --quiet
+
+echo "export PATH=/usr/local/bin:/usr/bin" > .bashrc
+echo "umask 027" > .profile
+echo "set number" > .vimrc
+git add .
+git commit -m "Upstream changes" --quiet
+
+echo "--- Prefetching A Plan ---"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --prefetch)
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "Prefetched a plan for 3 upstream changes (1 need review)."; then
+    echo "FAILURE: Expected --prefetch to plan all three upstream changes"
+    exit 1
+fi
+
+if [ ! -f "$PLAN_FILE" ] || [ -n "$(git -C "$LOCAL_DIR" status --porcelain)" ]; then
+    echo "FAILURE: Expected a stored plan and an untouched source directory"
+    exit 1
+fi
+
+echo "--- Dry Run Uses The Plan Without Reaching Upstream ---"
+mv "$UPSTREAM_DIR" "$OFFLINE_DIR"
+start_process_ledger
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$OUTPUT"
+
+if echo "$OUTPUT" | grep -q "Fetching upstream changes"; then
+    echo "FAILURE: Expected the prefetched plan to skip the fetch"
+    exit 1
+fi
+
+for expected in "Using the plan prefetched at" "dot_bashrc \[AUTO_UPDATE\]" "dot_vimrc \[AUTO_IMPORT\]" "dot_profile \[CONFLICT\]"; do
+    if ! echo "$OUTPUT" | grep -q "$expected"; then
+        echo "FAILURE: Expected '$expected' in the dry run output"
+        exit 1
+    fi
+done
+
+if grep -q '"argv": \["git"[^]]*"fetch"' "$CHEZMERGE_PROCESS_LEDGER"; then
+    echo "FAILURE: Expected no git fetch while a prefetched plan is valid"
+    exit 1
+fi
+assert_process_budget git 8 "dry run from a prefetched plan"
+
+echo "--- Merge Applies The Plan Offline ---"
+echo "umask 027" > "$LOCAL_DIR/dot_profile"
+git -C "$LOCAL_DIR" commit -am "Adopt upstream umask" --quiet
+mv "$OFFLINE_DIR" "$UPSTREAM_DIR"
+
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+if ! echo "$OUTPUT" | grep -q "Fetching upstream changes"; then
+    echo "FAILURE: Expected a plan from another source tree to be ignored"
+    exit 1
+fi
+
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --prefetch > /dev/null
+mv "$UPSTREAM_DIR" "$OFFLINE_DIR"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR")
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "Merge complete. Changes committed."; then
+    echo "FAILURE: Expected the prefetched plan to merge without upstream access"
+    exit 1
+fi
+
+if [ "$(cat "$LOCAL_DIR/dot_bashrc")" != "export PATH=/usr/local/bin:/usr/bin" ] || \
+   [ "$(cat "$LOCAL_DIR/dot_vimrc")" != "set number" ]; then
+    echo "FAILURE: Expected the planned update and import to be applied"
+    exit 1
+fi
+
+if [ -f "$PLAN_FILE" ]; then
+    echo "FAILURE: Expected the plan to be dropped once merged"
+    exit 1
+fi
+
+echo "SUCCESS: Prefetched plans are reused while valid and ignored otherwise."
@@ -0,0 +1,68 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+FILE_COUNT=500
+
+echo "Running Process Budget E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+mkdir -p .config/app
+for i in $(seq 1 $FILE_COUNT); do
+    printf 'one\ntwo\nthree\nfour\nfive\n' > ".config/app/file$i"
+done
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- Modifying Every File Upstream And Half Of Them Locally ---"
+for i in $(seq 1 $FILE_COUNT); do
+    printf 'one\ntwo\nthree\nfour\nFIVE\n' > ".config/app/file$i"
+done
+git commit -am "Upstream edits" --quiet
+for i in $(seq 1 2 $FILE_COUNT); do
+    printf 'ONE\ntwo\nthree\nfour\nfive\n' > "$LOCAL_DIR/dot_config/app/file$i"
+done
+git -C "$LOCAL_DIR" commit -am "Local edits" --quiet
+
+echo "--- Dry Run ---"
+start_process_ledger
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --merge-engine python)
+if [ "$(echo "$OUTPUT" | grep -c "\[AUTO_")" -ne "$FILE_COUNT" ]; then
+    echo "$OUTPUT"
+    echo "FAILURE: Expected all $FILE_COUNT files to be handled automatically"
+    exit 1
+fi
+assert_process_budget git 10 "dry-run of $FILE_COUNT modified files"
+
+echo "--- Applying ---"
+start_process_ledger
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --merge-engine python > /dev/null
+assert_process_budget git 20 "apply of $FILE_COUNT modified files"
+
+if [ "$(cat "$LOCAL_DIR/dot_config/app/file1")" != "$(printf 'ONE\ntwo\nthree\nfour\nFIVE')" ]; then
+    echo "FAILURE: Expected file1 to combine local and upstream edits"
+    exit 1
+fi
+
+echo "SUCCESS: Runs stayed within their process budgets."
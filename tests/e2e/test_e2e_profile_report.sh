@@ -0,0 +1,76 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+REPORT="$TEST_DIR/profile.json"
+PSTATS="$TEST_DIR/profile.pstats"
+
+echo "Running Profile Report E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+printf 'one\ntwo\nthree\nfour\nfive\n' > .bashrc
+echo "theme=dark" > .vimrc
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- Creating Auto-Update And Auto-Merge Changes ---"
+printf 'one\ntwo\nthree\nfour\nFIVE\n' > .bashrc
+echo "theme=light" > .vimrc
+git commit -am "Upstream edits" --quiet
+printf 'ONE\ntwo\nthree\nfour\nfive\n' > "$LOCAL_DIR/dot_bashrc"
+git -C "$LOCAL_DIR" commit -am "Local edit" --quiet
+
+echo "--- Running With --profile ---"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --profile "$REPORT" --profile-pstats "$PSTATS"
+
+uv run python - "$REPORT" "$PSTATS" <<'PY'
+import json
+import pstats
+import sys
+
+report = json.load(open(sys.argv[1]))
+failures = []
+for phase in ("fetch", "diff", "local_index", "analysis", "local_matching", "blob_reads", "merges", "staging", "commit"):
+    if report["phases"].get(phase, {}).get("calls", 0) < 1:
+        failures.append(f"missing phase {phase}")
+for command in ("git fetch", "git diff", "git cat-file", "git commit"):
+    if command not in report["subprocesses"]:
+        failures.append(f"missing subprocess {command}")
+if report["counters"].get("upstream_changes") != 2:
+    failures.append(f"expected 2 upstream changes, got {report['counters'].get('upstream_changes')}")
+if report["wall_seconds"] <= 0:
+    failures.append("wall time was not recorded")
+pstats.Stats(sys.argv[2])
+
+if failures:
+    print("FAILURE: " + "; ".join(failures))
+    print(json.dumps(report, indent=2))
+    sys.exit(1)
+PY
+
+if [ "$(cat "$LOCAL_DIR/dot_bashrc")" != "$(printf 'ONE\ntwo\nthree\nfour\nFIVE')" ]; then
+    echo "FAILURE: Profiled run did not merge dot_bashrc"
+    exit 1
+fi
+
+echo "SUCCESS: Profile report covers run phases and subprocesses."
@@ -0,0 +1,100 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+FILE_COUNT=20
+
+echo "Running Resolution Passes E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+mkdir -p .config/app
+for i in $(seq 1 $FILE_COUNT); do
+    echo "setting=$i" > ".config/app/file$i"
+done
+printf 'logo\x00v1' > logo.bin
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+printf 'logo\x00local' > "$LOCAL_DIR/logo.bin"
+git -C "$LOCAL_DIR" commit -am "Local logo" --quiet
+
+for i in $(seq 1 $FILE_COUNT); do
+    echo "setting=$i upstream" > ".config/app/file$i"
+done
+printf 'logo\x00upstream' > logo.bin
+git commit -am "Upstream edits" --quiet
+
+# Prints one value from a --profile report, e.g. 'counters.blobs_read'.
+profile_value() {
+    uv run python -c '
+import json, sys
+value = json.load(open(sys.argv[1]))
+for key in sys.argv[2].split("."):
+    value = value.get(key, {}) if isinstance(value, dict) else {}
+print(value if value != {} else 0)
+' "$1" "$2"
+}
+
+echo "--- One Analysis Pass (Dry Run) ---"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run --no-cache --profile "$TEST_DIR/dry.json" > /dev/null
+DRY_READS=$(profile_value "$TEST_DIR/dry.json" counters.blobs_read)
+
+echo "--- Resolving The Conflict Triggers A Second Pass ---"
+OUTPUT=$(uv run python "$PROJECT_ROOT/tests/lib/drive_ui.py" "t" \
+    --source "$LOCAL_DIR" --no-cache --profile "$TEST_DIR/run.json" 2>&1)
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "Merge complete. Changes committed."; then
+    echo "FAILURE: Expected the resolved session to commit"
+    exit 1
+fi
+
+PASSES=$(profile_value "$TEST_DIR/run.json" counters.analysis_passes)
+DIFFS=$(profile_value "$TEST_DIR/run.json" phases.diff.calls)
+RUN_READS=$(profile_value "$TEST_DIR/run.json" counters.blobs_read)
+echo "Analysis passes: $PASSES, upstream diffs: $DIFFS, blobs read: $RUN_READS (one pass: $DRY_READS)"
+
+if [ "$PASSES" -ne 2 ]; then
+    echo "FAILURE: Expected an analysis pass before and after the resolution, got $PASSES"
+    exit 1
+fi
+
+if [ "$DIFFS" -ne 1 ]; then
+    echo "FAILURE: Expected the upstream changes to be listed once, got $DIFFS"
+    exit 1
+fi
+
+# The second pass re-plans only the resolved file, which now matches
+# upstream by blob ID, so no blob is read again.
+if [ "$RUN_READS" -ne "$DRY_READS" ]; then
+    echo "FAILURE: Expected the second pass to read no blobs, read $RUN_READS against $DRY_READS for one pass"
+    exit 1
+fi
+
+if [ "$(cat "$LOCAL_DIR/dot_config/app/file$FILE_COUNT")" != "setting=$FILE_COUNT upstream" ] || \
+   [ "$(cat -v "$LOCAL_DIR/logo.bin")" != "logo^@upstream" ]; then
+    echo "FAILURE: Expected every change to be applied"
+    exit 1
+fi
+
+echo "SUCCESS: Resolving a conflict re-planned only the resolved file."
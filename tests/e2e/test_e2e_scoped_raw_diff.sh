@@ -0,0 +1,118 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+QUOTED='dotfiles/.config/my app/it'"'"'s "quoted".conf'
+UNICODE='dotfiles/.config/café/ünïcode.conf'
+LOCAL_QUOTED='dot_config/my app/it'"'"'s "quoted".conf'
+LOCAL_UNICODE='dot_config/café/ünïcode.conf'
+
+echo "Running Scoped Raw Diff E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+mkdir -p "$(dirname "$QUOTED")" "$(dirname "$UNICODE")" docs
+echo "quoted v1" > "$QUOTED"
+echo "unicode v1" > "$UNICODE"
+echo "alias ll='ls -l'" > dotfiles/.aliases
+echo "legacy" > dotfiles/.oldrc
+echo "notes v1" > docs/notes.txt
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" --inner-path dotfiles > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+# Prints how many 'git diff' processes the ledger recorded.
+count_diffs() {
+    grep -c '"argv": \["git"[^]]*"diff"' "$CHEZMERGE_PROCESS_LEDGER" || true
+}
+
+echo "--- Odd Paths, An In-Scope Rename And An Out-Of-Scope Change ---"
+echo "quoted v2" > "$QUOTED"
+echo "unicode v2" > "$UNICODE"
+git mv dotfiles/.aliases dotfiles/.shell_aliases
+echo "notes v2" > docs/notes.txt
+git add .
+git commit -m "Upstream edits" --quiet
+
+start_process_ledger
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --inner-path dotfiles --dry-run)
+DIFFS=$(count_diffs)
+assert_process_budget git 12 "scoped dry run"
+echo "$OUTPUT"
+
+for expected in "Detected 3 changed files upstream." "$LOCAL_QUOTED [AUTO_UPDATE]" "$LOCAL_UNICODE [AUTO_UPDATE]" "dot_aliases -> dot_shell_aliases"; do
+    if ! echo "$OUTPUT" | grep -qF "$expected"; then
+        echo "FAILURE: Expected '$expected' in the dry run output"
+        exit 1
+    fi
+done
+
+if echo "$OUTPUT" | grep -q "notes"; then
+    echo "FAILURE: A change outside the inner path was reported"
+    exit 1
+fi
+
+if [ "$DIFFS" -ne 1 ]; then
+    echo "FAILURE: Expected a single scoped diff without lone adds or deletes, got $DIFFS"
+    exit 1
+fi
+
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --inner-path dotfiles > /dev/null
+
+if [ "$(cat "$LOCAL_DIR/$LOCAL_QUOTED")" != "quoted v2" ] || [ "$(cat "$LOCAL_DIR/$LOCAL_UNICODE")" != "unicode v2" ]; then
+    echo "FAILURE: Expected the files with odd names to be updated"
+    exit 1
+fi
+
+# One status or path per line, unquoted.
+COMMITTED=$(git -C "$LOCAL_DIR" show --name-status -z --format= HEAD | tr '\0' '\n')
+echo "$COMMITTED"
+for expected in "$LOCAL_QUOTED" "$LOCAL_UNICODE" "R100" "dot_aliases" "dot_shell_aliases"; do
+    if ! echo "$COMMITTED" | grep -qxF "$expected"; then
+        echo "FAILURE: Expected '$expected' in the merge commit"
+        exit 1
+    fi
+done
+
+echo "--- A Lone Delete Adds One Rename-Only Diff ---"
+git rm --quiet dotfiles/.oldrc
+git commit -m "Drop oldrc" --quiet
+
+start_process_ledger
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --inner-path dotfiles > /dev/null
+DIFFS=$(count_diffs)
+assert_process_budget git 20 "scoped apply with a deletion"
+
+if [ "$DIFFS" -ne 2 ]; then
+    echo "FAILURE: Expected the scoped diff plus one rename-only diff, got $DIFFS"
+    exit 1
+fi
+
+COMMITTED=$(git -C "$LOCAL_DIR" show --name-status --format= HEAD)
+if ! echo "$COMMITTED" | grep -qF "D	dot_oldrc" || [ -e "$LOCAL_DIR/dot_oldrc" ] || \
+   [ -n "$(git -C "$LOCAL_DIR" status --porcelain)" ]; then
+    echo "FAILURE: Expected the deletion to be staged and committed"
+    echo "$COMMITTED"
+    exit 1
+fi
+
+echo "SUCCESS: Upstream changes were read from one scoped, NUL-delimited diff."
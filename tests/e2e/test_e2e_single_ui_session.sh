@@ -0,0 +1,79 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+
+echo "Running Single UI Session E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+echo "legacy" > .oldrc
+printf 'icon\x00v1' > icon.bin
+printf 'logo\x00v1' > logo.bin
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "legacy, customized" > "$LOCAL_DIR/dot_oldrc"
+printf 'icon\x00local' > "$LOCAL_DIR/icon.bin"
+printf 'logo\x00local' > "$LOCAL_DIR/logo.bin"
+git -C "$LOCAL_DIR" commit -am "Local edits" --quiet
+
+git rm --quiet .oldrc
+printf 'icon\x00upstream' > icon.bin
+printf 'logo\x00upstream' > logo.bin
+git commit -am "Upstream edits" --quiet
+
+echo "--- Dry Run Lists Three Conflicts ---"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$OUTPUT"
+for expected in "dot_oldrc \[DELETION_CONFLICT\]" "icon.bin \[BINARY_CONFLICT\]" "logo.bin \[BINARY_CONFLICT\]"; do
+    if ! echo "$OUTPUT" | grep -q "$expected"; then
+        echo "FAILURE: Expected '$expected' in the dry run output"
+        exit 1
+    fi
+done
+
+echo "--- Resolving Every Conflict ---"
+# Delete dot_oldrc, take upstream's icon.bin, keep the local logo.bin.
+OUTPUT=$(uv run python "$PROJECT_ROOT/tests/lib/drive_ui.py" "d t k" --source "$LOCAL_DIR" 2>&1)
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "drive_ui: sessions=1$"; then
+    echo "FAILURE: Expected all three conflicts to be resolved in one UI session"
+    exit 1
+fi
+
+if ! echo "$OUTPUT" | grep -q "Merge complete. Changes committed."; then
+    echo "FAILURE: Expected the resolved session to commit"
+    exit 1
+fi
+
+if [ -e "$LOCAL_DIR/dot_oldrc" ] || \
+   [ "$(cat -v "$LOCAL_DIR/icon.bin")" != "icon^@upstream" ] || \
+   [ "$(cat -v "$LOCAL_DIR/logo.bin")" != "logo^@local" ] || \
+   [ -n "$(git -C "$LOCAL_DIR" status --porcelain)" ]; then
+    echo "FAILURE: Expected each saved choice to be applied and committed"
+    git -C "$LOCAL_DIR" status --porcelain
+    exit 1
+fi
+
+echo "SUCCESS: Pending conflicts were resolved in a single UI session."
@@ -0,0 +1,132 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+SUBMODULE_DIR="$LOCAL_DIR/.chezmerge-upstream"
+
+echo "Running Skip Upstream Checkout E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+echo "export PATH=/usr/bin" > .bashrc
+git add .
+git commit -m "Initial commit" --quiet
+INITIAL_SHA=$(git rev-parse HEAD)
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- Merging With --skip-upstream-checkout ---"
+echo "export PATH=/usr/local/bin:/usr/bin" > .bashrc
+git commit -am "Prefer /usr/local/bin" --quiet
+SECOND_SHA=$(git rev-parse HEAD)
+
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --skip-upstream-checkout
+
+if [ "$(git -C "$LOCAL_DIR" rev-parse HEAD:.chezmerge-upstream)" != "$SECOND_SHA" ]; then
+    echo "FAILURE: Expected the merge commit to record the new upstream commit"
+    exit 1
+fi
+
+if [ "$(git -C "$SUBMODULE_DIR" rev-parse HEAD)" != "$INITIAL_SHA" ] || \
+   [ "$(cat "$SUBMODULE_DIR/.bashrc")" != "export PATH=/usr/bin" ]; then
+    echo "FAILURE: The submodule worktree should not have been checked out"
+    exit 1
+fi
+
+echo "--- Next Run Uses The Recorded Commit As Base ---"
+echo "export PATH=/usr/local/bin:/usr/bin:/bin" > .bashrc
+git commit -am "Add /bin" --quiet
+THIRD_SHA=$(git rev-parse HEAD)
+
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$OUTPUT"
+
+if echo "$OUTPUT" | grep -q "pending changes"; then
+    echo "FAILURE: A lagging upstream worktree was treated as a pending change"
+    exit 1
+fi
+
+if ! echo "$OUTPUT" | grep -q "dot_bashrc \[AUTO_UPDATE\]"; then
+    echo "FAILURE: Expected an automatic update against the recorded base"
+    exit 1
+fi
+
+echo "--- Real Changes Inside The Submodule Still Count As Pending ---"
+echo "# scratch" >> "$SUBMODULE_DIR/.bashrc"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+if ! echo "$OUTPUT" | grep -q "Refusing to run because the repository has pending changes."; then
+    echo "FAILURE: An edit inside the upstream submodule should count as a pending change"
+    exit 1
+fi
+git -C "$SUBMODULE_DIR" checkout --quiet -- .bashrc
+
+# The dry run fetched THIRD_SHA, which is ahead of the recorded commit.
+git -C "$SUBMODULE_DIR" checkout --quiet "$THIRD_SHA"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+if ! echo "$OUTPUT" | grep -q "Refusing to run because the repository has pending changes."; then
+    echo "FAILURE: A manual checkout past the recorded commit should count as a pending change"
+    exit 1
+fi
+git -C "$SUBMODULE_DIR" checkout --quiet "$INITIAL_SHA"
+
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --skip-upstream-checkout > /dev/null
+
+if [ "$(cat "$LOCAL_DIR/dot_bashrc")" != "export PATH=/usr/local/bin:/usr/bin:/bin" ]; then
+    echo "FAILURE: Expected dot_bashrc to follow upstream"
+    exit 1
+fi
+
+echo "--- Submodule Update Refreshes The Worktree ---"
+git -C "$LOCAL_DIR" submodule update --quiet .chezmerge-upstream
+
+if [ "$(git -C "$SUBMODULE_DIR" rev-parse HEAD)" != "$THIRD_SHA" ] || \
+   [ "$(cat "$SUBMODULE_DIR/.bashrc")" != "export PATH=/usr/local/bin:/usr/bin:/bin" ]; then
+    echo "FAILURE: Expected 'git submodule update' to bring the worktree to the recorded commit"
+    exit 1
+fi
+
+echo "--- Rewritten Upstream History Gets An Actionable Refusal ---"
+echo "export PATH=/opt/bin:/usr/local/bin:/usr/bin:/bin" > .bashrc
+git commit -a --amend -m "Add /opt/bin and /bin" --quiet
+REWRITTEN_SHA=$(git rev-parse HEAD)
+
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --skip-upstream-checkout > /dev/null
+if [ "$(git -C "$LOCAL_DIR" rev-parse HEAD:.chezmerge-upstream)" != "$REWRITTEN_SHA" ]; then
+    echo "FAILURE: Expected the merge to record the rewritten upstream commit"
+    exit 1
+fi
+
+# The worktree is still at THIRD_SHA, which the rewrite dropped from history.
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$OUTPUT"
+if ! echo "$OUTPUT" | grep -q "Run 'git submodule update .chezmerge-upstream'"; then
+    echo "FAILURE: Expected a worktree left behind by rewritten history to suggest 'git submodule update'"
+    exit 1
+fi
+
+git -C "$LOCAL_DIR" submodule update --quiet .chezmerge-upstream
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+if ! echo "$OUTPUT" | grep -q "No upstream changes detected."; then
+    echo "$OUTPUT"
+    echo "FAILURE: Expected the suggested submodule update to clear the refusal"
+    exit 1
+fi
+
+echo "SUCCESS: Upstream pointer advanced without a submodule checkout."
@@ -0,0 +1,75 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+INDEX_CACHE="$LOCAL_DIR/.git/chezmerge-cache/source-index.json"
+
+echo "Running Source Index Cache E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+echo "export PATH=/usr/bin" > .bashrc
+mkdir -p .config/app
+echo "theme=dark" > .config/app/settings
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- Updating Upstream ---"
+echo "export PATH=/usr/local/bin:/usr/bin" > .bashrc
+git commit -am "Update PATH" --quiet
+
+echo "--- First Dry Run (builds index cache) ---"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "dot_bashrc \[AUTO_UPDATE\]"; then
+    echo "FAILURE: Expected dot_bashrc to be matched before caching"
+    exit 1
+fi
+
+if [ ! -f "$INDEX_CACHE" ]; then
+    echo "FAILURE: Expected source index cache at $INDEX_CACHE"
+    exit 1
+fi
+
+echo "--- Backdating Directories So Cached Listings Are Trusted ---"
+find "$LOCAL_DIR" -path "$LOCAL_DIR/.git" -prune -o -type d -exec touch -d "2020-01-01 00:00:00" {} +
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run > /dev/null
+
+echo "--- Converting Local File To Template ---"
+git -C "$LOCAL_DIR" mv dot_bashrc dot_bashrc.tmpl
+git -C "$LOCAL_DIR" commit -m "Convert bashrc to template" --quiet
+
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$OUTPUT"
+
+if echo "$OUTPUT" | grep -q "dot_bashrc \["; then
+    echo "FAILURE: Stale cached listing still reports the removed dot_bashrc"
+    exit 1
+fi
+
+if ! echo "$OUTPUT" | grep -q "dot_bashrc.tmpl \[AUTO_UPDATE\]"; then
+    echo "FAILURE: Expected the renamed template to be found after revalidation"
+    exit 1
+fi
+
+echo "SUCCESS: Source index cache was revalidated by directory mtime."
@@ -0,0 +1,84 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+SUBMODULE_DIR="$LOCAL_DIR/.chezmerge-upstream"
+
+echo "Running Sparse Checkout E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+mkdir -p dotfiles/.config/app assets/wallpapers
+echo "export PATH=/usr/bin" > dotfiles/.bashrc
+echo "theme=dark" > dotfiles/.config/app/settings
+echo "image" > assets/wallpapers/one.png
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing With An Inner Path ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" --inner-path dotfiles > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+if [ ! -f "$LOCAL_DIR/dot_bashrc" ] || [ ! -f "$LOCAL_DIR/dot_config/app/settings" ]; then
+    echo "FAILURE: Expected the inner path to be imported"
+    exit 1
+fi
+
+if [ -e "$SUBMODULE_DIR/assets" ]; then
+    echo "FAILURE: Expected paths outside the inner path to be left out of the submodule worktree"
+    exit 1
+fi
+
+if [ ! -f "$SUBMODULE_DIR/dotfiles/.bashrc" ]; then
+    echo "FAILURE: Expected the inner path to be checked out"
+    exit 1
+fi
+
+echo "--- Merging Upstream Changes ---"
+echo "export PATH=/usr/local/bin:/usr/bin" > dotfiles/.bashrc
+echo "image v2" > assets/wallpapers/one.png
+echo "image" > assets/wallpapers/two.png
+git add .
+git commit -m "Update bashrc and wallpapers" --quiet
+
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --inner-path dotfiles
+
+if [ "$(cat "$LOCAL_DIR/dot_bashrc")" != "export PATH=/usr/local/bin:/usr/bin" ]; then
+    echo "FAILURE: Expected dot_bashrc to be updated"
+    exit 1
+fi
+
+if [ -e "$SUBMODULE_DIR/assets" ]; then
+    echo "FAILURE: Advancing the base pointer checked out paths outside the inner path"
+    exit 1
+fi
+
+if [ "$(git -C "$SUBMODULE_DIR" rev-parse HEAD)" != "$(git -C "$UPSTREAM_DIR" rev-parse HEAD)" ]; then
+    echo "FAILURE: Expected the base pointer to advance"
+    exit 1
+fi
+
+echo "--- Dropping The Inner Path Restores The Full Tree ---"
+uv run python -m chezmerge.main --source "$LOCAL_DIR"
+
+if [ ! -f "$SUBMODULE_DIR/assets/wallpapers/two.png" ]; then
+    echo "FAILURE: Expected the full upstream tree once no inner path is given"
+    exit 1
+fi
+
+echo "SUCCESS: Submodule worktree follows the inner path."
@@ -0,0 +1,99 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+if ! command -v chezmoi >/dev/null 2>&1; then
+    echo "SKIP: chezmoi is not installed; batch template rendering cannot be exercised."
+    exit 0
+fi
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+CHEZMOI_CONFIG_FILE="$TEST_DIR/chezmoi.toml"
+RENDER_LOG="$TEST_DIR/renders.log"
+SHIM_DIR="$TEST_DIR/bin"
+GOOD_TEMPLATES=8
+
+echo "Running Batch Template Render E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+cat > "$CHEZMOI_CONFIG_FILE" <<'TOML'
+[data]
+editor = "nvim"
+TOML
+export CHEZMOI_CONFIG="$CHEZMOI_CONFIG_FILE"
+
+# Count execute-template invocations by wrapping the real chezmoi binary.
+REAL_CHEZMOI=$(command -v chezmoi)
+mkdir -p "$SHIM_DIR"
+cat > "$SHIM_DIR/chezmoi" <<SHIM
+#!/bin/bash
+if [ "\$1" = "execute-template" ]; then
+    echo render >> "$RENDER_LOG"
+fi
+exec "$REAL_CHEZMOI" "\$@"
+SHIM
+chmod +x "$SHIM_DIR/chezmoi"
+export PATH="$SHIM_DIR:$PATH"
+
+mkdir -p "$UPSTREAM_DIR" "$LOCAL_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+for i in $(seq 1 "$GOOD_TEMPLATES"); do
+    printf 'export EDITOR=vi\n# shell %s\n' "$i" > ".shell$i"
+    printf 'export EDITOR={{ .editor }}\n# shell %s\n' "$i" > "$LOCAL_DIR/dot_shell$i.tmpl"
+done
+printf 'export EDITOR=vi\n# broken\n' > .broken
+printf 'export EDITOR={{ .editor\n# broken\n' > "$LOCAL_DIR/dot_broken.tmpl"
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- Updating Upstream ---"
+for i in $(seq 1 "$GOOD_TEMPLATES"); do
+    printf 'export EDITOR=nvim\n# shell %s\n' "$i" > ".shell$i"
+done
+printf 'export EDITOR=nvim\n# broken\n' > .broken
+git commit -am "Switch editor" --quiet
+
+echo "--- Dry Run ---"
+: > "$RENDER_LOG"
+OUTPUT=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run 2>&1)
+echo "$OUTPUT"
+RENDERS=$(wc -l < "$RENDER_LOG")
+
+if echo "$OUTPUT" | grep -q "dot_shell[0-9]*.tmpl \["; then
+    echo "FAILURE: Rendered templates matching upstream should be treated as synced"
+    exit 1
+fi
+
+if ! echo "$OUTPUT" | grep -q "dot_broken.tmpl \[TEMPLATE_DIVERGENCE\]"; then
+    echo "FAILURE: Expected the broken template to fall back to its raw content"
+    exit 1
+fi
+
+if ! echo "$OUTPUT" | grep -q "Warning: Template rendering failed"; then
+    echo "FAILURE: Expected a warning for the broken template"
+    exit 1
+fi
+
+if [ "$RENDERS" -ge $((GOOD_TEMPLATES + 1)) ]; then
+    echo "FAILURE: Expected batched rendering to use fewer than one process per template, saw $RENDERS"
+    exit 1
+fi
+
+echo "SUCCESS: Templates rendered in batches with the broken one isolated ($RENDERS renders)."
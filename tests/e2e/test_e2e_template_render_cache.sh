@@ -0,0 +1,117 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+if ! command -v chezmoi >/dev/null 2>&1; then
+    echo "SKIP: chezmoi is not installed; template render cache cannot be exercised."
+    exit 0
+fi
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+CHEZMOI_CONFIG_FILE="$TEST_DIR/chezmoi.toml"
+RENDER_LOG="$TEST_DIR/renders.log"
+SHIM_DIR="$TEST_DIR/bin"
+
+echo "Running Template Render Cache E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+cat > "$CHEZMOI_CONFIG_FILE" <<'TOML'
+[data]
+editor = "nvim"
+TOML
+export CHEZMOI_CONFIG="$CHEZMOI_CONFIG_FILE"
+
+# Count execute-template invocations by wrapping the real chezmoi binary.
+REAL_CHEZMOI=$(command -v chezmoi)
+mkdir -p "$SHIM_DIR"
+cat > "$SHIM_DIR/chezmoi" <<SHIM
+#!/bin/bash
+if [ "\$1" = "execute-template" ]; then
+    echo render >> "$RENDER_LOG"
+fi
+exec "$REAL_CHEZMOI" "\$@"
+SHIM
+chmod +x "$SHIM_DIR/chezmoi"
+export PATH="$SHIM_DIR:$PATH"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+printf 'export EDITOR=vi\nline 2\nline 3\nline 4\nline 5\n' > .bashrc
+printf 'export EDITOR=vi\nline 2\nline 3\nline 4\nline 5\n' > .zshrc
+git add .
+git commit -m "Initial commit" --quiet
+
+mkdir -p "$LOCAL_DIR"
+printf 'export EDITOR={{ .editor }}\nline 2\nline 3\nline 4\nline 5\n' > "$LOCAL_DIR/dot_bashrc.tmpl"
+printf 'export EDITOR={{ .editor }}\nline 2\nline 3\nline 4\nline 5\n' > "$LOCAL_DIR/dot_zshrc.tmpl"
+
+echo "--- Initializing Chezmerge ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" > /dev/null
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- Updating Upstream ---"
+printf 'export EDITOR=vi\nline 2\nline 3\nline 4\nline 5 upstream\n' > .bashrc
+printf 'export EDITOR=vi\nline 2\nline 3\nline 4\nline 5 upstream\n' > .zshrc
+git commit -am "Update shells" --quiet
+
+echo "--- First Dry Run ---"
+: > "$RENDER_LOG"
+FIRST=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+echo "$FIRST"
+FIRST_RENDERS=$(wc -l < "$RENDER_LOG")
+
+if [ "$FIRST_RENDERS" -ne 1 ]; then
+    echo "FAILURE: Expected identical templates to share one render, saw $FIRST_RENDERS"
+    exit 1
+fi
+
+echo "--- Second Dry Run ---"
+: > "$RENDER_LOG"
+SECOND=$(uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run)
+SECOND_RENDERS=$(wc -l < "$RENDER_LOG")
+
+if [ "$SECOND_RENDERS" -ne 0 ]; then
+    echo "FAILURE: Expected cached renders on the second run, saw $SECOND_RENDERS"
+    exit 1
+fi
+
+if [ "$FIRST" != "$SECOND" ]; then
+    echo "FAILURE: Cached renders changed the analysis result"
+    echo "$SECOND"
+    exit 1
+fi
+
+echo "--- Changing chezmoi config invalidates cached renders ---"
+printf '[data]\neditor = "vim"\n' > "$CHEZMOI_CONFIG_FILE"
+: > "$RENDER_LOG"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run > /dev/null
+if [ "$(wc -l < "$RENDER_LOG")" -ne 1 ]; then
+    echo "FAILURE: Expected a config change to trigger a fresh render"
+    exit 1
+fi
+
+echo "--- Changing source-dir template data invalidates cached renders ---"
+printf 'shell = "zsh"\n' > "$LOCAL_DIR/.chezmoidata.toml"
+git -C "$LOCAL_DIR" add .chezmoidata.toml
+git -C "$LOCAL_DIR" commit -m "Add template data" --quiet
+: > "$RENDER_LOG"
+uv run python -m chezmerge.main --source "$LOCAL_DIR" --dry-run > /dev/null
+if [ "$(wc -l < "$RENDER_LOG")" -ne 1 ]; then
+    echo "FAILURE: Expected a .chezmoidata change to trigger a fresh render"
+    exit 1
+fi
+
+echo "SUCCESS: Template renders are cached per content, config and template data."
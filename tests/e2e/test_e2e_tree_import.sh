@@ -0,0 +1,75 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+WORKTREE_DIR="$TEST_DIR/worktree-import"
+TREE_DIR="$TEST_DIR/tree-import"
+
+echo "Running Tree Import E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+mkdir -p dotfiles/.config/app dotfiles/.local/bin "dotfiles/dir with space" outside
+echo "export PATH=/usr/bin" > dotfiles/.bashrc
+echo "theme=dark" > dotfiles/.config/app/settings
+printf '#!/bin/sh\necho hi\n' > dotfiles/.local/bin/hello
+chmod +x dotfiles/.local/bin/hello
+echo "spaced" > "dotfiles/dir with space/file name"
+ln -s .config/app/settings dotfiles/.settings-link
+for i in $(seq 1 600); do echo "line $i" > "dotfiles/.config/app/file$i"; done
+echo "not imported" > outside/.profile
+git add .
+git commit -m "Initial commit" --quiet
+
+echo "--- Importing From Worktree ---"
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$WORKTREE_DIR" --inner-path dotfiles > /dev/null
+
+echo "--- Importing From Tree ---"
+OUTPUT=$(uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$TREE_DIR" --inner-path dotfiles --import-from-tree --jobs 4)
+echo "$OUTPUT"
+
+if ! echo "$OUTPUT" | grep -q "^Imported 605 files\.$"; then
+    echo "FAILURE: Expected a single summary line for 605 imported files"
+    exit 1
+fi
+
+if echo "$OUTPUT" | grep -q "Created:"; then
+    echo "FAILURE: Tree import should not print a line per file"
+    exit 1
+fi
+
+list_files() {
+    (cd "$1" && find . -path ./.git -prune -o -path ./.chezmerge-upstream -prune -o -type f -print | sort)
+}
+
+if ! diff <(list_files "$WORKTREE_DIR") <(list_files "$TREE_DIR"); then
+    echo "FAILURE: Tree import produced a different source layout than worktree import"
+    exit 1
+fi
+
+while read -r file; do
+    if ! cmp -s "$WORKTREE_DIR/$file" "$TREE_DIR/$file"; then
+        echo "FAILURE: Content differs for $file"
+        exit 1
+    fi
+done < <(list_files "$WORKTREE_DIR")
+
+if [ ! -f "$TREE_DIR/dot_local/bin/executable_hello" ] || [ ! -f "$TREE_DIR/symlink_dot_settings-link" ]; then
+    echo "FAILURE: Expected executable_ and symlink_ names from tree modes"
+    exit 1
+fi
+
+echo "SUCCESS: Tree import matches worktree import."
@@ -0,0 +1,87 @@
+#!/bin/bash
+set -e
+
+PROJECT_ROOT="$(cd "$(dirname "${BASH_SOURCE[0]}")/../.." && pwd)"
+export PYTHONPATH="${PROJECT_ROOT}/src"
+source "$PROJECT_ROOT/tests/lib/process_budget.sh"
+
+TEST_DIR=$(mktemp -d)
+cleanup() {
+    rm -rf "$TEST_DIR"
+}
+trap cleanup EXIT
+
+UPSTREAM_DIR="$TEST_DIR/upstream"
+LOCAL_DIR="$TEST_DIR/local"
+FILE_COUNT=30
+
+echo "Running Upstream File Modes E2E Test..."
+echo "Test Directory: $TEST_DIR"
+
+mkdir -p "$UPSTREAM_DIR"
+cd "$UPSTREAM_DIR"
+git init --quiet
+git config user.email "test@example.com"
+git config user.name "Test User"
+mkdir -p bin
+for i in $(seq 1 $FILE_COUNT); do
+    printf '#!/bin/sh\necho tool %s\n' "$i" > "bin/tool$i"
+    chmod +x "bin/tool$i"
+done
+echo "export PATH=/usr/bin" > .bashrc
+git add .
+git commit -m "Initial commit" --quiet
+
+# Prints how many 'git ls-tree' processes the ledger recorded.
+count_ls_trees() {
+    grep -c '"argv": \["git"[^]]*"ls-tree"' "$CHEZMERGE_PROCESS_LEDGER" || true
+}
+
+echo "--- Tree Import Reads Every Mode From One ls-tree ---"
+start_process_ledger
+uv run python -m chezmerge.main --repo "$UPSTREAM_DIR" --source "$LOCAL_DIR" --import-from-tree > /dev/null
+LS_TREES=$(count_ls_trees)
+assert_process_budget git 20 "tree import of $FILE_COUNT executables"
+
+if [ "$LS_TREES" -ne 1 ]; then
+    echo "FAILURE: Expected one ls-tree for the whole import, got $LS_TREES"
+    exit 1
+fi
+if [ ! -f "$LOCAL_DIR/bin/executable_tool1" ] || [ ! -f "$LOCAL_DIR/bin/executable_tool$FILE_COUNT" ]; then
+    echo "FAILURE: Expected imported executables to carry the executable_ prefix"
+    exit 1
+fi
+
+git -C "$LOCAL_DIR" add .
+git -C "$LOCAL_DIR" commit -m "Baseline import" --quiet
+
+echo "--- New Upstream Files Take Their Modes From The Diff ---"
+mkdir -p scripts links
+for i in $(seq 1 $FILE_COUNT); do
+    printf '#!/bin/sh\necho script %s\n' "$i" > "scripts/run$i"
+    chmod +x "scripts/run$i"
+    ln -s "../bin/tool$i" "links/tool$i"
+    echo "plain $i" > "scripts/notes$i"
+done
+git add .
+git commit -m "Add scripts and links" --quiet
+
+start_process_ledger
+uv run python -m chezmerge.main --source "$LOCAL_DIR" > /dev/null
+LS_TREES=$(count_ls_trees)
+assert_process_budget git 20 "import of $((3 * FILE_COUNT)) new upstream files"
+
+if [ "$LS_TREES" -gt 1 ]; then
+    echo "FAILURE: Expected at most one ls-tree for all new files, got $LS_TREES"
+    exit 1
+fi
+
+if [ ! -f "$LOCAL_DIR/scripts/executable_run1" ] || \
+   [ "$(cat "$LOCAL_DIR/links/symlink_tool1")" != "../bin/tool1" ] || \
+   [ "$(cat "$LOCAL_DIR/scripts/notes1")" != "plain 1" ] || \
+   [ -n "$(git -C "$LOCAL_DIR" status --porcelain)" ]; then
+    echo "FAILURE: Expected executable, symlink and plain files to be imported with their modes"
+    exit 1
+fi
+
+echo "SUCCESS: Upstream file modes were resolved without a per-file ls-tree."
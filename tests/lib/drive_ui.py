@@ -0,0 +1,42 @@
+"""
+Runs chezmerge with its merge UI driven headlessly by Textual's test pilot.
+
+    python tests/lib/drive_ui.py "<keys>" <chezmerge args...>
+
+The space-separated keys are pressed in order across every UI session the
+run opens, e.g. "d t k" deletes the first item, takes upstream for the
+second and keeps the third. When the run ends, the number of UI sessions
+opened is printed to stderr as "drive_ui: sessions=<n>".
+"""
+import asyncio
+import sys
+
+from chezmerge import main, ui
+
+
+def drive(keys: list[str]) -> dict:
+    stats = {"sessions": 0}
+
+    async def run_headless(app: ui.ChezmergeApp):
+        async with app.run_test() as pilot:
+            await pilot.pause()
+            while keys and app.is_running:
+                await pilot.press(keys.pop(0))
+                await pilot.pause()
+        return app.return_value
+
+    def run(app: ui.ChezmergeApp):
+        stats["sessions"] += 1
+        return asyncio.run(run_headless(app))
+
+    ui.ChezmergeApp.run = run
+    return stats
+
+
+if __name__ == "__main__":
+    stats = drive(sys.argv[1].split())
+    sys.argv = ["chezmerge", *sys.argv[2:]]
+    try:
+        main.run()
+    finally:
+        print(f"drive_ui: sessions={stats['sessions']}", file=sys.stderr)
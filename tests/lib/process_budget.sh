@@ -0,0 +1,33 @@
+#!/bin/bash
+# Helpers for asserting how many external processes a chezmerge run spawns.
+# Source this file, then wrap the run:
+#
+#   start_process_ledger
+#   uv run python -m chezmerge.main ...
+#   assert_process_budget git 10 "dry-run of 500 modified files"
+
+start_process_ledger() {
+    CHEZMERGE_PROCESS_LEDGER=$(mktemp)
+    export CHEZMERGE_PROCESS_LEDGER
+}
+
+count_processes() {
+    local program="$1"
+    grep -c "^{\"program\": \"$program\"" "$CHEZMERGE_PROCESS_LEDGER" || true
+}
+
+assert_process_budget() {
+    local program="$1"
+    local budget="$2"
+    local scenario="$3"
+    local used
+    used=$(count_processes "$program")
+    rm -f "$CHEZMERGE_PROCESS_LEDGER"
+    unset CHEZMERGE_PROCESS_LEDGER
+
+    if [ "$used" -gt "$budget" ]; then
+        echo "FAILURE: $scenario spawned $used $program processes (budget $budget)"
+        exit 1
+    fi
+    echo "Process budget: $scenario spawned $used/$budget $program processes."
+}